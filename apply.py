@@ -0,0 +1,509 @@
+import os
+import re
+import sys
+import json
+import argparse
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import MD_DIR, parse_markdown, slug_title
+from manifest import CACHE_DIR, refresh_manifest, load_json_cache, save_json_cache
+from matcher import slug_to_phrase
+
+# --- CONFIGURATION ---
+CSV_FILE = "v0.1-v0.2_audit.csv"
+SLUG_LIST_FILE = "slug_list.py"
+TXN_FILE = os.path.join(CACHE_DIR, "apply_txn.json")
+STAGE_SUFFIX = ".apply-new"
+BACKUP_SUFFIX = ".apply-bak"
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+
+MERGE_INTO_RE = re.compile(r"MERGE\s+INTO\s+(\S+)", re.IGNORECASE)
+QUOTED_RE = re.compile(r"'([^'\s]+)'")
+HEADING_RE = re.compile(r"^(#{1,6})\s+.*$", re.MULTILINE)
+# Prefix put on the note of a decision once apply has carried it out
+APPLIED_RE = re.compile(r"^APPLIED \d{4}-\d{2}-\d{2}: ")
+SPACE_RE = re.compile(r"\s+")
+
+
+def merge_target(slug, note, known):
+    """
+    The slug a merge decision points at: 'MERGE INTO <slug>' as written by
+    flagger.py, or else the only known slug quoted in an LLM-written note.
+    """
+    m = MERGE_INTO_RE.search(note or "")
+    if m:
+        return m.group(1).strip().strip("'\".,").lower()
+    quoted = {q.lower() for q in QUOTED_RE.findall(note or "")} & known
+    quoted.discard(slug)
+    # 'carrot' inside 'carrot-flavouring' is context, not the target
+    quoted = {q for q in quoted if not any(q != other and q in other for other in quoted)}
+    return quoted.pop() if len(quoted) == 1 else None
+
+
+def resolve_decisions(state):
+    """
+    Splits the audit state into (deletes, merges, skipped).
+    merges maps source -> final target (chains like a -> b -> c collapse
+    to a -> c); skipped is [(slug, reason)] for decisions that cannot be
+    applied.
+    """
+    known = set(state)
+    deletes = {s for s, (status, _) in state.items() if status.lower() == "delete"}
+    raw, skipped = {}, []
+    for slug, (status, note) in state.items():
+        if status.lower() != "merge":
+            continue
+        target = merge_target(slug, note, known)
+        if not target:
+            skipped.append((slug, "merge target not found in note"))
+        elif target not in known:
+            skipped.append((slug, f"merge target '{target}' is not in the audit table"))
+        else:
+            raw[slug] = target
+
+    merges = {}
+    for slug, target in raw.items():
+        seen = {slug}
+        while target in raw and target not in seen:
+            seen.add(target)
+            target = raw[target]
+        if target in seen:
+            skipped.append((slug, "merge cycle"))
+        elif target in deletes:
+            skipped.append((slug, f"merge target '{target}' is itself marked for deletion"))
+        else:
+            merges[slug] = target
+    return deletes, merges, sorted(skipped)
+
+
+def _normalize(text):
+    return SPACE_RE.sub(" ", text).strip().lower()
+
+
+def carried_sections(source_text, target_text, source_slug=""):
+    """
+    (title, [(heading, body)]) for the sections of a merge source whose text
+    the target does not already contain, so a merge never drops content.
+    """
+    title, sections = parse_markdown(source_text, source_slug)
+    have = _normalize(target_text)
+    return title, [(h, b) for h, b in sections if b.strip() and _normalize(b) not in have]
+
+
+def carried_block(title, sections):
+    """The markdown appended to a merge target: one '##' part per source."""
+    parts = [f"## {title}"]
+    for heading, body in sections:
+        if heading != title:
+            parts.append(f"### {heading}")
+        parts.append(body)
+    return "\n\n".join(parts)
+
+
+def _match_case(matched, replacement):
+    if matched.isupper() and len(matched) > 1:
+        return replacement.upper()
+    if matched.istitle():
+        return replacement.title()
+    if matched[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+
+WORD_RE = re.compile(r"\w+")
+_REWRITER = None
+
+
+def _init_rewriter(replacements):
+    """Indexes the phrases to rewrite by their first word, once per worker."""
+    global _REWRITER
+    by_first = {}
+    for phrase, new in replacements.items():
+        m = WORD_RE.match(phrase.lower())
+        if m:
+            by_first.setdefault(m.group(0), []).append((phrase.lower(), new))
+    # Longest phrases first; protected phrases map to None so that
+    # 'wheat flour' is not touched when 'flour' is merged away
+    for candidates in by_first.values():
+        candidates.sort(key=lambda c: len(c[0]), reverse=True)
+    _REWRITER = by_first
+
+
+def rewrite_text(text, skip=()):
+    """
+    Rewrites mentions of merged-away names. Returns (new_text, count).
+    Only words that start some phrase are looked at, so a file costs one
+    C-level tokenization plus a set lookup per word.
+    """
+    by_first = _REWRITER
+    if not by_first:
+        return text, 0
+    lower = text.lower()
+    if len(lower) != len(text):
+        # A few characters ('İ') lower to two; keep those as they are so
+        # offsets in `lower` stay valid for `text`
+        lower = "".join(ch if len(ch.lower()) != 1 else ch.lower() for ch in text)
+
+    out, count, pos = [], 0, 0
+    for m in WORD_RE.finditer(lower):
+        start = m.start()
+        if start < pos or m.group(0) not in by_first:
+            continue
+        for phrase, new in by_first[m.group(0)]:
+            end = start + len(phrase)
+            if not lower.startswith(phrase, start):
+                continue
+            if end < len(lower) and (lower[end].isalnum() or lower[end] == "_"):
+                continue
+            if new is not None and phrase not in skip:
+                out.append(text[pos:start])
+                out.append(_match_case(text[start:end], new))
+                pos = end
+                count += 1
+            else:
+                # Protected (or skipped) phrase: leave it and everything inside it
+                out.append(text[pos:end])
+                pos = end
+            break
+
+    if not count:
+        return text, 0
+    out.append(text[pos:])
+    return "".join(out), count
+
+
+def stage_file(job):
+    """
+    Worker: reads one file, applies the rewrites and writes the result to a
+    staged temp file (unless dry-run or nothing changed).
+    Returns (dest, staged_path or None, mentions rewritten).
+    """
+    src, dest, skip, append, title, dry_run = job
+    with open(src, 'r', encoding='utf-8') as f:
+        text = f.read()
+    new, count = rewrite_text(text, set(skip))
+    if title:
+        # Moved file: only its title changes, the prose keeps the old name
+        new = HEADING_RE.sub(lambda m: f"{m.group(1)} {title}", new, count=1)
+    if append and append.lower() not in new.lower():
+        new = new.rstrip("\n") + "\n\n" + append + "\n"
+    if new == text and src == dest:
+        return dest, None, 0
+    if dry_run:
+        return dest, dest + STAGE_SUFFIX, count
+
+    staged = dest + STAGE_SUFFIX
+    with open(staged, 'w', encoding='utf-8', newline='') as f:
+        f.write(new)
+    return dest, staged, count
+
+
+def plan(md_dir=MD_DIR, csv_file=CSV_FILE, dry_run=False):
+    """
+    Computes the whole change set from the audit state in one pass over the
+    manifest. With dry_run the manifest cache is not updated.
+    """
+    from journal import read_state
+
+    state = read_state(csv_file)
+    manifest, _ = refresh_manifest(md_dir, save=not dry_run)
+    deletes, merges, skipped = resolve_decisions(state)
+
+    removals, jobs = [], []
+    alias_for = {}
+    for source, target in sorted(merges.items()):
+        alias_for.setdefault(target, []).append(source)
+
+    # Merge sources and deleted entries leave the corpus
+    gone = {s for s in deletes | set(merges) if s in manifest}
+    moves = {}
+    for source, target in sorted(merges.items()):
+        if source not in manifest:
+            continue
+        if target not in manifest and target not in moves.values():
+            # The target has no file yet: the source's file becomes it
+            entry = manifest[source]
+            moves[source] = target
+            jobs.append((entry["path"], os.path.join(os.path.dirname(entry["path"]), f"{target}.md")))
+        removals.append(manifest[source]["path"])
+    removals.extend(manifest[s]["path"] for s in sorted(deletes) if s in manifest)
+
+    # Sources merged into a file that stays (or into another source's moved
+    # file) hand over the sections their target lacks
+    carried, blocks = {}, {}
+    for source, target in sorted(merges.items()):
+        if source not in manifest or source in moves:
+            continue
+        if target in manifest:
+            target_path = manifest[target]["path"]
+        else:
+            target_path = manifest[next(s for s, t in moves.items() if t == target)]["path"]
+        with open(manifest[source]["path"], 'r', encoding='utf-8') as f:
+            source_text = f.read()
+        with open(target_path, 'r', encoding='utf-8') as f:
+            target_text = f.read()
+        title, sections = carried_sections(source_text, target_text, source)
+        carried[source] = [h for h, _ in sections]
+        if sections:
+            blocks.setdefault(target, []).append(carried_block(title, sections))
+
+    # Every surviving file is a rewrite candidate; the workers skip unchanged ones
+    for slug, entry in sorted(manifest.items()):
+        if slug not in gone:
+            jobs.append((entry["path"], entry["path"]))
+
+    # Phrases to rewrite (source -> target), plus the phrases that contain
+    # them and must be left alone
+    replacements = {slug_to_phrase(s): slug_to_phrase(t) for s, t in merges.items()}
+    sources = list(replacements)
+    for slug in state:
+        phrase = slug_to_phrase(slug)
+        if slug not in merges and any(p in phrase for p in sources):
+            replacements.setdefault(phrase, None)
+
+    full_jobs = []
+    for src, dest in jobs:
+        slug = os.path.basename(dest)[:-3]
+        aliases = alias_for.get(slug, ())
+        # A merge target keeps mentions of the names merged into it
+        skip = tuple(slug_to_phrase(s) for s in aliases)
+        append = "\n\n".join(blocks.get(slug, []) +
+                             ([f"*Also known as: {', '.join(slug_title(s) for s in aliases)}.*"] if aliases else []))
+        title = slug_title(slug) if src != dest else ""
+        full_jobs.append((src, dest, skip, append, title))
+
+    # Decisions carried out by this run that the audit table does not yet say so
+    to_mark = sorted(s for s in deletes | set(merges) if not APPLIED_RE.match(state[s][1] or ""))
+
+    return {
+        "state": state,
+        "deletes": sorted(deletes),
+        "merges": merges,
+        "moves": moves,
+        "carried": carried,
+        "to_mark": to_mark,
+        "skipped": skipped,
+        "removals": sorted(set(removals)),
+        "jobs": full_jobs,
+        "replacements": replacements,
+    }
+
+
+def stage(change_plan, dry_run=False, workers=None):
+    """Runs the rewrites over all candidate files with a worker pool."""
+    replacements = change_plan["replacements"]
+    jobs = [job + (dry_run,) for job in change_plan["jobs"]
+            # Without rewrites only moved files and merge targets change
+            if replacements or job[0] != job[1] or job[3]]
+    if len(jobs) >= PARALLEL_THRESHOLD and replacements:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_rewriter,
+                                 initargs=(replacements,)) as pool:
+            results = list(pool.map(stage_file, jobs, chunksize=32))
+    else:
+        _init_rewriter(replacements)
+        results = [stage_file(job) for job in jobs]
+    return [r for r in results if r[1] is not None]
+
+
+def staged_slug_list(change_plan, dry_run=False):
+    """Stages slug_list.py without the removed slugs (and with new merge targets)."""
+    from slug_list import FULL_SLUG_LIST
+
+    gone = set(change_plan["deletes"]) | set(change_plan["merges"])
+    new = [s for s in FULL_SLUG_LIST if s not in gone]
+    for target in sorted(set(change_plan["merges"].values()) - set(new)):
+        new.append(target)
+    if new == FULL_SLUG_LIST:
+        return None, 0
+    removed = len(FULL_SLUG_LIST) - len([s for s in FULL_SLUG_LIST if s not in gone])
+    staged = SLUG_LIST_FILE + STAGE_SUFFIX
+    if not dry_run:
+        with open(staged, 'w', encoding='utf-8', newline='') as f:
+            f.write("FULL_SLUG_LIST = " + json.dumps(new, ensure_ascii=False))
+    return staged, removed
+
+
+# --- TRANSACTION ---
+
+def _op(path, staged):
+    """A write (staged is a path) or a removal (staged is None) of `path`."""
+    return {"path": path, "staged": staged, "existed": os.path.exists(path)}
+
+
+def _apply_op(op):
+    path = op["path"]
+    if os.path.exists(path):
+        os.replace(path, path + BACKUP_SUFFIX)
+    if op["staged"]:
+        os.replace(op["staged"], path)
+
+
+def _undo_op(op):
+    """Idempotent: safe to run on ops that never started or already finished."""
+    path, backup = op["path"], op["path"] + BACKUP_SUFFIX
+    if os.path.exists(backup):
+        os.replace(backup, path)
+    elif not op["existed"] and op["staged"] and not os.path.exists(op["staged"]) and os.path.exists(path):
+        # Created by this transaction
+        os.remove(path)
+    if op["staged"] and os.path.exists(op["staged"]):
+        os.remove(op["staged"])
+
+
+def _finish(ops):
+    for op in ops:
+        for leftover in (op["path"] + BACKUP_SUFFIX, op["staged"]):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+
+
+def recover():
+    """Rolls back (or, if it had committed, finishes) an interrupted apply. Returns True if one was found."""
+    txn = load_json_cache(TXN_FILE, None)
+    if not txn:
+        return False
+    if txn.get("committed"):
+        _finish(txn["ops"])
+    else:
+        for op in reversed(txn["ops"]):
+            _undo_op(op)
+    os.remove(TXN_FILE)
+    return True
+
+
+def commit(ops, rebuild_master=True):
+    """
+    Applies all ops with renames. Originals are kept as backups until
+    everything (including the rebuilt master) is in place; any failure
+    restores them. The op list is saved first, so a crash mid-way is
+    rolled back by the next run.
+    """
+    from build_master import MASTER_FILE, build_master
+
+    master_op = _op(MASTER_FILE, MASTER_FILE + STAGE_SUFFIX) if rebuild_master else None
+    all_ops = ops + ([master_op] if master_op else [])
+    save_json_cache({"committed": False, "ops": all_ops}, TXN_FILE)
+
+    try:
+        for op in ops:
+            _apply_op(op)
+        if master_op:
+            # The master is rebuilt from the already-updated corpus
+            build_master(out_file=master_op["staged"])
+            _apply_op(master_op)
+    except BaseException:
+        for op in reversed(all_ops):
+            _undo_op(op)
+        os.remove(TXN_FILE)
+        raise
+
+    save_json_cache({"committed": True, "ops": all_ops}, TXN_FILE)
+    _finish(all_ops)
+    os.remove(TXN_FILE)
+
+
+def mark_applied(change_plan, csv_file=CSV_FILE):
+    """
+    Journals 'APPLIED <date>: ' in front of the note of every decision this
+    run carried out. The status stays as it was: the table still records
+    what was decided, and 'MERGE INTO <slug>' remains readable.
+    """
+    from journal import append_decisions, maybe_compact
+
+    state, stamp = change_plan["state"], f"APPLIED {date.today().isoformat()}: "
+    marked = append_decisions([(slug, state[slug][0], stamp + (state[slug][1] or ""))
+                               for slug in change_plan["to_mark"]], csv_file)
+    maybe_compact(csv_file)
+    return marked
+
+
+def print_plan(change_plan, staged, slug_list_removed):
+    merges, moves, carried = change_plan["merges"], change_plan["moves"], change_plan["carried"]
+    print("\n" + "=" * 60)
+    print("🧾 APPLY PLAN")
+    print("=" * 60)
+    print(f"{'Delete decisions':<30} : {len(change_plan['deletes'])}")
+    print(f"{'Merge decisions':<30} : {len(merges)}")
+    print(f"{'Files to remove':<30} : {len(change_plan['removals'])}")
+    print(f"{'Files to rewrite or create':<30} : {len(staged)}")
+    print(f"{'Slugs leaving slug_list.py':<30} : {slug_list_removed}")
+    print(f"{'Decisions to mark applied':<30} : {len(change_plan['to_mark'])}")
+    print("-" * 60)
+    for source, target in sorted(merges.items()):
+        if source in moves:
+            how = "move file"
+        elif source not in carried:
+            how = "no source file"
+        elif carried[source]:
+            how = f"carry over {len(carried[source])} section(s): {', '.join(carried[source])}"
+        else:
+            how = "target already has all of its text"
+        print(f"  MERGE  {source:<35} -> {target} ({how})")
+    for path in change_plan["removals"]:
+        print(f"  REMOVE {path}")
+    for dest, _, count in staged:
+        print(f"  WRITE  {dest}" + (f" ({count} mention(s) rewritten)" if count else ""))
+    for slug, reason in change_plan["skipped"]:
+        print(f"  SKIP   {slug:<35} : {reason}")
+    print("=" * 60)
+
+
+def apply_decisions(dry_run=False, workers=None, rebuild_master=True):
+    if dry_run and os.path.exists(TXN_FILE):
+        print("⚠️  An interrupted apply is pending; the next real run rolls it back first.")
+    elif recover():
+        print("♻️  Rolled back an interrupted apply.")
+    if not os.path.exists(CSV_FILE):
+        print(f"❌ Error: {CSV_FILE} not found.")
+        return 1
+
+    change_plan = plan(dry_run=dry_run)
+    try:
+        staged = stage(change_plan, dry_run, workers)
+        slug_list_staged, slug_list_removed = staged_slug_list(change_plan, dry_run)
+        print_plan(change_plan, staged, slug_list_removed)
+
+        if dry_run:
+            print("🔎 Dry run: nothing was written.")
+            return 0
+        if not staged and not change_plan["removals"] and not slug_list_staged:
+            marked = mark_applied(change_plan)
+            print("✅ Corpus already matches the audit decisions" +
+                  (f"; {marked} decision(s) marked applied." if marked else "."))
+            return 0
+
+        ops = [_op(dest, path) for dest, path, _ in staged]
+        ops += [_op(path, None) for path in change_plan["removals"]]
+        if slug_list_staged:
+            ops.append(_op(SLUG_LIST_FILE, slug_list_staged))
+    except BaseException:
+        # Nothing is committed yet: just drop whatever was staged
+        if not dry_run:
+            for job in change_plan["jobs"]:
+                dest = job[1]
+                if os.path.exists(dest + STAGE_SUFFIX):
+                    os.remove(dest + STAGE_SUFFIX)
+            if os.path.exists(SLUG_LIST_FILE + STAGE_SUFFIX):
+                os.remove(SLUG_LIST_FILE + STAGE_SUFFIX)
+        raise
+
+    commit(ops, rebuild_master)
+    marked = mark_applied(change_plan)
+    print(f"✅ Applied {len(change_plan['deletes'])} deletion(s) and {len(change_plan['merges'])} merge(s); "
+          f"{marked} decision(s) marked applied in {CSV_FILE}.")
+    return 0
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Apply delete/merge decisions to data/md, slug_list.py and the master")
+    parser.add_argument("--dry-run", action="store_true", help="print the plan without touching disk")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-master", action="store_true", help="do not rebuild the JSON master")
+    args = parser.parse_args(argv)
+    return apply_decisions(args.dry_run, args.workers, not args.no_master)
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
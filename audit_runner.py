@@ -0,0 +1,396 @@
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+import metrics
+
+# --- CONFIGURATION ---
+MAX_WORKERS = 4
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1_000_000
+MAX_RETRIES = 6
+BASE_BACKOFF = 5      # seconds, doubled on every consecutive 429
+MAX_BACKOFF = 120
+# Adaptive batching: shrink batches slower than this, give up on a slug after
+# this many sends
+TARGET_LATENCY = 30   # seconds
+MAX_ATTEMPTS = 3
+# Histogram bounds for retries needed per request
+RETRY_BUCKETS = tuple(range(MAX_RETRIES))
+
+
+class RateLimitError(Exception):
+    """Raised by clients (or the stub) when the API answers 429."""
+
+
+def is_rate_limit(error):
+    text = str(error)
+    return isinstance(error, RateLimitError) or "429" in text or "RESOURCE_EXHAUSTED" in text
+
+
+def estimate_tokens(*texts):
+    # ~4 characters per token is close enough for budgeting
+    return sum(len(t) for t in texts) // 4 + 1
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `per_minute` units."""
+
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, amount=1):
+        # A single request larger than the bucket would wait forever
+        amount = min(amount, self.capacity)
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                wait = (amount - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class GeminiClient:
+    """Adapter that gives a google-genai client the runner's generate() interface."""
+
+    def __init__(self, client, model_id):
+        self.client = client
+        self.model_id = model_id
+
+    @classmethod
+    def from_api_key(cls, model_id):
+        """Builds the SDK client from api_key.py; only called when an audit actually runs."""
+        from google import genai
+        from api_key import api_key
+
+        return cls(genai.Client(api_key=api_key), model_id)
+
+    def generate(self, system_instruction, prompt):
+        from google.genai import types
+
+        response = self.client.models.generate_content(
+            model=self.model_id,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                temperature=0
+            )
+        )
+        return response.text
+
+
+class StubClient:
+    """
+    Local stand-in for the model: simulates latency and random 429s without
+    network access. Answers every slug in the prompt as 'slug :: approve :: stub'.
+    """
+
+    def __init__(self, latency=0.05, rate_limit_rate=0.1, responder=None, seed=None):
+        self.latency = latency
+        self.rate_limit_rate = rate_limit_rate
+        self.responder = responder or self.default_responder
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    @staticmethod
+    def default_responder(slugs):
+        return "\n".join(f"{s} :: approve :: stub response" for s in slugs)
+
+    def generate(self, system_instruction, prompt):
+        with self.lock:
+            self.calls += 1
+            limited = self.random.random() < self.rate_limit_rate
+        time.sleep(self.latency)
+        if limited:
+            raise RateLimitError("429 RESOURCE_EXHAUSTED (stub)")
+        slugs = [s.strip() for s in prompt.split("\n", 1)[-1].split(",") if s.strip()]
+        return self.responder(slugs)
+
+
+class AuditRunner:
+    """
+    Sends prompt batches concurrently through a bounded thread pool.
+
+    Requests and estimated tokens are drawn from shared per-minute buckets, and
+    a 429 from any worker pauses the whole pool (exponential backoff with
+    jitter) instead of only the request that hit it.
+    """
+
+    def __init__(self, client, system_instruction, max_workers=MAX_WORKERS,
+                 requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                 max_retries=MAX_RETRIES, base_backoff=BASE_BACKOFF, max_backoff=MAX_BACKOFF):
+        self.client = client
+        self.system_instruction = system_instruction
+        self.max_workers = max_workers
+        self.requests = TokenBucket(requests_per_minute, capacity=max(1, requests_per_minute // 4))
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.lock = threading.Lock()
+        self.cooldown_until = 0.0
+        self.consecutive_429 = 0
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0, "failed_batches": 0}
+
+    def _wait_for_cooldown(self):
+        while True:
+            with self.lock:
+                wait = self.cooldown_until - time.monotonic()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _backoff(self, rate_limited):
+        """Pushes the pool-wide cooldown forward; returns the new delay."""
+        with self.lock:
+            now = time.monotonic()
+            if rate_limited:
+                self.stats["rate_limited"] += 1
+                if now < self.cooldown_until:
+                    # Another worker already paused the pool for this burst;
+                    # escalate once per window, not once per worker
+                    return self.cooldown_until - now
+                self.consecutive_429 += 1
+                steps = self.consecutive_429
+            else:
+                self.stats["errors"] += 1
+                steps = 1
+            delay = min(self.max_backoff, self.base_backoff * 2 ** (steps - 1))
+            delay *= random.uniform(0.5, 1.5)  # jitter so workers don't retry in lockstep
+            self.cooldown_until = max(self.cooldown_until, now + delay)
+            return delay
+
+    def call(self, prompt):
+        """Sends one prompt with rate limiting and retries. Returns '' on failure."""
+        return self._send(prompt)[0]
+
+    def _send(self, prompt):
+        """call() that also returns the model round-trip time of the last attempt."""
+        cost = estimate_tokens(self.system_instruction, prompt)
+        round_trip = 0.0
+
+        for attempt in range(self.max_retries):
+            self._wait_for_cooldown()
+            self.requests.acquire()
+            self.tokens.acquire(cost)
+            with self.lock:
+                self.stats["requests"] += 1
+            metrics.count("llm_requests")
+            start = time.perf_counter()
+            try:
+                text = self.client.generate(self.system_instruction, prompt)
+                round_trip = time.perf_counter() - start
+                metrics.observe("llm_request_seconds", round_trip)
+                metrics.observe("llm_retries", attempt, RETRY_BUCKETS)
+                with self.lock:
+                    self.consecutive_429 = 0
+                return text, round_trip
+            except Exception as e:
+                round_trip = time.perf_counter() - start
+                metrics.observe("llm_request_seconds", round_trip)
+                limited = is_rate_limit(e)
+                delay = self._backoff(limited)
+                if limited:
+                    metrics.count("llm_rate_limited")
+                    metrics.observe("llm_429_backoff_seconds", delay)
+                    print(f"\n⚠️ Rate limit hit. Pool paused for {delay:.1f}s...")
+                else:
+                    metrics.count("llm_errors")
+                    print(f"\n❌ API Error: {e}")
+
+        with self.lock:
+            self.stats["failed_batches"] += 1
+        metrics.count("llm_failed_batches")
+        metrics.observe("llm_retries", self.max_retries, RETRY_BUCKETS)
+        return "", round_trip
+
+    def timed_call(self, prompt):
+        """
+        Like call(), but returns (text, round_trip, wall): the model's own
+        response time for the last attempt, and the wall time including
+        rate-limit waits, cooldowns and retries.
+        """
+        start = time.monotonic()
+        text, round_trip = self._send(prompt)
+        return text, round_trip, time.monotonic() - start
+
+    def run(self, batches, build_prompt):
+        """
+        Yields (batch, response_text) as batches complete, in completion order.
+        `build_prompt(batch)` turns a list of slugs into the user prompt.
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self.call, build_prompt(batch)): batch for batch in batches}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+
+
+def make_batches(items, batch_size):
+    return [items[i : i + batch_size] for i in range(0, len(items), batch_size)]
+
+
+def parse_response(text, batch, fields, statuses=None):
+    """
+    Validates a batch response against the slugs that were sent.
+
+    Each answer must be one line of exactly `fields` ' :: '-separated parts
+    starting with the slug (and, if `statuses` is given, a known status in the
+    second part). Returns ({slug: line} for valid answers, [malformed lines]).
+    Slugs absent from the first dict are missing and need to be re-sent.
+    """
+    wanted = set(batch)
+    answers, malformed = {}, []
+    for line in text.splitlines():
+        # Models occasionally add bullets or bold despite the protocol
+        line = line.strip().lstrip("-*• ").replace("**", "").strip()
+        if not line or line.startswith("---"):
+            continue
+
+        parts = [p.strip() for p in line.split(" :: ")]
+        if statuses and len(parts) > 1:
+            # The instructions show statuses as '[APPROVE]'; models copy that
+            parts[1] = parts[1].strip("[] ")
+        slug = parts[0]
+        if slug not in wanted:
+            if " :: " in line:
+                malformed.append(line)
+            continue
+        if len(parts) != fields or not all(parts[:fields - 1]) or \
+                (statuses and parts[1].lower() not in statuses):
+            malformed.append(line)
+            continue
+        if slug not in answers:
+            answers[slug] = " :: ".join(parts)
+    return answers, malformed
+
+
+class AdaptiveBatcher:
+    """
+    Picks the next batch size from observed completeness and latency (AIMD):
+    a batch that comes back incomplete, fails, or runs past `target_latency`
+    shrinks the size; complete, fast batches grow it step by step.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=None, target_latency=TARGET_LATENCY, step=5):
+        self.size = initial
+        self.minimum = minimum
+        self.maximum = maximum or initial * 2
+        self.target_latency = target_latency
+        self.step = step
+        self.history = []
+
+    def record(self, sent, answered, latency):
+        self.history.append((sent, answered, latency))
+        completeness = answered / sent if sent else 1.0
+        if completeness < 0.9:
+            self.size = max(self.minimum, self.size // 2)
+        elif latency > self.target_latency:
+            self.size = max(self.minimum, int(self.size * 0.75))
+        elif completeness == 1.0 and sent >= self.size:
+            self.size = min(self.maximum, self.size + self.step)
+
+
+def run_audit(runner, cache, slugs, batch_size, build_prompt, log_file, header, desc,
+              fields=3, statuses=None, max_attempts=MAX_ATTEMPTS):
+    """
+    Runs a cached, resumable audit and (re)writes `log_file`.
+
+    Slugs already answered for this model + instruction come from the cache;
+    only the rest are sent. Every response is validated per slug as soon as it
+    arrives: valid answers are checkpointed and logged, while missing or
+    malformed slugs are re-queued in smaller batches (up to `max_attempts`
+    sends each). Batch size adapts to observed latency and completeness.
+    Returns the number of slugs that still got no valid answer.
+    """
+    from tqdm import tqdm
+
+    with metrics.stage("cache_lookup"):
+        cached = cache.get_many(slugs)
+    pending = deque(s for s in slugs if s not in cached)
+
+    with open(log_file, "w", encoding="utf-8") as f:
+        f.write(header + "\n")
+        for slug in slugs:
+            if slug in cached:
+                f.write(cached[slug] + "\n")
+
+    batcher = AdaptiveBatcher(batch_size)
+    retries = deque()
+    attempts = {}
+    given_up = []
+    malformed_total = 0
+    progress = tqdm(total=len(pending), desc=desc)
+
+    def next_batch():
+        # Re-queued slugs go first, in batches half the current size
+        queue, size = (retries, max(1, batcher.size // 2)) if retries else (pending, batcher.size)
+        batch = [queue.popleft() for _ in range(min(size, len(queue)))]
+        for slug in batch:
+            attempts[slug] = attempts.get(slug, 0) + 1
+        return batch
+
+    with metrics.stage("requests"), ThreadPoolExecutor(max_workers=runner.max_workers) as pool:
+        in_flight = {}
+        while pending or retries or in_flight:
+            while (pending or retries) and len(in_flight) < runner.max_workers:
+                batch = next_batch()
+                in_flight[pool.submit(runner.timed_call, build_prompt(batch))] = batch
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch = in_flight.pop(future)
+                text, latency, wall = future.result()
+                answers, malformed = parse_response(text, batch, fields, statuses)
+                malformed_total += len(malformed)
+                # Wall time per batch, including rate-limit waits and retries
+                metrics.observe("llm_batch_seconds", wall)
+                metrics.count("llm_malformed_lines", len(malformed))
+                batcher.record(len(batch), len(answers), latency)
+
+                cache.put_many(answers)
+                if answers:
+                    with open(log_file, "a", encoding="utf-8") as f:
+                        f.write("\n".join(answers[s] for s in batch if s in answers) + "\n")
+
+                for slug in batch:
+                    if slug in answers:
+                        continue
+                    if attempts[slug] < max_attempts:
+                        retries.append(slug)
+                    else:
+                        given_up.append(slug)
+                progress.update(len(answers) + sum(1 for s in batch if s in given_up))
+    progress.close()
+
+    evicted = cache.evict()
+    requeued = sum(1 for n in attempts.values() if n > 1)
+    print(f"\n♻️  Cache: {cache.hits} hit(s), {cache.misses} miss(es), {evicted} evicted.")
+    print(f"📦 {len(batcher.history)} request(s) for {len(attempts)} slug(s); {requeued} re-queued, "
+          f"{malformed_total} malformed line(s); final batch size {batcher.size}.")
+    if given_up:
+        print(f"⚠️ {len(given_up)} slug(s) got no valid answer after {max_attempts} attempts; "
+              f"they will be retried on the next run: {', '.join(given_up[:10])}")
+    return len(given_up)
+
+
+if __name__ == "__main__":
+    # Offline smoke run against the stub: 621 slugs, simulated latency and 429s
+    slugs = [f"slug-{i}" for i in range(621)]
+    runner = AuditRunner(StubClient(latency=0.2, rate_limit_rate=0.1, seed=0), "stub",
+                         max_workers=8, requests_per_minute=600, base_backoff=0.5)
+    start = time.monotonic()
+    answered = sum(len(text.splitlines()) for _, text in
+                   runner.run(make_batches(slugs, 25), lambda b: f"Audit these ingredients:\n{', '.join(b)}"))
+    print(f"✨ {answered}/{len(slugs)} slugs answered in {time.monotonic() - start:.1f}s | {runner.stats}")
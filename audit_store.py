@@ -0,0 +1,246 @@
+import os
+import re
+import sqlite3
+import hashlib
+from datetime import datetime, timezone
+
+from manifest import CACHE_DIR
+
+# --- CONFIGURATION ---
+STORE_FILE = os.path.join(CACHE_DIR, "audit_store.sqlite")
+CSV_FILE = "v0.1-v0.2_audit.csv"
+FSSAI_LOG = "fssai_audit_results.log"
+FACET_LOG = "ingredient_facets_audit.log"
+
+TAG_RE = re.compile(r"#[\w-]+(?::[\w-]+)?")
+CLEAN_PHRASES = ["no specific facets", "none", "n/a", "no facets required"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,              -- 'fssai' or 'facets'
+    source TEXT NOT NULL,
+    sha256 TEXT NOT NULL UNIQUE,
+    ingested_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fssai (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    line_no INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    status TEXT NOT NULL,
+    reason TEXT
+);
+CREATE TABLE IF NOT EXISTS facet_audit (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    line_no INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    standard_slug TEXT,
+    facets_raw TEXT,
+    is_clean INTEGER NOT NULL,
+    reasoning TEXT
+);
+CREATE TABLE IF NOT EXISTS facets (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    slug TEXT NOT NULL,
+    tag TEXT NOT NULL,               -- e.g. '#source:soy'
+    key TEXT NOT NULL,               -- e.g. '#source'
+    value TEXT                       -- e.g. 'soy'
+);
+CREATE TABLE IF NOT EXISTS audit_csv (
+    slug TEXT PRIMARY KEY,
+    status TEXT,
+    note TEXT
+);
+CREATE INDEX IF NOT EXISTS fssai_slug ON fssai (session_id, slug);
+CREATE INDEX IF NOT EXISTS facet_audit_slug ON facet_audit (session_id, slug);
+CREATE INDEX IF NOT EXISTS facets_key ON facets (session_id, key, slug);
+CREATE INDEX IF NOT EXISTS facets_tag ON facets (session_id, tag);
+CREATE INDEX IF NOT EXISTS audit_csv_status ON audit_csv (status);
+"""
+
+
+def connect(path=STORE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    return db
+
+
+def parse_fssai_line(line):
+    """'slug :: status :: reason' -> (slug, status, reason) or None."""
+    parts = line.split(" :: ", 2)
+    if len(parts) != 3:
+        return None
+    return parts[0].strip(), parts[1].strip().lower(), parts[2].strip()
+
+
+def parse_facet_line(line):
+    """'original :: standard :: facets :: reasoning' -> 4-tuple or None."""
+    parts = line.split(" :: ", 3)
+    if len(parts) != 4:
+        return None
+    return tuple(p.strip() for p in parts)
+
+
+def is_clean(facets):
+    return facets == "" or any(phrase in facets.lower() for phrase in CLEAN_PHRASES)
+
+
+def _stream_lines(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line or "---" in line:
+                continue
+            yield line_no, line
+
+
+def _file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def ingest_log(db, path, kind):
+    """
+    Streams one log file into the store as a new session. A file whose content
+    was already ingested is skipped. Returns the session id (None if missing).
+    """
+    if not os.path.exists(path):
+        return None
+
+    sha = _file_sha256(path)
+    row = db.execute("SELECT id FROM sessions WHERE sha256 = ?", (sha,)).fetchone()
+    if row:
+        return row[0]
+
+    with db:
+        cur = db.execute(
+            "INSERT INTO sessions (kind, source, sha256, ingested_at) VALUES (?, ?, ?, ?)",
+            (kind, path, sha, datetime.now(timezone.utc).isoformat(timespec="seconds")),
+        )
+        session_id = cur.lastrowid
+
+        if kind == "fssai":
+            rows = ((session_id, n, *parsed) for n, line in _stream_lines(path)
+                    if (parsed := parse_fssai_line(line)))
+            db.executemany("INSERT INTO fssai VALUES (?, ?, ?, ?, ?)", rows)
+        else:
+            tag_rows = []
+
+            def facet_rows():
+                for n, line in _stream_lines(path):
+                    parsed = parse_facet_line(line)
+                    if not parsed:
+                        continue
+                    original, standard, facets, reasoning = parsed
+                    clean = is_clean(facets)
+                    if not clean:
+                        # Tags are extracted once here instead of on every report
+                        for tag in TAG_RE.findall(facets):
+                            key, _, value = tag.partition(":")
+                            tag_rows.append((session_id, original, tag, key, value or None))
+                    yield session_id, n, original, standard, facets, int(clean), reasoning
+
+            db.executemany("INSERT INTO facet_audit VALUES (?, ?, ?, ?, ?, ?, ?)", facet_rows())
+            db.executemany("INSERT INTO facets VALUES (?, ?, ?, ?, ?)", tag_rows)
+
+    return session_id
+
+
+def load_audit_csv(db, csv_file=CSV_FILE):
+    """Mirrors the audit CSV (plus pending journal decisions) so logs can be joined to it."""
+    if not os.path.exists(csv_file):
+        return 0
+
+    from journal import read_state
+
+    rows = read_state(csv_file)
+
+    with db:
+        db.execute("DELETE FROM audit_csv")
+        db.executemany("INSERT INTO audit_csv VALUES (?, ?, ?)",
+                       ((slug, (status or '').lower(), note) for slug, (status, note) in rows.items()))
+    return len(rows)
+
+
+def ingest_all(db, fssai_log=FSSAI_LOG, facet_log=FACET_LOG, csv_file=CSV_FILE):
+    return {
+        "fssai": ingest_log(db, fssai_log, "fssai"),
+        "facets": ingest_log(db, facet_log, "facets"),
+        "csv_rows": load_audit_csv(db, csv_file),
+    }
+
+
+def latest_session(db, kind):
+    row = db.execute("SELECT MAX(id) FROM sessions WHERE kind = ?", (kind,)).fetchone()
+    return row[0]
+
+
+# --- REPORT QUERIES ---
+
+def facet_complexity(db, session_id):
+    """Returns (clean_count, complex_count, clean_samples, complex_samples)."""
+    counts = dict(db.execute(
+        "SELECT is_clean, COUNT(*) FROM facet_audit WHERE session_id = ? GROUP BY is_clean",
+        (session_id,),
+    ).fetchall())
+    clean = [r[0] for r in db.execute(
+        "SELECT slug FROM facet_audit WHERE session_id = ? AND is_clean = 1 ORDER BY line_no LIMIT 5",
+        (session_id,),
+    )]
+    complex_ = [f"{slug} -> {facets}" for slug, facets in db.execute(
+        "SELECT slug, facets_raw FROM facet_audit WHERE session_id = ? AND is_clean = 0 "
+        "ORDER BY line_no LIMIT 5",
+        (session_id,),
+    )]
+    return counts.get(1, 0), counts.get(0, 0), clean, complex_
+
+
+def top_facets(db, session_id, n=10):
+    return db.execute(
+        "SELECT tag, COUNT(*) AS c FROM facets WHERE session_id = ? "
+        "GROUP BY tag ORDER BY c DESC, MIN(rowid) LIMIT ?",
+        (session_id, n),
+    ).fetchall()
+
+
+def approved_needing_source(db, session_id):
+    """Slugs approved in the audit CSV whose facet audit demands a #source declaration."""
+    return [r[0] for r in db.execute(
+        "SELECT DISTINCT f.slug FROM facets f JOIN audit_csv a ON a.slug = f.slug "
+        "WHERE f.session_id = ? AND f.key = '#source' AND a.status = 'approve' ORDER BY f.slug",
+        (session_id,),
+    )]
+
+
+def status_disagreements(db, session_id):
+    """(slug, csv_status, llm_status) where the FSSAI audit disagrees with the CSV."""
+    return db.execute(
+        "SELECT f.slug, a.status, f.status FROM fssai f JOIN audit_csv a ON a.slug = f.slug "
+        "WHERE f.session_id = ? AND a.status != f.status ORDER BY f.slug",
+        (session_id,),
+    ).fetchall()
+
+
+if __name__ == "__main__":
+    db = connect()
+    ingested = ingest_all(db)
+    print(f"✅ Store updated: {STORE_FILE} | {ingested}")
+
+    facet_session = latest_session(db, "facets")
+    if facet_session:
+        needs_source = approved_needing_source(db, facet_session)
+        print(f"\n🏷️  APPROVED BUT NEEDS #source: {len(needs_source)}")
+        for slug in needs_source:
+            print(f"  - {slug}")
+
+    fssai_session = latest_session(db, "fssai")
+    if fssai_session:
+        disagreements = status_disagreements(db, fssai_session)
+        print(f"\n⚖️  CSV vs FSSAI AUDIT DISAGREEMENTS: {len(disagreements)}")
+        for slug, csv_status, llm_status in disagreements[:50]:
+            print(f"  {slug:<35} | {csv_status:<8} -> {llm_status}")
+    db.close()
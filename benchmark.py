@@ -0,0 +1,356 @@
+import os
+import io
+import csv
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import statistics
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+
+from corpus import CATEGORY_NAMES
+from manifest import CACHE_DIR, MANIFEST_FILE
+
+# --- CONFIGURATION ---
+BENCH_DIR = os.path.join(CACHE_DIR, "bench")   # generated corpora live here, reused across runs
+RESULTS_FILE = os.path.join(CACHE_DIR, "benchmark_results.json")
+SIZES = (1000, 10000, 100000)
+REPEAT = 3
+SEED = 42
+THRESHOLD = 0.25           # --compare fails when a median is >25% slower...
+MIN_DELTA = 0.010          # ...and at least 10 ms slower (ignores timer noise)
+SEARCH_QUERIES = 200
+UPDATES = 50
+BATCH_DECISIONS = 1000
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_VERSION = "2"       # bump when the generator changes, so cached corpora are rebuilt
+
+# --- SYNTHETIC CORPUS ---
+
+SYLLABLES = ["ka", "ra", "mi", "na", "po", "shi", "tu", "la", "van", "dha", "gi", "ja", "ko", "me",
+             "sa", "ti", "bu", "ch", "ni", "pa", "ru", "ya", "de", "ha", "lo", "ma", "thi", "ve"]
+SUFFIXES = ["", "", "", "", "-powder", "-oil", "-extract", "-flour", "-seeds", "-leaves",
+            "-flavouring", "-paste", "-dal"]
+FILLER = ("the of and in is a to as for with its used traditional indian kitchens industrial "
+          "regional flavour texture often consumers distinct dried fresh roasted ground sold "
+          "markets products processed sweet bitter aroma colour widely known across states "
+          "recipes snacks beverages dairy festival heat stable stabiliser emulsifier grade").split()
+HEADINGS = ("History & Sourcing", "Culinary Usage", "Industrial Applications", "Consumer Distinction")
+STATUS_WEIGHTS = (("approve", 85), ("flag", 6), ("merge", 3), ("delete", 6))
+FACETS = ["#form:powder", "#form:whole", "#state:dried", "#state:fresh", "#process:roasted",
+          "#grade:food", "#origin:regional", "#fat:low"]
+
+
+def _word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def synthetic_slugs(n, rng):
+    """Unique slugs in the corpus's styles: plain, multi-word, '-ins-950', '2'-...', suffixed."""
+    slugs, seen = [], set()
+    while len(slugs) < n:
+        roll = rng.random()
+        words = [_word(rng) for _ in range(rng.choice((1, 1, 2, 2, 3)))]
+        if roll < 0.12:
+            slug = "-".join(words) + f"-ins-{rng.randint(100, 1521)}"
+        elif roll < 0.14:
+            slug = f"{rng.randint(2, 6)}'-" + "-".join(words)
+        else:
+            slug = "-".join(words) + rng.choice(SUFFIXES)
+        if slug not in seen:
+            seen.add(slug)
+            slugs.append(slug)
+    return slugs
+
+
+def _paragraph(rng, names, words=110):
+    out = [rng.choice(FILLER) for _ in range(words)]
+    # Mentions of other ingredients are what interlink.py finds
+    for _ in range(rng.randint(2, 6)):
+        out.insert(rng.randrange(len(out)), rng.choice(names))
+    return " ".join(out).capitalize() + "."
+
+
+def synthetic_markdown(slug, rng, names):
+    """One of the three layouts found in data/md."""
+    title = slug.replace("-", " ").title()
+    if "-ins-" in slug:
+        title = f"{title.rsplit(' Ins ', 1)[0]} (INS {slug.rsplit('-', 1)[1]})"
+    paragraphs = [_paragraph(rng, names) for _ in HEADINGS]
+    layout = rng.random()
+    if layout < 0.5:
+        return f"# {title}\n\n" + "\n\n".join(paragraphs)
+    if layout < 0.8:
+        return f"### {title}\n\n" + "\n\n".join(paragraphs)
+    return f"# {title}\n\n" + "\n\n".join(f"### {h}\n\n{p}" for h, p in zip(HEADINGS, paragraphs))
+
+
+def generate_corpus(root, n, seed=SEED):
+    """
+    Writes a data/md tree, the audit CSV and a facet audit log for `n`
+    synthetic ingredients under `root`. Deterministic for a given seed;
+    an existing corpus with the same parameters is reused.
+    """
+    marker = os.path.join(root, ".complete")
+    stamp = f"{CORPUS_VERSION}:{n}:{seed}"
+    if os.path.exists(marker) and open(marker).read() == stamp:
+        return root
+    shutil.rmtree(root, ignore_errors=True)
+
+    rng = random.Random(seed)
+    slugs = synthetic_slugs(n, rng)
+    names = [s.replace("-", " ") for s in slugs]
+    categories = sorted(CATEGORY_NAMES)
+    for category in categories:
+        os.makedirs(os.path.join(root, "data", "md", category), exist_ok=True)
+
+    statuses, weights = zip(*STATUS_WEIGHTS)
+    with open(os.path.join(root, "v0.1-v0.2_audit.csv"), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["canon-slug", "status", "note"])
+        for slug in slugs:
+            status = rng.choices(statuses, weights)[0]
+            if status == "approve":
+                note = "NONE"
+            elif status == "merge":
+                note = f"MERGE INTO {rng.choice(slugs)}"
+            else:
+                note = "Too generic, can be bought in a box but not a distinct ingredient, per the 'Box/Bottle Rule'."
+            writer.writerow([slug, status, note])
+
+    for slug in slugs:
+        category = "additives-functional" if "-ins-" in slug else rng.choice(categories)
+        with open(os.path.join(root, "data", "md", category, f"{slug}.md"), 'w', encoding='utf-8') as f:
+            f.write(synthetic_markdown(slug, rng, names))
+
+    with open(os.path.join(root, "ingredient_facets_audit.log"), 'w', encoding='utf-8') as f:
+        f.write("--- INGREDIENT FACET AUDIT START ---\n")
+        for slug in slugs:
+            if rng.random() < 0.6:
+                facets = "No specific facets required"
+            else:
+                facets = ", ".join(rng.sample(FACETS, rng.randint(1, 3)))
+            f.write(f"{slug} :: {slug} :: {facets} :: Sold in several forms.\n")
+
+    with open(marker, 'w') as f:
+        f.write(stamp)
+    return root
+
+
+# --- BENCHMARKS ---
+
+@contextmanager
+def working_dir(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _quiet(fn, *args, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return fn(*args, **kwargs)
+
+
+def _reset(*paths):
+    for path in paths:
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def bench_interlink(cold):
+    import interlink
+    if cold:
+        _reset(interlink.SCAN_CACHE_FILE, MANIFEST_FILE)
+    edges = _quiet(interlink.calculate_strict_potential)
+    return {"edges": len(edges)}
+
+
+def bench_flagger_load():
+    import flagger
+    from slug_index import SlugIndex
+    df = flagger.load_db()
+    SlugIndex(df['canon-slug'])
+    return {"rows": len(df)}
+
+
+def _flagger_state():
+    import flagger
+    from slug_index import SlugIndex
+    df = flagger.load_db()
+    return flagger, df, SlugIndex(df['canon-slug'])
+
+
+def bench_flagger_search(index, queries):
+    hits = sum(len(index.get_close_matches(q, n=10, cutoff=0.1)) for q in queries)
+    return {"queries": len(queries), "hits": hits}
+
+
+def bench_flagger_update(flagger, df, index, slugs):
+    """The interactive path: journal append, in-memory update, compaction check."""
+    from journal import append_decisions, maybe_compact
+    for i in range(0, len(slugs), 2):
+        batch = slugs[i:i + 2]
+        append_decisions([(s, "flag", "benchmark") for s in batch], flagger.DB_FILE)
+        rows = [index.position[s] for s in batch]
+        df.loc[df.index[rows], ['status', 'note']] = ["flag", "benchmark"]
+        maybe_compact(flagger.DB_FILE)
+    return {"updates": len(slugs) // 2}
+
+
+def bench_flagger_batch(decisions_file):
+    import flagger
+    code = _quiet(flagger.run_batch, decisions_file)
+    if code:
+        raise RuntimeError("flagger batch benchmark failed")
+    return {"decisions": BATCH_DECISIONS}
+
+
+def bench_stats():
+    import temp
+    _quiet(temp.print_state_stats)
+    return {}
+
+
+def bench_facets(cold):
+    import audit_store
+    import tempdel1
+    if cold:
+        _reset(audit_store.STORE_FILE)
+    _quiet(tempdel1.analyze_facet_complexity)
+    return {}
+
+
+def time_it(fn, repeat, setup=None):
+    """Runs fn() `repeat` times (after setup(), untimed). Returns (timings, last result)."""
+    timings, result = [], None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def run_size(n, repeat, seed=SEED):
+    """Times every benchmark against the n-ingredient corpus. Returns {name: result}."""
+    root = os.path.join(REPO_DIR, BENCH_DIR, f"corpus-{n}")
+    print(f"\n🧪 Corpus of {n} ingredients ({root})")
+    start = time.perf_counter()
+    generate_corpus(root, n, seed)
+    print(f"   ready in {time.perf_counter() - start:.1f}s")
+
+    # Every run starts from the pristine CSV (updates below write to it)
+    pristine = os.path.join(root, "v0.1-v0.2_audit.csv")
+    work = os.path.join(root, "work")
+    _reset(work)
+    os.makedirs(work)
+    os.symlink(os.path.join(root, "data"), os.path.join(work, "data"))
+    shutil.copy(os.path.join(root, "ingredient_facets_audit.log"), work)
+
+    rng = random.Random(seed)
+    results = {}
+
+    def record(name, timings, extra):
+        results[name] = {"median": statistics.median(timings), "min": min(timings),
+                         "runs": len(timings), **extra}
+        print(f"   {name:<22} median {results[name]['median'] * 1000:9.1f} ms   min {min(timings) * 1000:9.1f} ms")
+
+    def fresh_csv():
+        _reset(os.path.join(work, "v0.1-v0.2_audit.csv.journal"))
+        shutil.copy(pristine, work)
+
+    with working_dir(work):
+        fresh_csv()
+        slugs = [row["canon-slug"] for row in csv.DictReader(open(pristine, encoding='utf-8'))]
+        queries = [rng.choice(slugs).replace("-", " ")[:rng.randint(4, 14)] for _ in range(SEARCH_QUERIES)]
+        decisions_file = os.path.join(work, "decisions.csv")
+        with open(decisions_file, 'w', encoding='utf-8') as f:
+            f.write("slug,action,note,merge_target\n")
+            for slug in rng.sample(slugs, min(BATCH_DECISIONS, len(slugs))):
+                f.write(f"{slug},flag,benchmark,\n")
+
+        record("interlink_cold", *time_it(lambda: bench_interlink(True), repeat))
+        record("interlink_warm", *time_it(lambda: bench_interlink(False), repeat))
+        record("flagger_load", *time_it(bench_flagger_load, repeat))
+
+        flagger, df, index = _flagger_state()
+        record("flagger_search", *time_it(lambda: bench_flagger_search(index, queries), repeat))
+        record("flagger_update", *time_it(
+            lambda: bench_flagger_update(flagger, df, index, rng.sample(slugs, UPDATES * 2)), repeat))
+        record("flagger_batch", *time_it(lambda: bench_flagger_batch(decisions_file), repeat, fresh_csv))
+
+        fresh_csv()
+        record("stats", *time_it(bench_stats, repeat))
+        record("facets_cold", *time_it(lambda: bench_facets(True), repeat))
+        record("facets_warm", *time_it(lambda: bench_facets(False), repeat))
+
+    _reset(work)
+    return results
+
+
+def compare(baseline, current, threshold=THRESHOLD, min_delta=MIN_DELTA):
+    """Returns [(size, name, old, new)] for every benchmark that regressed."""
+    regressions = []
+    print(f"\n{'SIZE':>7} | {'BENCHMARK':<22} | {'BASE ms':>9} | {'NEW ms':>9} | CHANGE")
+    print("-" * 66)
+    for size, benches in current["results"].items():
+        for name, result in benches.items():
+            old = baseline.get("results", {}).get(size, {}).get(name)
+            if not old:
+                continue
+            a, b = old["median"], result["median"]
+            change = (b - a) / a if a else 0.0
+            regressed = change > threshold and b - a > min_delta
+            mark = "❌" if regressed else ""
+            print(f"{size:>7} | {name:<22} | {a * 1000:9.1f} | {b * 1000:9.1f} | {change:+6.1%} {mark}")
+            if regressed:
+                regressions.append((size, name, a, b))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the audit scripts on synthetic corpora")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="comma-separated corpus sizes (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--out", default=RESULTS_FILE, help="where to store this run's results")
+    parser.add_argument("--compare", metavar="BASELINE",
+                        help="compare against a stored results file; exit 1 on regressions")
+    parser.add_argument("--threshold", type=float, default=THRESHOLD,
+                        help="allowed slowdown as a fraction (default: %(default)s)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    run = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": {str(n): run_size(n, args.repeat) for n in sizes},
+    }
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    print(f"\n✅ Results saved to {args.out}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(baseline, run, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}.")
+            sys.exit(1)
+        print("\n✅ No regressions.")
@@ -0,0 +1,196 @@
+import os
+import json
+import sqlite3
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import metrics
+from corpus import MD_DIR, category_name, parse_markdown, extract_keywords
+from manifest import CACHE_DIR, refresh_manifest
+
+# --- CONFIGURATION ---
+CSV_FILE = "v0.1-v0.2_audit.csv"
+MASTER_FILE = "data/ifid_encyclopedia_v010.json"
+# One row per slug, so neither parsing nor writing holds the whole corpus
+RECORD_CACHE_FILE = os.path.join(CACHE_DIR, "master_records.sqlite")
+# Below this many changed files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 64
+PARSE_CHUNK = 32           # files per worker task
+# Fixed field order for every record, whether fresh or read back from the cache
+RECORD_FIELDS = ("ingredient_name", "category", "keywords", "sections")
+
+METADATA = {
+    "title": "Encyclopedia of Indian Food Ingredients",
+    "project": "Indian Food Informatics Data (IFID)",
+    "version": "0.1.0-alpha",
+    "release_date": "2026-02-11",
+    "doi": "https://doi.org/10.13140/RG.2.2.27821.55529",
+    "license": "Open Data Commons Attribution License (ODC-By)",
+    "author": "Lalitha A R",
+    "institution": "Interdisciplinary Systems Research Lab",
+    "documentation": "https://ifid.readthedocs.io/en/latest/",
+    "journal": "https://ifid.substack.com",
+    "contact": "https://ifid.substack.com/about",
+    "description": "A standardized taxonomy of 600+ food components found within the Indian ecosystem, "
+                   "bridging traditional culinary knowledge, Ayurvedic botanicals and industrial FMCG standards.",
+}
+
+
+def parse_record(job):
+    """Worker: parses one markdown file into its (content-only) master record."""
+    slug, path, category_dir = job
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    title, sections = parse_markdown(text, slug)
+    return slug, {
+        "ingredient_name": title,
+        "category": category_name(category_dir),
+        "keywords": extract_keywords(title, sections),
+        "sections": [{"heading": h, "text": b} for h, b in sections],
+    }
+
+
+def parse_records(jobs):
+    """Worker: parse_record() over one chunk of jobs."""
+    return [parse_record(job) for job in jobs]
+
+
+def _parsed(jobs, workers=None):
+    """
+    Yields (slug, record) for every job, in order. Only a couple of chunks
+    per worker are in flight, so finished records never pile up in memory.
+    """
+    if len(jobs) < PARALLEL_THRESHOLD:
+        yield from map(parse_record, jobs)
+        return
+    workers = workers or os.cpu_count() or 1
+    chunks = (jobs[i:i + PARSE_CHUNK] for i in range(0, len(jobs), PARSE_CHUNK))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(parse_records, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def open_records(path=RECORD_CACHE_FILE):
+    """The per-slug record cache: (slug, sha256 of the file, title, record JSON)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    db = sqlite3.connect(path)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS records (
+            slug TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            name TEXT NOT NULL,
+            record TEXT NOT NULL
+        )
+    """)
+    db.commit()
+    return db
+
+
+def load_record(db, slug):
+    (record,) = db.execute("SELECT record FROM records WHERE slug = ?", (slug,)).fetchone()
+    return json.loads(record)
+
+
+def parse_changed(manifest, db, workers=None):
+    """
+    Re-parses only files whose content hash differs from the cached record,
+    writing each record to the cache as it arrives, and drops records for
+    files that no longer exist. Returns how many files were parsed.
+    """
+    known = dict(db.execute("SELECT slug, sha256 FROM records"))
+    jobs = [(slug, e["path"], e["category"]) for slug, e in sorted(manifest.items())
+            if known.get(slug) != e["sha256"]]
+    gone = [(slug,) for slug in known.keys() - manifest.keys()]
+    del known
+
+    rows = ((slug, manifest[slug]["sha256"], record["ingredient_name"], json.dumps(record, ensure_ascii=False))
+            for slug, record in _parsed(jobs, workers))
+    db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)", rows)
+    db.executemany("DELETE FROM records WHERE slug = ?", gone)
+    db.commit()
+    return len(jobs)
+
+
+def write_master(manifest, db, state, out_file):
+    """
+    Streams the master JSON one record at a time through a temp file; each
+    record is read from the cache just before it is written. Categories and
+    ingredients are sorted, so identical inputs produce byte-identical output.
+    """
+    by_category = {}
+    for slug, entry in manifest.items():
+        by_category.setdefault(category_name(entry["category"]), []).append(slug)
+
+    tmp_file = f"{out_file}.tmp"
+    dump = lambda obj: json.dumps(obj, ensure_ascii=False)
+
+    with open(tmp_file, 'w', encoding='utf-8', newline='\n') as f:
+        f.write('{\n  "metadata": ' + dump(METADATA) + ',\n')
+        f.write('  "statistics": ' + dump({
+            "total_categories": len(by_category),
+            "total_ingredients": len(manifest),
+        }) + ',\n')
+        f.write('  "data": {')
+
+        for ci, category in enumerate(sorted(by_category)):
+            f.write(("," if ci else "") + "\n    " + dump(category) + ": {")
+            names = {}
+            for si, slug in enumerate(sorted(by_category[category])):
+                record = load_record(db, slug)
+                record = {k: record[k] for k in RECORD_FIELDS}
+                # The cache is keyed on content; a moved file keeps its hash
+                record["category"] = category
+                # Two files may share a display title; keys must stay unique
+                name = record["ingredient_name"]
+                key = name if name not in names else f"{name} ({slug})"
+                names[key] = slug
+
+                status, note = state.get(slug, (None, None))
+                entry = {"slug": slug, "status": status, "note": note, "json": record}
+                f.write(("," if si else "") + "\n      " + dump(key) + ": " + dump(entry))
+            f.write("\n    }")
+
+        f.write("\n  }\n}\n")
+    os.replace(tmp_file, out_file)
+
+
+def build_master(md_dir=MD_DIR, csv_file=CSV_FILE, out_file=MASTER_FILE, workers=None):
+    from journal import read_state
+
+    with metrics.stage("walk"):
+        manifest, _ = refresh_manifest(md_dir)
+    db = open_records()
+    try:
+        with metrics.stage("parse"):
+            reparsed = parse_changed(manifest, db, workers)
+            metrics.count("files_parsed", reparsed)
+        with metrics.stage("load"):
+            state = read_state(csv_file) if os.path.exists(csv_file) else {}
+        with metrics.stage("write"):
+            write_master(manifest, db, state, out_file)
+    finally:
+        db.close()
+    return reparsed, len(manifest)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the JSON master from data/md and the audit CSV")
+    parser.add_argument("--workers", type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument("--out", default=MASTER_FILE)
+    parser.add_argument("--pack", action="store_true", help="also compile the packed lookup artifact")
+    args = parser.parse_args()
+
+    reparsed, total = build_master(out_file=args.out, workers=args.workers)
+    print(f"✅ Wrote {args.out}: {total} ingredients ({reparsed} re-parsed, {total - reparsed} reused).")
+
+    if args.pack:
+        from encyclopedia import PACK_FILE, compile_pack
+
+        compile_pack(args.out, PACK_FILE)
+        print(f"✅ Compiled {PACK_FILE}")
@@ -0,0 +1,145 @@
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+from corpus import MD_DIR, category_name, parse_markdown
+from manifest import CACHE_DIR, refresh_manifest, load_json_cache, save_json_cache
+
+# --- CONFIGURATION ---
+STATE_FILE = os.path.join(CACHE_DIR, "chunks_state.json")
+# Bumping this changes every chunk ID (use when the chunk format changes)
+CHUNK_VERSION = "1"
+
+
+def approx_tokens(text):
+    # ~4 characters per token, close enough for embedding budgets
+    return len(text) // 4 + 1
+
+
+def chunk_id(slug, section, text):
+    """Content-hash ID: identical content always gets the same ID."""
+    digest = hashlib.sha256(f"{CHUNK_VERSION}\0{slug}\0{section}\0{text}".encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+def _split_paragraphs(text, max_tokens):
+    """Packs whole paragraphs into pieces of at most ~max_tokens."""
+    pieces, current = [], []
+    for paragraph in (p.strip() for p in text.split("\n\n")):
+        if not paragraph:
+            continue
+        if current and approx_tokens("\n\n".join(current + [paragraph])) > max_tokens:
+            pieces.append("\n\n".join(current))
+            current = []
+        current.append(paragraph)
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces or [text]
+
+
+def chunk_file(slug, path, category_dir, max_tokens=None):
+    """Yields the chunks of one markdown file, split on its headings."""
+    with open(path, 'r', encoding='utf-8') as f:
+        title, sections = parse_markdown(f.read(), slug)
+
+    for ordinal, (section, text) in enumerate(sections):
+        pieces = _split_paragraphs(text, max_tokens) if max_tokens else [text]
+        for part, piece in enumerate(pieces):
+            yield {
+                "id": chunk_id(slug, section, piece),
+                "key": f"{slug}#{ordinal}" + (f".{part}" if len(pieces) > 1 else ""),
+                "slug": slug,
+                "category": category_name(category_dir),
+                "title": title,
+                "section": section,
+                "tokens": approx_tokens(piece),
+                "text": piece,
+            }
+
+
+def iter_chunks(manifest, slugs=None, max_tokens=None):
+    """Streams chunks for `slugs` (default: the whole corpus) in slug order."""
+    for slug in sorted(slugs if slugs is not None else manifest):
+        entry = manifest[slug]
+        yield from chunk_file(slug, entry["path"], entry["category"], max_tokens)
+
+
+def iter_diff(manifest, state, max_tokens=None):
+    """
+    Yields {'op': added|changed|removed, ...} records against the previous
+    run's state and updates `state` in place. Files whose content hash is
+    unchanged are not even read.
+    """
+    files = state.setdefault("files", {})
+    if state.get("max_tokens") != max_tokens:
+        # Different chunking means every file must be re-chunked
+        files_to_read = set(manifest)
+    else:
+        files_to_read = {s for s in manifest if files.get(s, {}).get("sha256") != manifest[s]["sha256"]}
+    state["max_tokens"] = max_tokens
+
+    for slug in sorted(files_to_read):
+        old = files.get(slug, {}).get("chunks", {})
+        new = {}
+        for chunk in chunk_file(slug, manifest[slug]["path"], manifest[slug]["category"], max_tokens):
+            new[chunk["key"]] = chunk["id"]
+            if chunk["key"] not in old:
+                yield {"op": "added", **chunk}
+            elif old[chunk["key"]] != chunk["id"]:
+                yield {"op": "changed", "previous_id": old[chunk["key"]], **chunk}
+        for key in sorted(set(old) - set(new)):
+            yield {"op": "removed", "id": old[key], "key": key, "slug": slug}
+        files[slug] = {"sha256": manifest[slug]["sha256"], "chunks": new}
+
+    for slug in sorted(set(files) - set(manifest)):
+        for key, cid in sorted(files[slug]["chunks"].items()):
+            yield {"op": "removed", "id": cid, "key": key, "slug": slug}
+        del files[slug]
+
+
+def recording(chunks, manifest, state):
+    """Passes chunks through while recording them as the state for the next --diff."""
+    state["files"] = {}
+    for chunk in chunks:
+        slug = chunk["slug"]
+        entry = state["files"].setdefault(slug, {"sha256": manifest[slug]["sha256"], "chunks": {}})
+        entry["chunks"][chunk["key"]] = chunk["id"]
+        yield chunk
+
+
+def write_jsonl(records, out):
+    count = 0
+    for record in records:
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream RAG chunks of data/md as JSONL")
+    parser.add_argument("--diff", action="store_true",
+                        help="emit only added/changed/removed chunks since the last run")
+    parser.add_argument("--out", help="output file (default: stdout)")
+    parser.add_argument("--max-tokens", type=int, default=None,
+                        help="further pack long sections into paragraph groups of ~N tokens")
+    parser.add_argument("--no-state", action="store_true", help="do not record this run for --diff")
+    args = parser.parse_args()
+
+    manifest, _ = refresh_manifest(MD_DIR)
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    try:
+        if args.diff:
+            state = load_json_cache(STATE_FILE)
+            count = write_jsonl(iter_diff(manifest, state, args.max_tokens), out)
+        else:
+            state = {"max_tokens": args.max_tokens}
+            count = write_jsonl(recording(iter_chunks(manifest, max_tokens=args.max_tokens), manifest, state), out)
+    finally:
+        if args.out:
+            out.close()
+
+    if not args.no_state:
+        save_json_cache(state, STATE_FILE)
+    print(f"✅ {count} {'change' if args.diff else 'chunk'} record(s) written.", file=sys.stderr)
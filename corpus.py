@@ -0,0 +1,119 @@
+import re
+
+# --- CONFIGURATION ---
+MD_DIR = "data/md"
+
+# data/md/<category>/ directory -> display name used in the JSON master
+CATEGORY_NAMES = {
+    "additives-functional": "Additives & Functional",
+    "dairy-alternatives": "Dairy & Alternatives",
+    "fruits-veg-botanicals": "Fruits, Vegetables & Botanicals",
+    "oils-fats": "Oils & Fats",
+    "proteins-meats": "Proteins & Meats",
+    "spices-seasonings": "Spices & Seasonings",
+    "staples": "Staples",
+    "sweeteners": "Sweeteners",
+}
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+PAREN_RE = re.compile(r"\(([^()]+)\)")
+INS_RE = re.compile(r"\bINS\s*(\d+[a-z]?)\b", re.IGNORECASE)
+# Capitalised italics are names (botanical, regional); lowercase ones are
+# usually plain emphasis and are left out of keywords.
+ITALIC_RE = re.compile(r"(?<![*\w])\*([A-Z][^*\n]{1,40})\*(?![*\w])")
+MAX_KEYWORDS = 12
+
+
+def category_name(category_dir):
+    return CATEGORY_NAMES.get(category_dir, category_dir.replace("-", " ").title())
+
+
+def slug_title(slug):
+    return slug.replace("-", " ").title()
+
+
+def parse_markdown(text, slug=""):
+    """
+    Splits an ingredient file into (title, sections).
+
+    The first heading (any level) is the title; `sections` is a list of
+    (heading, body) in file order. Text before the first sub-heading becomes a
+    section under the title itself, so every file has at least one section.
+    """
+    title = None
+    sections = []
+    heading, body = None, []
+
+    for line in text.splitlines():
+        m = HEADING_RE.match(line)
+        if m:
+            if title is None:
+                title = m.group(2)
+            elif heading is not None or "".join(body).strip():
+                sections.append((heading or title, "\n".join(body).strip()))
+            heading = m.group(2)
+            body = []
+        else:
+            body.append(line)
+
+    title = title or slug_title(slug)
+    if heading is not None or "".join(body).strip():
+        sections.append((heading or title, "\n".join(body).strip()))
+    # A sub-heading that only repeats the title adds nothing
+    sections = [(h, b) for h, b in sections if b or h != title]
+    return title, sections
+
+
+def extract_keywords(title, sections):
+    """Aliases from the title's brackets, INS numbers and capitalised italic names."""
+    keywords = []
+    for alias in PAREN_RE.findall(title):
+        keywords.extend(a.strip() for a in re.split(r"[/,;]", alias) if a.strip())
+    text = "\n".join(b for _, b in sections)
+    for ins in INS_RE.findall(title + "\n" + text):
+        keywords.append(f"INS {ins.lower()}")
+    keywords.extend(m.strip() for m in ITALIC_RE.findall(text))
+
+    seen, unique = set(), []
+    for k in keywords:
+        if k.lower() not in seen:
+            seen.add(k.lower())
+            unique.append(k)
+    return unique[:MAX_KEYWORDS]
+
+
+# Every entry follows the same four-part outline, either under explicit
+# '###' headings or as four untitled paragraphs in this order. Each name is
+# also the word that identifies its heading.
+FIELD_HEADINGS = ("history", "culinary", "industrial", "distinction")
+FIELDS = ("title", "history", "culinary", "industrial", "distinction", "body")
+
+
+def field_texts(title, sections, slug=""):
+    """
+    Maps an entry onto the canonical search fields.
+    Returns {field: text}; text that fits no outline part goes to 'body'.
+    """
+    fields = {"title": f"{title} {slug.replace('-', ' ')}".strip()}
+    leftovers = []
+
+    for heading, body in sections:
+        key = next((f for f in FIELD_HEADINGS if f in heading.lower()), None)
+        if key:
+            fields[key] = (fields.get(key, "") + "\n\n" + body).strip()
+        else:
+            leftovers.append(body)
+
+    if not any(f in fields for f in FIELD_HEADINGS):
+        # Untitled outline: drop bold-only title lines, then map positionally
+        paragraphs = [p.strip() for p in "\n\n".join(leftovers).split("\n\n") if p.strip()]
+        paragraphs = [p for p in paragraphs if not (p.startswith("**") and p.endswith("**"))]
+        if len(paragraphs) == len(FIELD_HEADINGS):
+            for key, paragraph in zip(FIELD_HEADINGS, paragraphs):
+                fields[key] = paragraph
+            leftovers = []
+
+    body = "\n\n".join(b for b in leftovers if b).strip()
+    if body:
+        fields["body"] = body
+    return fields
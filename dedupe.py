@@ -0,0 +1,221 @@
+import os
+import csv
+import zlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from corpus import MD_DIR, category_name
+from manifest import CACHE_DIR, refresh_manifest
+
+# --- CONFIGURATION ---
+CSV_FILE = "v0.1-v0.2_audit.csv"
+OUT_FILE = os.path.join(CACHE_DIR, "merge_suggestions.csv")
+NUM_PERM = 128             # signature length (power of two)
+BANDS = 32                 # 32 bands x 4 rows: pairs above J ~0.45 almost always collide
+MIN_JACCARD = 0.4          # estimated similarity needed to be suggested
+MAX_BUCKET = 64            # larger LSH buckets are boilerplate, not duplicates
+SEED = 1729
+BATCH = 2000               # files hashed together in one vectorized pass
+# Batches go to worker processes once there are this many files
+PARALLEL_THRESHOLD = 20000
+
+EMPTY = np.uint64(0xFFFFFFFF)
+_BIN_SHIFT = np.uint64(64 - NUM_PERM.bit_length() + 1)
+_MASK32 = np.uint64(0xFFFFFFFF)
+# Bytes that belong to a word: [a-z0-9] after lowercasing
+_WORD_BYTE = np.zeros(256, dtype=bool)
+_WORD_BYTE[list(b"abcdefghijklmnopqrstuvwxyz0123456789")] = True
+_POWERS = np.cumprod(np.full(32, 0x100000001B3, dtype=np.uint64))
+
+
+def _mix(h):
+    """splitmix64 finalizer, vectorized (uint64 arithmetic wraps)."""
+    h = (h ^ (h >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return h ^ (h >> np.uint64(31))
+
+
+def shingle_hashes(texts):
+    """
+    Word 3-gram hashes for a batch of texts, all in NumPy.
+    Returns (hashes, doc) where doc[i] is the text each shingle came from.
+    """
+    encoded = [t.lower().encode('utf-8') for t in texts]
+    offsets = np.cumsum([0] + [len(e) + 1 for e in encoded])
+    data = np.frombuffer(b"\n".join(encoded), dtype=np.uint8)
+
+    in_word = _WORD_BYTE[data]
+    chars = np.flatnonzero(in_word)
+    if not len(chars):
+        return np.zeros(0, np.uint64), np.zeros(0, np.int64)
+    starts = np.r_[True, np.diff(chars) > 1]
+    first = np.flatnonzero(starts)
+    word_of_char = np.cumsum(starts) - 1
+    # Polynomial hash of each word: sum of byte * P^position
+    pos = np.minimum(np.arange(len(chars)) - first[word_of_char], len(_POWERS) - 1)
+    words = _mix(np.add.reduceat(data[chars].astype(np.uint64) * _POWERS[pos], first))
+    word_doc = np.searchsorted(offsets, chars[first], side="right") - 1
+
+    if len(words) < 3:
+        return words, word_doc
+    same_doc = word_doc[:-2] == word_doc[2:]
+    h = words[:-2] ^ (words[1:-1] * np.uint64(0x9E3779B97F4A7C15)) ^ (words[2:] * np.uint64(0xC2B2AE3D27D4EB4F))
+    return _mix(h[same_doc]), word_doc[:-2][same_doc]
+
+
+def slug_hashes(slugs):
+    """Character trigram hashes of each slug, so renamed copies still look alike."""
+    hashes, doc = [], []
+    for i, slug in enumerate(slugs):
+        padded = f"  {slug}  "
+        for j in range(len(padded) - 2):
+            hashes.append(zlib.crc32(padded[j:j + 3].encode('utf-8')))
+            doc.append(i)
+    return _mix(np.array(hashes, dtype=np.uint64) + np.uint64(SEED)), np.array(doc, dtype=np.int64)
+
+
+def signatures(hashes, doc, n_docs):
+    """
+    One-permutation MinHash: each shingle hash picks one of NUM_PERM bins
+    (top bits) and competes for that bin's minimum (low 32 bits). Empty
+    bins borrow from the next filled bin to their right (densification),
+    so the cost is one pass over the shingles whatever NUM_PERM is.
+    """
+    sig = np.full(n_docs * NUM_PERM, EMPTY, dtype=np.uint64)
+    np.minimum.at(sig, doc * NUM_PERM + (hashes >> _BIN_SHIFT).astype(np.int64), hashes & _MASK32)
+    sig = sig.reshape(n_docs, NUM_PERM)
+
+    empty = sig == EMPTY
+    if empty.any():
+        cols = np.arange(2 * NUM_PERM)
+        filled = np.where(np.tile(~empty, 2), cols, 2 * NUM_PERM)
+        nearest = np.minimum.accumulate(filled[:, ::-1], axis=1)[:, ::-1][:, :NUM_PERM]
+        nearest = np.minimum(nearest, 2 * NUM_PERM - 1)
+        borrowed = np.take_along_axis(np.tile(sig, 2), nearest, axis=1)
+        distance = (nearest - cols[:NUM_PERM]).astype(np.uint64)
+        sig = np.where(empty, (borrowed + distance * np.uint64(0x9E3779B1)) & _MASK32, sig)
+    return sig.astype(np.uint32)
+
+
+def _signatures_for(jobs):
+    """Worker: [(slug, path)] -> uint32 signature matrix, one row per job."""
+    texts = []
+    for slug, path in jobs:
+        with open(path, 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    body, body_doc = shingle_hashes(texts)
+    slug, slug_doc = slug_hashes([s for s, _ in jobs])
+    return signatures(np.concatenate([body, slug]), np.concatenate([body_doc, slug_doc]), len(jobs))
+
+
+def build_signatures(jobs, workers=None):
+    chunks = [jobs[i:i + BATCH] for i in range(0, len(jobs), BATCH)] or [[]]
+    if len(jobs) < PARALLEL_THRESHOLD or workers == 1:
+        return np.vstack([_signatures_for(c) for c in chunks])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.vstack(list(pool.map(_signatures_for, chunks)))
+
+
+def lsh_candidates(sigs, bands=BANDS, max_bucket=MAX_BUCKET):
+    """
+    Candidate pairs (i < j) whose signatures agree on at least one full band.
+    Bands are hashed and grouped with a sort instead of Python dicts.
+    """
+    n = len(sigs)
+    rows = sigs.shape[1] // bands
+    rng = np.random.default_rng(SEED + 1)
+    weights = rng.integers(1, 2**63, size=rows, dtype=np.uint64) | np.uint64(1)
+
+    pairs = []
+    for band in range(bands):
+        block = sigs[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        keys = (block * weights).sum(axis=1) ^ np.uint64(band)
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        # Boundaries of runs of equal keys
+        starts = np.flatnonzero(np.r_[True, sorted_keys[1:] != sorted_keys[:-1]])
+        sizes = np.diff(np.r_[starts, n])
+        useful = (sizes >= 2) & (sizes <= max_bucket)
+        for s, size in zip(starts[useful], sizes[useful]):
+            e = s + size
+            members = np.sort(order[s:e])
+            ii, jj = np.triu_indices(size, k=1)
+            pairs.append(np.stack([members[ii], members[jj]], axis=1))
+
+    if not pairs:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.unique(np.vstack(pairs), axis=0)
+
+
+def slug_similarity(a, b):
+    ga = {a[i:i + 3] for i in range(len(a) - 2)}
+    gb = {b[i:i + 3] for i in range(len(b) - 2)}
+    return len(ga & gb) / len(ga | gb) if ga | gb else 0.0
+
+
+def find_near_duplicates(manifest, min_jaccard=MIN_JACCARD, workers=None):
+    """Returns [(jaccard, slug_a, slug_b)] sorted by estimated Jaccard, best first."""
+    slugs = sorted(manifest)
+    jobs = [(s, manifest[s]["path"]) for s in slugs]
+    sigs = build_signatures(jobs, workers)
+
+    pairs = lsh_candidates(sigs)
+    if not len(pairs):
+        return []
+    # Estimated Jaccard = fraction of agreeing MinHash values, for all pairs at once
+    est = (sigs[pairs[:, 0]] == sigs[pairs[:, 1]]).mean(axis=1)
+    keep = est >= min_jaccard
+    pairs, est = pairs[keep], est[keep]
+    order = np.lexsort((pairs[:, 1], pairs[:, 0], -est))
+    return [(float(est[k]), slugs[pairs[k, 0]], slugs[pairs[k, 1]]) for k in order]
+
+
+def pick_target(a, b, statuses):
+    """Merge into the approved entry if only one is approved, else into the shorter slug."""
+    approved_a = statuses.get(a) == "approve"
+    approved_b = statuses.get(b) == "approve"
+    if approved_a != approved_b:
+        return (b, a) if approved_a else (a, b)
+    return (b, a) if (len(a), a) <= (len(b), b) else (a, b)
+
+
+def write_suggestions(duplicates, manifest, statuses, out_file=OUT_FILE):
+    """
+    Writes a ranked merge-suggestion file in flagger.py's batch format
+    (slug,action,note,merge_target), ready for review and 'flagger.py --batch'.
+    """
+    os.makedirs(os.path.dirname(out_file) or ".", exist_ok=True)
+    with open(out_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(["slug", "action", "note", "merge_target"])
+        for jaccard, a, b in duplicates:
+            source, target = pick_target(a, b, statuses)
+            cats = {category_name(manifest[a]["category"]), category_name(manifest[b]["category"])}
+            note = (f"near-duplicate of {target}: content J~{jaccard:.2f}, "
+                    f"slug sim {slug_similarity(a, b):.2f}, {' / '.join(sorted(cats))}")
+            writer.writerow([source, "merge", note, target])
+    return len(duplicates)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find near-duplicate ingredients (MinHash + LSH)")
+    parser.add_argument("--min-jaccard", type=float, default=MIN_JACCARD)
+    parser.add_argument("--out", default=OUT_FILE)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    from journal import read_state
+
+    manifest, _ = refresh_manifest(MD_DIR)
+    statuses = {s: st.lower() for s, (st, _) in read_state(CSV_FILE).items()} if os.path.exists(CSV_FILE) else {}
+    # Entries already slated for deletion or merging are not suggested again
+    live = {s: e for s, e in manifest.items() if statuses.get(s) not in ("delete", "merge")}
+
+    duplicates = find_near_duplicates(live, args.min_jaccard, args.workers)
+    write_suggestions(duplicates, live, statuses, args.out)
+
+    print(f"🔍 {len(duplicates)} merge candidate pair(s) written to {args.out}")
+    for jaccard, a, b in duplicates[:20]:
+        print(f"  {jaccard:.2f}  {a:<35} ~ {b}")
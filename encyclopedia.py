@@ -0,0 +1,249 @@
+import os
+import mmap
+import json
+import zlib
+import struct
+import argparse
+
+from manifest import CACHE_DIR
+
+# --- CONFIGURATION ---
+MASTER_FILE = "data/ifid_encyclopedia_v010.json"
+PACK_FILE = os.path.join(CACHE_DIR, "encyclopedia.pack")
+
+# Packed layout (all integers little-endian):
+#   header   MAGIC, version, n_entries, n_buckets, buckets_off, entries_off, categories_off, categories_len
+#   buckets  n_buckets x u32 -> entry index + 1 (0 = empty), open addressing on crc32(slug)
+#   entries  n_entries x (slug_off u64, slug_len u32, meta_off u64, meta_len u32)
+#   blobs    slug bytes, per-entry JSON meta, raw UTF-8 section texts, category index JSON
+MAGIC = b"IFIDPK01"
+VERSION = 1
+HEADER = struct.Struct("<8sIIIQQQI")
+BUCKET = struct.Struct("<I")
+ENTRY = struct.Struct("<QIQI")
+
+
+def _bucket_count(n):
+    size = 8
+    while size < 2 * n:
+        size *= 2
+    return size
+
+
+def compile_pack(master_file=MASTER_FILE, pack_file=PACK_FILE):
+    """Compiles the JSON master into the read-only packed artifact. Returns the entry count."""
+    with open(master_file, 'r', encoding='utf-8') as f:
+        master = json.load(f)
+
+    entries = []
+    for category, ingredients in sorted(master["data"].items()):
+        for name, entry in sorted(ingredients.items(), key=lambda kv: kv[1]["slug"]):
+            entries.append((category, entry))
+    entries.sort(key=lambda e: e[1]["slug"])
+
+    n = len(entries)
+    n_buckets = _bucket_count(n)
+    buckets_off = HEADER.size
+    entries_off = buckets_off + n_buckets * BUCKET.size
+    blob_off = entries_off + n * ENTRY.size
+
+    blobs = bytearray()
+    entry_rows = []
+    categories = {}
+
+    for i, (category, entry) in enumerate(entries):
+        record = entry["json"]
+        slug_bytes = entry["slug"].encode('utf-8')
+        slug_off = blob_off + len(blobs)
+        blobs += slug_bytes
+
+        # Section bodies are stored raw and only referenced from the meta blob,
+        # so reading an entry never decodes its text.
+        section_refs = []
+        for section in record.get("sections", []):
+            text = section["text"].encode('utf-8')
+            section_refs.append([section["heading"], blob_off + len(blobs), len(text)])
+            blobs += text
+
+        meta = json.dumps({
+            "slug": entry["slug"],
+            "ingredient_name": record["ingredient_name"],
+            "category": category,
+            "status": entry.get("status"),
+            "note": entry.get("note"),
+            "keywords": record.get("keywords", []),
+            "sections": section_refs,
+        }, ensure_ascii=False).encode('utf-8')
+        meta_off = blob_off + len(blobs)
+        blobs += meta
+
+        entry_rows.append((slug_off, len(slug_bytes), meta_off, len(meta)))
+        categories.setdefault(category, []).append(entry["slug"])
+
+    table = [0] * n_buckets
+    for i, (category, entry) in enumerate(entries):
+        b = zlib.crc32(entry["slug"].encode('utf-8')) & (n_buckets - 1)
+        while table[b]:
+            b = (b + 1) & (n_buckets - 1)
+        table[b] = i + 1
+
+    cat_blob = json.dumps(categories, ensure_ascii=False, sort_keys=True).encode('utf-8')
+    categories_off = blob_off + len(blobs)
+    blobs += cat_blob
+
+    os.makedirs(os.path.dirname(pack_file) or ".", exist_ok=True)
+    tmp_file = f"{pack_file}.tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, n, n_buckets, buckets_off, entries_off,
+                            categories_off, len(cat_blob)))
+        f.write(struct.pack(f"<{n_buckets}I", *table))
+        for row in entry_rows:
+            f.write(ENTRY.pack(*row))
+        f.write(blobs)
+    os.replace(tmp_file, pack_file)
+    return n
+
+
+class Sections:
+    """
+    Lazy view of an ingredient's sections: headings are known up front,
+    section text is decoded from the mapped file only when indexed.
+    Index by position or by heading (first match).
+    """
+
+    def __init__(self, data, refs):
+        self._data = data
+        self._refs = refs
+
+    @property
+    def headings(self):
+        return [h for h, _, _ in self._refs]
+
+    def __len__(self):
+        return len(self._refs)
+
+    def _text(self, ref):
+        _, off, length = ref
+        return self._data[off:off + length].decode('utf-8')
+
+    def __getitem__(self, key):
+        if isinstance(key, int):
+            return self._text(self._refs[key])
+        for ref in self._refs:
+            if ref[0] == key:
+                return self._text(ref)
+        raise KeyError(key)
+
+    def __contains__(self, heading):
+        return any(h == heading for h, _, _ in self._refs)
+
+    def items(self):
+        for ref in self._refs:
+            yield ref[0], self._text(ref)
+
+
+class Encyclopedia:
+    """
+    Read-only, memory-mapped lookup over the compiled pack.
+
+    Opening only reads the fixed header; lookups hash the slug into the
+    on-disk bucket table (O(1)), and nothing but the pages touched by a
+    lookup is ever brought into memory.
+    """
+
+    def __init__(self, path=PACK_FILE):
+        self._file = open(path, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self._n, self._n_buckets, self._buckets_off, self._entries_off,
+         self._categories_off, self._categories_len) = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not an encyclopedia pack (v{VERSION})")
+
+    def close(self):
+        if getattr(self, "_data", None) is not None:
+            self._data.close()
+            self._data = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._n
+
+    def _find(self, slug):
+        """Returns (meta_off, meta_len) for `slug`, or None."""
+        key = slug.encode('utf-8')
+        mask = self._n_buckets - 1
+        b = zlib.crc32(key) & mask
+        data = self._data
+        while True:
+            (slot,) = BUCKET.unpack_from(data, self._buckets_off + b * BUCKET.size)
+            if not slot:
+                return None
+            slug_off, slug_len, meta_off, meta_len = ENTRY.unpack_from(
+                data, self._entries_off + (slot - 1) * ENTRY.size)
+            if slug_len == len(key) and data[slug_off:slug_off + slug_len] == key:
+                return meta_off, meta_len
+            b = (b + 1) & mask
+
+    def _meta(self, slug):
+        found = self._find(slug)
+        if found is None:
+            return None
+        off, length = found
+        return json.loads(self._data[off:off + length])
+
+    def __contains__(self, slug):
+        return self._find(slug) is not None
+
+    def get(self, slug, default=None):
+        """Ingredient metadata (name, category, status, note, keywords, section headings)."""
+        meta = self._meta(slug)
+        if meta is None:
+            return default
+        meta["sections"] = [h for h, _, _ in meta["sections"]]
+        return meta
+
+    def sections(self, slug):
+        """Lazy Sections view for `slug` (KeyError if unknown)."""
+        meta = self._meta(slug)
+        if meta is None:
+            raise KeyError(slug)
+        return Sections(self._data, meta["sections"])
+
+    def by_category(self, category=None):
+        """{category: [slugs]}, or the slug list of a single category."""
+        off = self._categories_off
+        index = json.loads(self._data[off:off + self._categories_len])
+        return index if category is None else index.get(category, [])
+
+    def slugs(self):
+        for i in range(self._n):
+            slug_off, slug_len, _, _ = ENTRY.unpack_from(self._data, self._entries_off + i * ENTRY.size)
+            yield self._data[slug_off:slug_off + slug_len].decode('utf-8')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile or query the packed encyclopedia")
+    parser.add_argument("slug", nargs="?", help="print one ingredient instead of compiling")
+    parser.add_argument("--master", default=MASTER_FILE)
+    parser.add_argument("--pack", default=PACK_FILE)
+    args = parser.parse_args()
+
+    if args.slug:
+        with Encyclopedia(args.pack) as enc:
+            entry = enc.get(args.slug)
+            if entry is None:
+                print(f"❌ '{args.slug}' not found.")
+            else:
+                print(json.dumps(entry, ensure_ascii=False, indent=2))
+                for heading, text in enc.sections(args.slug).items():
+                    print(f"\n### {heading}\n{text}")
+    else:
+        count = compile_pack(args.master, args.pack)
+        print(f"✅ Compiled {count} ingredients into {args.pack}")
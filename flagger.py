@@ -1,26 +1,157 @@
 import os
-import pandas as pd
-import difflib
+import sys
+import csv
+import argparse
+from collections import Counter
+
+from journal import load_with_journal, append_decisions, maybe_compact
+from slug_index import SlugIndex
 
 # --- CONFIGURATION ---
 DB_FILE = "v0.1-v0.2_audit.csv"
 
+# Accepted spellings for each action in batch decision files
+ACTIONS = {
+    'a': 'approve', 'approve': 'approve',
+    'f': 'flag', 'flag': 'flag',
+    'm': 'merge', 'merge': 'merge',
+    'd': 'delete', 'delete': 'delete',
+}
+
 def load_db():
-    """Purely loads the CSV file. No disk syncing or extra logic."""
+    """Loads the last CSV snapshot with pending journal decisions replayed over it."""
     if not os.path.exists(DB_FILE):
         print(f"❌ Error: {DB_FILE} not found.")
         return None
     
-    df = pd.read_csv(DB_FILE)
-    # Ensure slug column is treated as string to prevent search errors
-    df['canon-slug'] = df['canon-slug'].astype(str)
-    return df
+    # Slug column is treated as string to prevent search errors
+    return load_with_journal(DB_FILE)
+
+def parse_decisions(lines):
+    """
+    Parses batch decision lines into (line_no, slug, action, note, target) tuples.
+
+    Two formats are accepted, one decision per line:
+      - CSV: slug,action[,note[,merge_target]]   (a header row is skipped)
+      - LLM audit log: slug :: status :: reason   (bullets, bold and
+        '[STATUS]' brackets as models write them are accepted)
+    Blank lines, '#' comments and '---' session markers are ignored.
+    """
+    decisions = []
+    for line_no, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line or line.startswith('#') or line.startswith('---'):
+            continue
+
+        if ' :: ' in line:
+            # Same clean-up as audit_runner.parse_response: raw model output
+            # carries bullets, bold and '[APPROVE]'-style statuses
+            line = line.lstrip("-*• ").replace("**", "").strip()
+            fields = [p.strip() for p in line.split(' :: ', 2)]
+            fields[1] = fields[1].strip("[] ")
+        else:
+            fields = [p.strip() for p in next(csv.reader([line]))]
+            # The header is recognised by its columns, wherever it appears
+            if [f.lower() for f in fields[:2]] in (['slug', 'action'], ['canon-slug', 'status'],
+                                                   ['slug', 'status'], ['canon-slug', 'action']):
+                continue
+
+        fields += [''] * (4 - len(fields))
+        slug, action, note, target = fields[:4]
+        decisions.append((line_no, slug, action.lower(), note, target))
+    return decisions
+
+def validate_decisions(decisions, index):
+    """Checks every slug, action and merge target against the table. Returns (valid, errors)."""
+    valid, errors = [], []
+    for line_no, slug, action, note, target in decisions:
+        status = ACTIONS.get(action)
+        if slug not in index:
+            errors.append(f"line {line_no}: unknown slug '{slug}'")
+        elif status is None:
+            errors.append(f"line {line_no}: unknown action '{action}' for '{slug}'")
+        elif status == 'merge':
+            # Accept the target either in its own column or as 'MERGE INTO <slug>'
+            target = target or note.upper().replace('MERGE INTO', '').strip().lower()
+            if target not in index:
+                errors.append(f"line {line_no}: merge target '{target}' for '{slug}' is not in the table")
+            elif target == slug:
+                errors.append(f"line {line_no}: '{slug}' cannot be merged into itself")
+            else:
+                valid.append((slug, status, f"MERGE INTO {target}"))
+        elif status == 'approve':
+            valid.append((slug, status, note or "NONE"))
+        else:
+            valid.append((slug, status, note))
+    return valid, errors
+
+def run_batch(source, dry_run=False):
+    """Applies a whole decisions file (or '-' for stdin) as one validated update."""
+    df = load_db()
+    if df is None or df.empty:
+        return 1
+    index = SlugIndex(df['canon-slug'])
+
+    if source == '-':
+        decisions = parse_decisions(sys.stdin)
+    else:
+        with open(source, 'r', encoding='utf-8') as f:
+            decisions = parse_decisions(f)
+
+    valid, errors = validate_decisions(decisions, index)
+    if errors:
+        print(f"❌ {len(errors)} invalid decision(s); nothing was applied:")
+        for err in errors[:50]:
+            print(f"  - {err}")
+        if len(errors) > 50:
+            print(f"  ... and {len(errors) - 50} more")
+        return 1
+
+    # Later lines win when a slug appears more than once
+    latest = {slug: (status, note) for slug, status, note in valid}
+    slugs = list(latest)
+    rows = df.index[[index.position[s] for s in slugs]]
+    new = [latest[s] for s in slugs]
+    old = df.loc[rows, ['status', 'note']].astype(str).values.tolist()
+
+    changes = [(s, o, n) for s, o, n in zip(slugs, old, new) if tuple(o) != tuple(map(str, n))]
+
+    print(f"\n--- Batch Decisions: {len(decisions)} line(s), {len(slugs)} slug(s), {len(changes)} change(s) ---")
+    # A dry run shows the full diff; a real run only the first 100 rows
+    shown = changes if dry_run else changes[:100]
+    for slug, (old_status, old_note), (status, note) in shown:
+        print(f"{slug:<35} | {old_status:<8} -> {status:<8} | {note}")
+    if not dry_run and len(changes) > 100:
+        print(f"... and {len(changes) - 100} more")
+
+    summary = Counter(status for _, _, (status, _) in changes)
+    print("-" * 55)
+    for status, count in summary.most_common():
+        print(f"{status.upper():<15} | {count}")
+
+    if dry_run:
+        print("🔎 Dry run: nothing was written.")
+        return 0
+    if not changes:
+        print("✅ Nothing to update.")
+        return 0
+
+    # One journal write for the whole batch
+    append_decisions([(s, status, note) for s, _, (status, note) in changes], DB_FILE)
+    if maybe_compact(DB_FILE):
+        print(f"🗜️  Journal compacted into {DB_FILE}.")
+
+    print(f"✅ Batch updated {len(changes)} items.")
+    return 0
 
 def main():
     df = load_db()
     if df is None or df.empty:
         return
 
+    # Build the fuzzy search index once; every query below reuses it
+    index = SlugIndex(df['canon-slug'])
+
     print("\n--- Bulk Encyclopedia Auditor (CSV Search) ---")
     print("Tip: Enter ingredients separated by commas (e.g., fat, flour, fiber)")
 
@@ -36,9 +167,8 @@ def main():
 
         # 1. Selection Phase: Search purely in the CSV's 'canon-slug' column
         for q in queries:
-            all_slugs = df['canon-slug'].tolist()
-            # Uses difflib to find matches within the existing CSV rows
-            matches = difflib.get_close_matches(q, all_slugs, n=10, cutoff=0.1)
+            # Ranked n-gram lookup (handles hyphen/space variants and INS numbers)
+            matches = index.get_close_matches(q, n=10, cutoff=0.1)
 
             if not matches:
                 print(f"❌ No matches found for '{q}'")
@@ -47,7 +177,7 @@ def main():
             print(f"\nResults for '{q}':")
             for i, m in enumerate(matches):
                 # Locates the existing row data for the match
-                curr = df.loc[df['canon-slug'] == m].iloc[0]
+                curr = df.iloc[index.position[m]]
                 print(f"[{i}] {m:<35} | {curr['status']:<8} | {curr['note']}")
 
             choice = input(f"Select index for '{q}' (or 's' to skip): ")
@@ -82,14 +212,29 @@ def main():
             print("Skipping bulk update.")
             continue
 
-        # 3. Batch Update: Writes results back to the CSV
+        # 3. Batch Update: Appends the decisions to the journal (safe across
+        # concurrent sessions), then mirrors them in the in-memory table
         if status:
-            for slug in selected_targets:
-                df.loc[df['canon-slug'] == slug, 'status'] = status
-                df.loc[df['canon-slug'] == slug, 'note'] = note
+            append_decisions([(slug, status, note) for slug in selected_targets], DB_FILE)
+            rows = [index.position[slug] for slug in selected_targets]
+            df.loc[df.index[rows], ['status', 'note']] = [status, note]
 
-            df.to_csv(DB_FILE, index=False)
+            if maybe_compact(DB_FILE):
+                print(f"🗜️  Journal compacted into {DB_FILE}.")
             print(f"✅ Batch updated {len(selected_targets)} items to {status.upper()}.")
 
-if __name__ == "__main__":
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk Encyclopedia Auditor")
+    parser.add_argument("--batch", metavar="FILE",
+                        help="apply decisions from FILE ('-' for stdin) instead of prompting")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="with --batch, print the diff and summary without writing")
+    args = parser.parse_args(argv)
+
+    if args.batch:
+        return run_batch(args.batch, dry_run=args.dry_run)
     main()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,224 @@
+import os
+import json
+import argparse
+from xml.sax.saxutils import escape, quoteattr
+
+import numpy as np
+
+from corpus import MD_DIR, category_name
+from manifest import CACHE_DIR, refresh_manifest
+
+# --- CONFIGURATION ---
+JSON_FILE = os.path.join(CACHE_DIR, "ifid_graph.json")
+GRAPHML_FILE = os.path.join(CACHE_DIR, "ifid_graph.graphml")
+DAMPING = 0.85
+TOLERANCE = 1e-10
+MAX_ITER = 100
+MISSING_CATEGORY = "(no markdown file)"
+
+
+class LinkGraph:
+    """
+    Directed ingredient graph in CSR form.
+
+    `indptr`/`indices` hold the out-links of each node (node i links to
+    indices[indptr[i]:indptr[i + 1]]); every analytic below is a handful
+    of NumPy passes over the edge arrays, so the cost is linear in edges.
+    """
+
+    def __init__(self, nodes, edges, categories=None):
+        self.nodes = list(nodes)
+        self.index = {slug: i for i, slug in enumerate(self.nodes)}
+        n = len(self.nodes)
+
+        index = self.index
+        keys = np.fromiter((index[s] * n + index[t] for s, t in edges
+                            if s != t and s in index and t in index), dtype=np.int64)
+        # One int64 per edge: unique() sorts by (source, target) and drops duplicates
+        keys = np.unique(keys)
+        self.src, self.dst = keys // max(n, 1), keys % max(n, 1)
+        self.indptr = np.r_[0, np.cumsum(np.bincount(self.src, minlength=n))]
+        self.indices = self.dst
+
+        categories = categories or {}
+        self.category_names = sorted({categories.get(s, MISSING_CATEGORY) for s in self.nodes})
+        cat_index = {c: i for i, c in enumerate(self.category_names)}
+        self.category = np.array([cat_index[categories.get(s, MISSING_CATEGORY)] for s in self.nodes],
+                                 dtype=np.int64)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def edge_count(self):
+        return len(self.src)
+
+    def successors(self, slug):
+        i = self.index[slug]
+        return [self.nodes[j] for j in self.indices[self.indptr[i]:self.indptr[i + 1]]]
+
+    def out_degree(self):
+        return np.diff(self.indptr)
+
+    def in_degree(self):
+        return np.bincount(self.dst, minlength=len(self))
+
+    def pagerank(self, damping=DAMPING, tol=TOLERANCE, max_iter=MAX_ITER):
+        """Power iteration; rank held by dead ends is spread evenly over all nodes."""
+        n = len(self)
+        if not n:
+            return np.zeros(0)
+        out = self.out_degree()
+        dangling = out == 0
+        inv_out = np.where(dangling, 0.0, 1.0 / np.maximum(out, 1))
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            flow = np.bincount(self.dst, weights=(rank * inv_out)[self.src], minlength=n)
+            new = (1.0 - damping) / n + damping * (flow + rank[dangling].sum() / n)
+            delta = np.abs(new - rank).sum()
+            rank = new
+            if delta < tol:
+                break
+        return rank
+
+    def orphans(self):
+        """Nodes nobody links to."""
+        return [self.nodes[i] for i in np.flatnonzero(self.in_degree() == 0)]
+
+    def dead_ends(self):
+        """Nodes that link to nothing."""
+        return [self.nodes[i] for i in np.flatnonzero(self.out_degree() == 0)]
+
+    def components(self):
+        """
+        Weakly connected component label per node (labels are the smallest
+        node index in the component). Min-label propagation with pointer
+        jumping: each round is two passes over the edges.
+        """
+        labels = np.arange(len(self))
+        while True:
+            previous = labels.copy()
+            np.minimum.at(labels, self.src, labels[self.dst])
+            np.minimum.at(labels, self.dst, labels[self.src])
+            while True:
+                jumped = labels[labels]
+                if np.array_equal(jumped, labels):
+                    break
+                labels = jumped
+            if np.array_equal(labels, previous):
+                return labels
+
+    def component_sizes(self):
+        """[(size, [slugs])] largest first."""
+        labels = self.components()
+        groups = {}
+        for i, label in enumerate(labels):
+            groups.setdefault(label, []).append(self.nodes[i])
+        return sorted(((len(g), g) for g in groups.values()), key=lambda x: (-x[0], x[1][0]))
+
+    def category_matrix(self):
+        """Link counts between categories: matrix[a, b] = links from category a into b."""
+        c = len(self.category_names)
+        flat = self.category[self.src] * c + self.category[self.dst]
+        return np.bincount(flat, minlength=c * c).reshape(c, c)
+
+    def analytics(self):
+        """Everything the knowledge-graph loader needs, as plain JSON-able data."""
+        rank = self.pagerank()
+        in_deg, out_deg = self.in_degree(), self.out_degree()
+        labels = self.components()
+        matrix = self.category_matrix()
+        return {
+            "nodes": [{
+                "slug": slug,
+                "category": self.category_names[self.category[i]],
+                "pagerank": float(rank[i]),
+                "in_degree": int(in_deg[i]),
+                "out_degree": int(out_deg[i]),
+                "component": int(labels[i]),
+            } for i, slug in enumerate(self.nodes)],
+            "edges": [[self.nodes[s], self.nodes[t]] for s, t in zip(self.src, self.dst)],
+            "orphans": self.orphans(),
+            "dead_ends": self.dead_ends(),
+            "components": len(np.unique(labels)),
+            "category_matrix": {
+                "categories": self.category_names,
+                "links": matrix.tolist(),
+            },
+        }
+
+
+def export_json(graph, path=JSON_FILE, analytics=None):
+    data = analytics or graph.analytics()
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_file, path)
+
+
+def export_graphml(graph, path=GRAPHML_FILE, analytics=None):
+    """GraphML with the per-node analytics as node attributes."""
+    data = analytics or graph.analytics()
+    keys = [("category", "string"), ("pagerank", "double"), ("in_degree", "int"),
+            ("out_degree", "int"), ("component", "int")]
+
+    tmp_file = f"{path}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n')
+        for name, kind in keys:
+            f.write(f'  <key id="{name}" for="node" attr.name="{name}" attr.type="{kind}"/>\n')
+        f.write('  <graph id="ifid" edgedefault="directed">\n')
+        for node in data["nodes"]:
+            f.write(f'    <node id={quoteattr(node["slug"])}>')
+            f.write("".join(f'<data key="{name}">{escape(str(node[name]))}</data>' for name, _ in keys))
+            f.write('</node>\n')
+        for source, target in data["edges"]:
+            f.write(f'    <edge source={quoteattr(source)} target={quoteattr(target)}/>\n')
+        f.write('  </graph>\n</graphml>\n')
+    os.replace(tmp_file, path)
+
+
+def load_graph(edges=None):
+    """Builds the graph over all approved slugs from interlink.py's edges."""
+    from interlink import load_approved_slugs, scan_edges
+
+    manifest, _ = refresh_manifest(MD_DIR)
+    approved = load_approved_slugs()
+    if edges is None:
+        edges, _, _ = scan_edges(approved, manifest)
+    nodes = sorted(approved)
+    categories = {s: category_name(manifest[s]["category"]) for s in nodes if s in manifest}
+    return LinkGraph(nodes, edges, categories)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Graph analytics over interlink edges")
+    parser.add_argument("--json", default=JSON_FILE, help="JSON export path ('' to skip)")
+    parser.add_argument("--graphml", default=GRAPHML_FILE, help="GraphML export path ('' to skip)")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    graph = load_graph()
+    result = graph.analytics()
+
+    print(f"\n🕸️  {len(graph)} nodes, {graph.edge_count} edges, {result['components']} component(s)")
+    print(f"   Orphans (no incoming links): {len(result['orphans'])}")
+    print(f"   Dead ends (no outgoing links): {len(result['dead_ends'])}")
+    print("-" * 55)
+    print(f"{'Top PageRank':<35} | {'Rank':>8} | In")
+    for node in sorted(result["nodes"], key=lambda x: -x["pagerank"])[:args.top]:
+        print(f"{node['slug']:<35} | {node['pagerank']:8.5f} | {node['in_degree']}")
+
+    print("-" * 55)
+    print("Links between categories (row -> column):")
+    names = result["category_matrix"]["categories"]
+    for name, row in zip(names, result["category_matrix"]["links"]):
+        print(f"  {name[:30]:<30} " + " ".join(f"{v:5d}" for v in row))
+
+    if args.json:
+        export_json(graph, args.json, result)
+        print(f"✅ Wrote {args.json}")
+    if args.graphml:
+        export_graphml(graph, args.graphml, result)
+        print(f"✅ Wrote {args.graphml}")
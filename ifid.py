@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+ifid: one entry point for the encyclopedia scripts.
+
+    ifid stats                      status summary of the audit CSV
+    ifid audit [--batch FILE]       interactive (or batch) auditor
+    ifid search QUERY [-k N]        full-text search over data/md
+    ifid interlink                  interlink potential report
+    ifid facets                     facet complexity report
+    ifid apply [--dry-run]          apply delete/merge decisions to the corpus
+    ifid resolve [--batch FILE]     map label declarations to slugs
+    ifid snapshot {save,diff} ...   snapshot / diff corpus and audit state
+    ifid llm-audit {fssai,facets}   run an LLM audit pass
+
+Only this file and argparse load at start-up; each subcommand imports its
+own module (and with it pandas, NumPy or the Gemini SDK) when it runs.
+
+Global options go before the command:
+    ifid --metrics run.prom interlink       stage timers/counters (.prom or JSON)
+    ifid --profile cprofile search masala   cProfile (or 'sample') the command
+"""
+import os
+import sys
+import argparse
+import importlib
+
+# name -> (module, function, takes its own arguments, help)
+COMMANDS = {
+    "stats": ("temp", "print_state_stats", False, "status summary of the audit CSV"),
+    "audit": ("flagger", "cli", True, "interactive auditor; --batch FILE applies a decisions file"),
+    "search": ("search_index", "cli", True, "full-text search over the markdown corpus"),
+    "interlink": ("interlink", "calculate_strict_potential", False, "interlink potential report"),
+    "facets": ("tempdel1", "analyze_facet_complexity", False, "facet complexity report from the audit log"),
+    "apply": ("apply", "cli", True, "apply delete/merge decisions to data/md, slug_list.py and the master"),
+    "resolve": ("resolver", "cli", True, "resolve label ingredient declarations to slugs (JSONL with --batch)"),
+    "snapshot": ("snapshot", "cli", True, "snapshot the corpus and audit state, or diff snapshots/git revisions"),
+}
+# Options whose value is a file, and commands whose existing-file positionals
+# are files (snapshot files for 'snapshot diff'); these are made absolute
+# against the caller's directory before ifid moves to the repository root
+PATH_OPTIONS = {"--batch", "--out", "--metrics", "--profile-out"}
+PATH_POSITIONALS = {"snapshot"}
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+LLM_AUDITS = {
+    "fssai": ("temp2", "run_fssai_audit"),
+    "facets": ("temp3", "run_facet_audit"),
+}
+
+
+def _call(module_name, function_name, *args):
+    function = getattr(importlib.import_module(module_name), function_name)
+    result = function(*args)
+    # Report functions return data (or None); only CLI entry points return exit codes
+    return result if isinstance(result, int) and not isinstance(result, bool) else 0
+
+
+def absolute_paths(argv, cwd):
+    """
+    argv with file arguments made absolute against `cwd`: the values of
+    PATH_OPTIONS ('--out x' and '--out=x') and, for PATH_POSITIONALS
+    commands, positionals that name an existing file. '-' (stdin) is kept.
+    """
+    def absolute(path):
+        return path if path == "-" or os.path.isabs(path) else os.path.join(cwd, path)
+
+    command = next((arg for arg in argv if arg in COMMANDS or arg == "llm-audit"), None)
+    out, takes_path = [], False
+    for arg in argv:
+        name, eq, value = arg.partition("=")
+        if takes_path:
+            arg, takes_path = absolute(arg), False
+        elif arg in PATH_OPTIONS:
+            takes_path = True
+        elif eq and name in PATH_OPTIONS:
+            arg = f"{name}={absolute(value)}"
+        elif command in PATH_POSITIONALS and not arg.startswith("-") and \
+                os.path.isfile(os.path.join(cwd, arg)):
+            arg = absolute(arg)
+        out.append(arg)
+    return out
+
+
+def global_parser():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="collect metrics and write them to FILE (.prom: Prometheus textfile, else JSON)")
+    parser.add_argument("--profile", choices=["cprofile", "sample"],
+                        help="profile the command (cprofile sees the main thread only; sample sees all threads)")
+    parser.add_argument("--profile-out", metavar="FILE", help="profile output (default: .ifid_cache/profile.*)")
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ifid", description="Encyclopedia of Indian Food Ingredients tools",
+                                     parents=[global_parser()])
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+    for name, (_, _, forwards, help_text) in COMMANDS.items():
+        # Subcommands with their own options parse them themselves
+        sub = commands.add_parser(name, help=help_text, add_help=not forwards)
+        if forwards:
+            sub.add_argument("args", nargs=argparse.REMAINDER)
+    llm = commands.add_parser("llm-audit", help="run an LLM audit pass (needs google-genai and api_key.py)")
+    llm.add_argument("kind", choices=sorted(LLM_AUDITS))
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    # Global options are everything before the command name
+    split = next((i for i, arg in enumerate(argv) if arg in COMMANDS or arg == "llm-audit"), None)
+    if split is None:
+        build_parser().parse_args(argv)  # prints usage/help and exits
+        return 2
+    # Every script reads repo-relative paths, so run from the repository root;
+    # file arguments still mean what they meant in the caller's directory
+    argv = absolute_paths(argv, os.getcwd())
+    os.chdir(REPO_DIR)
+    options = global_parser().parse_args(argv[:split])
+    argv = argv[split:]
+    if not (options.metrics or options.profile):
+        return dispatch(argv)
+
+    import metrics
+
+    if options.metrics:
+        metrics.enable(options.metrics)
+        metrics.set_label("command", argv[0])
+    with metrics.profiling(options.profile, options.profile_out), metrics.stage("command"):
+        return dispatch(argv)
+
+
+def dispatch(argv):
+    # Forwarded verbatim: argparse.REMAINDER drops leading options like --batch
+    if argv[0] in COMMANDS and COMMANDS[argv[0]][2]:
+        module_name, function_name, _, _ = COMMANDS[argv[0]]
+        # argparse takes prog from argv[0]; make usage read 'ifid search ...'
+        saved, sys.argv[0] = sys.argv[0], f"ifid {argv[0]}"
+        try:
+            return _call(module_name, function_name, argv[1:])
+        finally:
+            sys.argv[0] = saved
+
+    args = build_parser().parse_args(argv)
+    if args.command == "llm-audit":
+        try:
+            return _call(*LLM_AUDITS[args.kind])
+        except ImportError as e:
+            print(f"❌ llm-audit needs the Gemini SDK and api_key.py: {e}")
+            return 1
+
+    module_name, function_name, _, _ = COMMANDS[args.command]
+    return _call(module_name, function_name)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
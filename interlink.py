@@ -1,10 +1,80 @@
-import pandas as pd
 import os
-import re
+
+import metrics
+from journal import read_state
+from matcher import SlugMatcher
+from manifest import CACHE_DIR, refresh_manifest, load_json_cache, save_json_cache, text_sha256
 
 # --- CONFIGURATION ---
 CSV_FILE = "v0.1-v0.2_audit.csv"
 MD_DIR = "data/md"  # The directory where your .md files live
+SCAN_CACHE_FILE = os.path.join(CACHE_DIR, "interlink_scan.json")
+
+def load_approved_slugs(csv_file=CSV_FILE):
+    """Unique approved slugs, longest first (so 'wheat-flour' is checked before 'wheat')."""
+    # Stdlib CSV read (plus pending journal decisions); pandas is not needed here
+    state = read_state(csv_file)
+    return sorted({slug for slug, (status, _) in state.items() if status.lower() == 'approve'},
+                  key=len, reverse=True)
+
+def scan_edges(approved_slugs, manifest):
+    """
+    (source, target) link edges between approved slugs, plus how many files
+    were re-scanned and reused. Unchanged files are served from the scan
+    cache. Prints nothing but read warnings.
+    """
+    # Cached scan results are only valid for the exact approved slug set
+    matcher_key = text_sha256("\n".join(sorted(approved_slugs)))
+    scan_cache = load_json_cache(SCAN_CACHE_FILE)
+    if scan_cache.get("matcher_key") != matcher_key:
+        scan_cache = {"matcher_key": matcher_key, "files": {}}
+    cached_files = scan_cache["files"]
+
+    matcher = None
+    rescanned = reused = 0
+    edges = []
+
+    # Scan each approved file (The "Source"), skipping unchanged ones
+    for source_slug in approved_slugs:
+        # Standardize filename (handle .md suffix if present in slug or not)
+        clean_name = source_slug if source_slug.endswith(".md") else f"{source_slug}.md"
+        entry = manifest.get(clean_name[:-3])
+        if not entry:
+            continue
+
+        cached = cached_files.get(source_slug)
+        if cached and cached["sha256"] == entry["sha256"]:
+            targets = cached["targets"]
+            reused += 1
+            metrics.count("scan_cache_hits")
+        else:
+            try:
+                with open(entry["path"], 'r', encoding='utf-8') as f:
+                    content = f.read().lower()
+            except Exception as e:
+                print(f"⚠️ Could not read {source_slug}: {e}")
+                continue
+
+            # The matching engine is built once, and only if something changed
+            if matcher is None:
+                with metrics.stage("build_matcher"):
+                    matcher = SlugMatcher(approved_slugs)
+            targets = matcher.scan(content)
+            metrics.count("files_read")
+            metrics.count("bytes_read", len(content))
+            metrics.count("matcher_scans")
+            cached_files[source_slug] = {"sha256": entry["sha256"], "targets": targets}
+            rescanned += 1
+
+        # Each target is reported at most once per file, so there is no
+        # double counting; self-mentions are not links.
+        edges.extend((source_slug, t) for t in targets if t != source_slug)
+
+    # Forget files that are no longer approved sources
+    for slug in set(cached_files) - set(approved_slugs):
+        del cached_files[slug]
+    save_json_cache(scan_cache, SCAN_CACHE_FILE)
+    return edges, rescanned, reused
 
 def calculate_strict_potential():
     if not os.path.exists(CSV_FILE):
@@ -12,80 +82,51 @@ def calculate_strict_potential():
         return
 
     # 1. Load and filter for 'approve'
-    df = pd.read_csv(CSV_FILE)
-    # Ensure consistency in slug naming
-    approved_df = df[df['status'].str.lower() == 'approve'].copy()
-    
-    # Get unique list of approved slugs
-    # We sort by length descending to ensure 'wheat-flour' is checked before 'wheat'
-    approved_slugs = sorted(list(set(approved_df['canon-slug'].astype(str).tolist())), key=len, reverse=True)
+    with metrics.stage("load"):
+        approved_slugs = load_approved_slugs()
     
     total_approved = len(approved_slugs)
     
     # Track incoming links: {target_slug: count_of_unique_source_files}
     incoming_link_counts = {slug: 0 for slug in approved_slugs}
-    total_link_edges = 0
 
     print(f"📊 Total Approved Ingredients: {total_approved}")
     print(f"🔍 Scanning files in {MD_DIR} for unique interlinks...")
 
-    # 2. Iterate through each approved file (The "Source")
-    for source_slug in approved_slugs:
-        # Standardize filename (handle .md suffix if present in slug or not)
-        clean_name = source_slug if source_slug.endswith(".md") else f"{source_slug}.md"
-        
-        # Locate the file (walking subdirectories if necessary)
-        filepath = None
-        for root, dirs, files in os.walk(MD_DIR):
-            if clean_name in files:
-                filepath = os.path.join(root, clean_name)
-                break
-        
-        if not filepath:
-            continue
+    # 2. One walk over the corpus (hashes are reused for untouched files)
+    with metrics.stage("walk"):
+        manifest, changed = refresh_manifest(MD_DIR)
+
+    # 3. Scan, skipping files that have not changed
+    with metrics.stage("scan"):
+        edges, rescanned, reused = scan_edges(approved_slugs, manifest)
+        print(f"♻️  Re-scanned {rescanned} file(s), reused {reused} cached result(s) "
+              f"({len(changed)} changed since last run).")
 
-        try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read().lower()
-            
-            # 3. Check for every OTHER approved slug in this specific file
-            for target_slug in approved_slugs:
-                if target_slug == source_slug:
-                    continue
-                
-                # Convert slug to a natural search phrase (e.g., 'watermelon-seeds' -> 'watermelon seeds')
-                search_phrase = target_slug.replace(".md", "").replace("-", " ")
-                
-                # Use regex for word boundaries to avoid partial matches (e.g., 'pea' matching 'pearl')
-                pattern = rf"\b{re.escape(search_phrase)}\b"
-                
-                if re.search(pattern, content):
-                    # Found a link! Because we are in a loop over target_slugs 
-                    # for ONE source file, this naturally ensures NO double counting
-                    # of the same target within this file.
-                    incoming_link_counts[target_slug] += 1
-                    total_link_edges += 1
-                    
-        except Exception as e:
-            print(f"⚠️ Could not read {source_slug}: {e}")
-
-    # 4. Final Reporting
-    print("\n" + "="*55)
-    print(f"📈 INTERLINK POTENTIAL REPORT")
-    print("="*55)
-    print(f"{'Total Approved Ingredients':<35} : {total_approved}")
-    print(f"{'Total Unique Interlink Edges':<35} : {total_link_edges}")
-    print(f"{'Average Links Per Ingredient':<35} : {total_link_edges/total_approved:.2f}")
-    print("-" * 55)
+    for source_slug, target_slug in edges:
+        incoming_link_counts[target_slug] += 1
+    total_link_edges = len(edges)
+
+    with metrics.stage("report"):
+        # 4. Final Reporting
+        print("\n" + "="*55)
+        print(f"📈 INTERLINK POTENTIAL REPORT")
+        print("="*55)
+        print(f"{'Total Approved Ingredients':<35} : {total_approved}")
+        print(f"{'Total Unique Interlink Edges':<35} : {total_link_edges}")
+        print(f"{'Average Links Per Ingredient':<35} : {total_link_edges/total_approved:.2f}")
+        print("-" * 55)
     
-    # Top 20 Ranking
-    sorted_links = sorted(incoming_link_counts.items(), key=lambda x: x[1], reverse=True)
+        # Top 20 Ranking
+        sorted_links = sorted(incoming_link_counts.items(), key=lambda x: x[1], reverse=True)
     
-    print(f"{'Top 20 Power Nodes (Slugs)':<35} | {'Incoming Links'}")
-    print("-" * 55)
-    for slug, count in sorted_links[:20]:
-        print(f"{slug.replace('.md', ''):<35} | {count}")
-    print("="*55)
+        print(f"{'Top 20 Power Nodes (Slugs)':<35} | {'Incoming Links'}")
+        print("-" * 55)
+        for slug, count in sorted_links[:20]:
+            print(f"{slug.replace('.md', ''):<35} | {count}")
+        print("="*55)
+
+    return edges
 
 if __name__ == "__main__":
     calculate_strict_potential()
@@ -0,0 +1,219 @@
+import os
+import json
+import getpass
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# --- CONFIGURATION ---
+DB_FILE = "v0.1-v0.2_audit.csv"
+# Fold the journal back into the CSV once it holds this many decisions
+COMPACT_EVERY = 500
+
+# journal path -> (bytes counted, lines in them), for maybe_compact()
+_line_counts = {}
+
+
+def journal_path(db_file=DB_FILE):
+    return f"{db_file}.journal"
+
+
+def lock_path(db_file=DB_FILE):
+    return f"{db_file}.lock"
+
+
+@contextmanager
+def locked(db_file=DB_FILE, exclusive=True):
+    """
+    Advisory lock shared by every flagger session working on `db_file`.
+    Appends and compaction take it exclusively, loads take it shared.
+    """
+    with open(lock_path(db_file), 'a+') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            # 'a+' opens at EOF; lock and unlock must cover the same byte
+            lock.seek(0)
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def current_auditor():
+    return os.environ.get("IFID_AUDITOR") or getpass.getuser()
+
+
+def append_decisions(decisions, db_file=DB_FILE, auditor=None):
+    """
+    Appends [(slug, status, note), ...] to the journal as one write.
+    Cost is proportional to the batch, never to the size of the table.
+    """
+    if not decisions:
+        return 0
+
+    auditor = auditor or current_auditor()
+    ts = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    payload = "".join(
+        json.dumps({"slug": slug, "status": status, "note": note, "ts": ts, "auditor": auditor},
+                   ensure_ascii=False) + "\n"
+        for slug, status, note in decisions
+    )
+
+    with locked(db_file):
+        path = journal_path(db_file)
+        # A crash mid-append can leave a torn line without its newline; end
+        # it first, or this batch would be glued onto it and lost
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    payload = "\n" + payload
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+    return len(decisions)
+
+
+def read_journal(db_file=DB_FILE):
+    """Returns the journal entries in write order. A torn last line is skipped."""
+    path = journal_path(db_file)
+    if not os.path.exists(path):
+        return []
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return parse_journal(f, path)
+
+
+def parse_journal(lines, source=None):
+    """Journal entries from an iterable of lines; unreadable lines are skipped."""
+    entries = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            print(f"⚠️ Skipping unreadable journal line in {source or journal_path()}")
+    return entries
+
+
+def read_state(db_file=DB_FILE):
+    """
+    Stdlib-only view of the current decisions: {slug: (status, note)} from the
+    CSV snapshot with the journal replayed over it. No pandas needed.
+    """
+    import csv
+
+    with locked(db_file, exclusive=False):
+        with open(db_file, 'r', encoding='utf-8', newline='') as f:
+            state = {r['canon-slug']: (r['status'], r['note']) for r in csv.DictReader(f)}
+        entries = read_journal(db_file)
+    return replay_state(state, entries)
+
+
+def replay_state(state, entries):
+    """read_state()'s replay: {slug: (status, note)} updated in place, unknown slugs ignored."""
+    for entry in entries:
+        if entry['slug'] in state:
+            state[entry['slug']] = (entry['status'], entry['note'])
+    return state
+
+
+def replay(df, entries):
+    """Applies journal entries over a snapshot; the last decision per slug wins."""
+    if not entries:
+        return df
+
+    import pandas as pd
+
+    latest = pd.DataFrame(entries).drop_duplicates('slug', keep='last').set_index('slug')
+    mask = df['canon-slug'].isin(latest.index)
+    df.loc[mask, 'status'] = df.loc[mask, 'canon-slug'].map(latest['status']).values
+    df.loc[mask, 'note'] = df.loc[mask, 'canon-slug'].map(latest['note']).values
+
+    unknown = len(latest) - int(mask.sum())
+    if unknown:
+        print(f"⚠️ {unknown} journal entries refer to unknown slugs; ignored.")
+    return df
+
+
+def load_with_journal(db_file=DB_FILE):
+    """Loads the last CSV snapshot and replays pending journal decisions over it."""
+    import pandas as pd
+
+    with locked(db_file, exclusive=False):
+        df = pd.read_csv(db_file)
+        entries = read_journal(db_file)
+    df['canon-slug'] = df['canon-slug'].astype(str)
+    df['note'] = df['note'].astype(object)
+    return replay(df, entries)
+
+
+def compact(db_file=DB_FILE):
+    """
+    Folds the journal into a fresh CSV snapshot. The CSV is replaced through a
+    temp file + rename, so a crash leaves either the old or the new snapshot.
+    """
+    import pandas as pd
+
+    with locked(db_file):
+        entries = read_journal(db_file)
+        if not entries:
+            return 0
+
+        df = pd.read_csv(db_file)
+        df['canon-slug'] = df['canon-slug'].astype(str)
+        df['note'] = df['note'].astype(object)
+        df = replay(df, entries)
+
+        tmp_file = f"{db_file}.tmp"
+        df.to_csv(tmp_file, index=False)
+        os.replace(tmp_file, db_file)
+        # Only truncate once the snapshot holding these decisions is in place
+        open(journal_path(db_file), 'w').close()
+    return len(entries)
+
+
+def pending_count(db_file=DB_FILE):
+    """
+    Lines in the journal. Only bytes appended since the last call are read;
+    a journal that shrank (compaction) is counted from the start again.
+    """
+    path = journal_path(db_file)
+    if not os.path.exists(path):
+        _line_counts.pop(path, None)
+        return 0
+    size = os.path.getsize(path)
+    counted_size, lines = _line_counts.get(path, (0, 0))
+    if size < counted_size:
+        counted_size, lines = 0, 0
+    if size > counted_size:
+        with open(path, 'rb') as f:
+            f.seek(counted_size)
+            lines += f.read(size - counted_size).count(b"\n")
+    _line_counts[path] = (size, lines)
+    return lines
+
+
+def maybe_compact(db_file=DB_FILE, threshold=COMPACT_EVERY):
+    if pending_count(db_file) >= threshold:
+        return compact(db_file)
+    return 0
+
+
+if __name__ == "__main__":
+    folded = compact()
+    print(f"✅ Compacted {folded} journal entries into {DB_FILE}.")
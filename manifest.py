@@ -0,0 +1,102 @@
+import os
+import json
+import hashlib
+
+import metrics
+
+# --- CONFIGURATION ---
+MD_DIR = "data/md"
+CACHE_DIR = ".ifid_cache"
+MANIFEST_FILE = os.path.join(CACHE_DIR, "corpus_manifest.json")
+
+
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def load_json_cache(path, default=None):
+    """Loads a JSON cache file, treating a missing or corrupt file as empty."""
+    if not os.path.exists(path):
+        return default if default is not None else {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print(f"⚠️ Ignoring unreadable cache: {path}")
+        return default if default is not None else {}
+
+
+def save_json_cache(data, path):
+    """Writes through a temp file + rename so a crash never leaves half a cache."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def build_manifest(md_dir=MD_DIR, previous=None):
+    """
+    Walks the markdown tree once and returns
+    {slug: {path, category, size, mtime_ns, sha256}}.
+
+    Files whose size and mtime match the previous manifest keep their old hash
+    instead of being re-read. If a slug exists in several categories, the first
+    one in sorted walk order wins.
+    """
+    previous = previous or {}
+    manifest = {}
+
+    for root, dirs, files in os.walk(md_dir):
+        dirs.sort()
+        for name in sorted(files):
+            if not name.endswith(".md"):
+                continue
+            slug = name[:-3]
+            if slug in manifest:
+                continue
+
+            path = os.path.join(root, name)
+            st = os.stat(path)
+            old = previous.get(slug)
+            if (old and old.get("path") == path and old.get("size") == st.st_size
+                    and old.get("mtime_ns") == st.st_mtime_ns):
+                sha = old["sha256"]
+                metrics.count("manifest_cache_hits")
+            else:
+                sha = file_sha256(path)
+                metrics.count("files_hashed")
+                metrics.count("bytes_hashed", st.st_size)
+
+            manifest[slug] = {
+                "path": path,
+                "category": os.path.relpath(root, md_dir),
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "sha256": sha,
+            }
+
+    return manifest
+
+
+def refresh_manifest(md_dir=MD_DIR, manifest_file=MANIFEST_FILE, save=True):
+    """
+    Rebuilds the manifest against the one on disk and saves it (unless
+    save=False, for dry runs). Returns (manifest, changed) where `changed`
+    is the set of slugs that were added, removed or whose content hash
+    changed since the last run.
+    """
+    previous = load_json_cache(manifest_file).get("files", {})
+    manifest = build_manifest(md_dir, previous)
+
+    changed = {s for s in manifest if previous.get(s, {}).get("sha256") != manifest[s]["sha256"]}
+    changed |= set(previous) - set(manifest)
+
+    if save:
+        save_json_cache({"md_dir": md_dir, "files": manifest}, manifest_file)
+    return manifest, changed
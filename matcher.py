@@ -0,0 +1,106 @@
+import re
+from collections import deque
+
+# Matches every zero-width word boundary, using the same \b rules the old
+# per-slug regexes relied on.
+BOUNDARY_RE = re.compile(r"\b")
+
+
+def slug_to_phrase(slug):
+    """Converts a slug to the natural search phrase used in the markdown text."""
+    # e.g. 'watermelon-seeds' -> 'watermelon seeds'
+    return slug.replace(".md", "").replace("-", " ")
+
+
+class SlugMatcher:
+    """
+    Aho-Corasick automaton built once from all approved slugs.
+
+    A single pass over a lowercased document reports every slug whose phrase
+    occurs between two word boundaries, which is exactly what running
+    re.search(rf"\\b{phrase}\\b") once per slug used to report.
+    """
+
+    def __init__(self, slugs):
+        # Longest first, so 'wheat-flour' is reported ahead of 'wheat'
+        self.slugs = sorted(set(slugs), key=len, reverse=True)
+
+        # Node 0 is the root. goto[n] maps a character to the next node,
+        # fail[n] is the longest proper suffix node, out[n] holds
+        # (phrase_length, slug) pairs ending at n (including via fail links).
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+
+        for slug in self.slugs:
+            phrase = slug_to_phrase(slug)
+            if not phrase:
+                continue
+            node = 0
+            for ch in phrase:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                node = nxt
+            self.out[node] = self.out[node] + ((len(phrase), slug),)
+
+        self._build_fail_links()
+
+    def _build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                # Inherit matches from the suffix node, longest phrases first
+                self.out[nxt] = tuple(sorted(
+                    self.out[nxt] + self.out[self.fail[nxt]], reverse=True
+                ))
+
+    def scan(self, content):
+        """
+        Returns every slug mentioned in `content` (already lowercased), in
+        longest-match-first order. Each slug is reported at most once.
+        """
+        boundaries = {m.start() for m in BOUNDARY_RE.finditer(content)}
+        goto, fail, out = self.goto, self.fail, self.out
+
+        found = {}
+        node = 0
+        for i, ch in enumerate(content):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            # Word boundaries on both ends avoid partial matches
+            # (e.g., 'pea' matching 'pearl')
+            end = i + 1
+            if end not in boundaries:
+                continue
+            for length, slug in out[node]:
+                if slug not in found and (end - length) in boundaries:
+                    found[slug] = length
+
+        return sorted(found, key=lambda s: (-len(s), s))
+
+    def find_edges(self, documents):
+        """
+        Scans {source_slug: lowercased content} and returns the full
+        (source, target) edge list. Self-mentions are skipped.
+        """
+        edges = []
+        for source_slug, content in documents.items():
+            for target_slug in self.scan(content):
+                if target_slug != source_slug:
+                    edges.append((source_slug, target_slug))
+        return edges
@@ -0,0 +1,259 @@
+"""
+Shared instrumentation: stage timers, counters and histograms.
+
+Everything is off by default. When disabled, stage() hands back one shared
+no-op context manager and count()/observe() return after a single global
+check, so the calls can stay in the scripts permanently.
+
+Enable with 'ifid --metrics FILE ...' or, for scripts run directly, the
+IFID_METRICS=FILE environment variable. A FILE ending in '.prom' is written
+in Prometheus textfile format (for node_exporter's textfile collector);
+anything else gets JSON.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# --- CONFIGURATION ---
+METRICS_ENV = "IFID_METRICS"
+PREFIX = "ifid_"
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+SAMPLE_INTERVAL = 0.005    # seconds between stack samples for --profile sample
+PROFILE_TOP = 15
+
+_enabled = False
+_lock = threading.Lock()
+_labels = {}
+_timers = {}       # stage -> [calls, total seconds, max seconds]
+_counters = {}     # name -> value
+_histograms = {}   # name -> {"buckets": (...), "counts": [...], "sum": s, "count": n}
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            timer = _timers.setdefault(self.name, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += elapsed
+            timer[2] = max(timer[2], elapsed)
+        return False
+
+
+def enabled():
+    return _enabled
+
+
+def enable(path=None):
+    """Turns collection on; with a path, the metrics are written there at exit."""
+    global _enabled
+    _enabled = True
+    if path:
+        atexit.register(write, path)
+
+
+def set_label(name, value):
+    """A label attached to every exported series (e.g. command="interlink")."""
+    _labels[name] = str(value)
+
+
+def stage(name):
+    """`with metrics.stage("scan"):` times the block under that stage name."""
+    return _Stage(name) if _enabled else _NULL_STAGE
+
+
+def count(name, n=1):
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name, value, buckets=LATENCY_BUCKETS):
+    """Adds one observation to a histogram (bucket bounds are fixed on first use)."""
+    if not _enabled:
+        return
+    with _lock:
+        h = _histograms.get(name)
+        if h is None:
+            h = _histograms[name] = {"buckets": tuple(buckets), "counts": [0] * (len(buckets) + 1),
+                                     "sum": 0.0, "count": 0}
+        # Prometheus buckets are upper bounds: value <= le
+        h["counts"][bisect_left(h["buckets"], value)] += 1
+        h["sum"] += value
+        h["count"] += 1
+
+
+def snapshot():
+    """Everything collected so far, as plain JSON-able data."""
+    with _lock:
+        return {
+            "labels": dict(_labels),
+            "stages": {name: {"calls": c, "seconds": round(t, 6), "max_seconds": round(m, 6)}
+                       for name, (c, t, m) in sorted(_timers.items())},
+            "counters": dict(sorted(_counters.items())),
+            "histograms": {name: {"buckets": list(h["buckets"]), "counts": list(h["counts"]),
+                                  "sum": round(h["sum"], 6), "count": h["count"]}
+                           for name, h in sorted(_histograms.items())},
+        }
+
+
+def _series(name, labels, value):
+    label_text = ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+    return f"{PREFIX}{name}{{{label_text}}} {value}" if label_text else f"{PREFIX}{name} {value}"
+
+
+def to_prometheus(data):
+    """Prometheus text exposition format for a snapshot()."""
+    base = data["labels"]
+    lines = []
+    if data["stages"]:
+        lines.append(f"# TYPE {PREFIX}stage_seconds_total counter")
+        lines += [_series("stage_seconds_total", {**base, "stage": s}, v["seconds"])
+                  for s, v in data["stages"].items()]
+        lines.append(f"# TYPE {PREFIX}stage_calls_total counter")
+        lines += [_series("stage_calls_total", {**base, "stage": s}, v["calls"])
+                  for s, v in data["stages"].items()]
+    for name, value in data["counters"].items():
+        lines.append(f"# TYPE {PREFIX}{name}_total counter")
+        lines.append(_series(f"{name}_total", base, value))
+    for name, h in data["histograms"].items():
+        lines.append(f"# TYPE {PREFIX}{name} histogram")
+        cumulative = 0
+        for bound, n in zip(list(h["buckets"]) + ["+Inf"], h["counts"]):
+            cumulative += n
+            lines.append(_series(f"{name}_bucket", {**base, "le": bound}, cumulative))
+        lines.append(_series(f"{name}_sum", base, h["sum"]))
+        lines.append(_series(f"{name}_count", base, h["count"]))
+    return "\n".join(lines) + "\n"
+
+
+def write(path):
+    """Writes through a temp file + rename; the textfile collector must never see half a file."""
+    data = snapshot()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        if path.endswith(".prom"):
+            f.write(to_prometheus(data))
+        else:
+            json.dump(data, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+# --- PROFILING ---
+
+class _Sampler(threading.Thread):
+    """
+    Samples every thread's stack (except its own) every `interval` seconds.
+    Stacks are collapsed-stack counts rooted at the thread name, so worker
+    threads (e.g. the LLM audit pool) show up as their own trees.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.stacks = {}
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    key = ";".join(reversed(stack))
+                    self.stacks[key] = self.stacks.get(key, 0) + 1
+
+
+@contextmanager
+def profiling(kind=None, out=None):
+    """
+    Profiles the block: 'cprofile' dumps pstats (calling thread only),
+    'sample' writes collapsed stacks of all threads for flamegraph tools
+    (wall clock, so threads blocked on I/O or locks are counted too).
+    A short summary goes to stderr. None does nothing.
+    """
+    if not kind:
+        yield
+        return
+    # Imported here: manifest.py itself reports to this module
+    from manifest import CACHE_DIR
+
+    if kind == "cprofile":
+        import cProfile
+        import pstats
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            out = out or os.path.join(CACHE_DIR, "profile.pstats")
+            os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+            profiler.dump_stats(out)
+            print(f"\n⏱️  cProfile stats written to {out}", file=sys.stderr)
+            pstats.Stats(profiler, stream=sys.stderr).sort_stats("cumulative").print_stats(PROFILE_TOP)
+        return
+
+    if kind != "sample":
+        raise ValueError(f"unknown profiler: {kind}")
+    sampler = _Sampler()
+    sampler.start()
+    try:
+        yield
+    finally:
+        sampler.done.set()
+        sampler.join()
+        out = out or os.path.join(CACHE_DIR, "profile.folded")
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        with open(out, 'w', encoding='utf-8') as f:
+            for stack, n in sorted(sampler.stacks.items(), key=lambda x: -x[1]):
+                f.write(f"{stack} {n}\n")
+        total = sum(sampler.stacks.values())
+        leaves = {}
+        for stack, n in sampler.stacks.items():
+            leaf = stack.rsplit(";", 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + n
+        print(f"\n⏱️  {total} sample(s) written to {out}; hottest functions:", file=sys.stderr)
+        for leaf, n in sorted(leaves.items(), key=lambda x: -x[1])[:PROFILE_TOP]:
+            print(f"   {n / max(total, 1):6.1%}  {leaf}", file=sys.stderr)
+
+
+if os.environ.get(METRICS_ENV):
+    enable(os.environ[METRICS_ENV])
@@ -0,0 +1,498 @@
+import os
+import re
+import sys
+import json
+import argparse
+from functools import lru_cache
+from itertools import chain, islice
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import MD_DIR, PAREN_RE, INS_RE
+from manifest import CACHE_DIR, refresh_manifest, load_json_cache, save_json_cache, text_sha256, file_sha256
+
+# --- CONFIGURATION ---
+CSV_FILE = "v0.1-v0.2_audit.csv"
+FACET_LOG = "ingredient_facets_audit.log"
+TABLE_FILE = os.path.join(CACHE_DIR, "resolver_aliases.json")
+FUZZY_CUTOFF = 0.55        # SlugIndex score a fuzzy match needs to be accepted
+FUZZY_CACHE = 200_000      # memoized fuzzy lookups per process
+COMPONENT_CACHE = 500_000  # memoized component resolutions per process
+BATCH = 2000               # label lines per worker task
+# Declarations are resolved in worker processes once a stream has this many lines
+PARALLEL_THRESHOLD = 20000
+
+# FSSAI class titles that name a function or group, not a substance. Deleted
+# umbrella entries ('acidity-regulator', 'thickener', ...) and the facet
+# audit's #functional-class values are added to these when the table is built.
+CLASS_NAMES = [
+    "acidity regulator", "anticaking agent", "antioxidant", "colour", "color", "emulsifier",
+    "emulsifying agent", "firming agent", "flavour", "flavouring", "flavor", "humectant",
+    "leavening agent", "preservative", "raising agent", "sequestrant", "stabiliser", "stabilizer",
+    "sweetener", "thickener", "edible oil", "edible vegetable oil", "vegetable oil", "vegetable fat",
+    "edible vegetable fat", "spices and condiments", "permitted natural colour", "nature identical flavouring",
+]
+
+# Plant sources that make a different product out of a dairy or fat noun:
+# 'peanut butter' and 'coconut milk' are not butter or milk. A partial match
+# whose leftover words name one of these (or any known ingredient) is not
+# trusted. The corpus has no entry for several of them, hence the list.
+SOURCE_WORDS = [
+    "almond", "cacao", "cashew", "cocoa", "coconut", "groundnut", "hazelnut", "kokum", "mango",
+    "oat", "peanut", "pistachio", "sesame", "shea", "soy", "soya", "sunflower", "walnut",
+]
+
+# Alias sources, strongest first; a weaker source never overrides a stronger one
+SOURCES = ("slug", "title", "alias", "ins", "standard")
+
+Resolution = namedtuple("Resolution", "label slug method score declared required")
+
+# INS 330, E330, INS No. 330; a sub-index like 500(ii) is dropped
+INS_LABEL_RE = re.compile(r"\b(?:ins|e)\s*(?:no\.?\s*)?(\d{3,4}[a-z]?)\b(?:\s*\([ivx]+\))?")
+PERCENT_RE = re.compile(r"\d+(?:\.\d+)?\s*%")
+BARE_INS_RE = re.compile(r"ins \d{3,4}[a-z]?")
+EMPTY_BRACKETS_RE = re.compile(r"[(\[{]\s*[)\]}]")
+NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+OPEN, CLOSE = "([{", ")]}"
+
+
+def normalize(text):
+    """'Acidity Regulator (INS No. 330)' -> 'acidity regulator ins 330'"""
+    text = INS_LABEL_RE.sub(r"ins \1", text.lower().replace("&", " and "))
+    return NON_WORD_RE.sub(" ", text).strip()
+
+
+def _tag(kind, key):
+    return f"#{kind}:{key.replace(' ', '-')}"
+
+
+def _variants(key):
+    """The key itself plus a naive singular ('emulsifiers' -> 'emulsifier')."""
+    yield key
+    if key.endswith("ies"):
+        yield key[:-3] + "y"
+    elif key.endswith("s") and not key.endswith("ss"):
+        yield key[:-1]
+
+
+def split_top_level(text, separators=",;"):
+    """Splits on separators outside brackets: 'a, b (c, d)' -> ['a', 'b (c, d)']."""
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(text):
+        if ch in OPEN:
+            depth += 1
+        elif ch in CLOSE:
+            depth = max(depth - 1, 0)
+        elif ch in separators and not depth:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [p.strip(" .\t") for p in parts if p.strip(" .\t")]
+
+
+def split_brackets(text):
+    """'Oil (Palmolein) 60%' -> ('Oil 60%', ['Palmolein']); only the outermost brackets count."""
+    head, groups, depth, current = [], [], 0, []
+    for ch in text:
+        if ch in OPEN:
+            if depth:
+                current.append(ch)
+            depth += 1
+        elif ch in CLOSE and depth:
+            depth -= 1
+            if depth:
+                current.append(ch)
+            else:
+                groups.append("".join(current).strip())
+                current = []
+        elif depth:
+            current.append(ch)
+        else:
+            head.append(ch)
+    if current:  # unclosed bracket
+        groups.append("".join(current).strip())
+    return "".join(head).strip(), [g for g in groups if g]
+
+
+def split_declaration(line):
+    """A raw ingredient list -> its top-level components, percentages dropped."""
+    line = EMPTY_BRACKETS_RE.sub("", PERCENT_RE.sub("", line))
+    if ":" in line.split("(", 1)[0]:
+        # 'Ingredients: Sugar, ...'
+        line = line.split(":", 1)[1]
+    return split_top_level(line)
+
+
+# --- ALIAS TABLE ---
+
+def _fingerprint(manifest, csv_file, facet_log):
+    from journal import journal_path
+
+    parts = [f"{s}:{e['sha256']}" for s, e in sorted(manifest.items())]
+    for path in (csv_file, journal_path(csv_file)):
+        if os.path.exists(path):
+            st = os.stat(path)
+            parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+    if os.path.exists(facet_log):
+        parts.append(f"{facet_log}:{file_sha256(facet_log)}")
+    return text_sha256("\n".join(parts))
+
+
+def _read_facet_log(facet_log):
+    """{original slug: (standard slug, [tags])} from temp3.py's facet audit log."""
+    from audit_store import TAG_RE, parse_facet_line, is_clean
+
+    audit = {}
+    if not os.path.exists(facet_log):
+        return audit
+    with open(facet_log, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or "---" in line:
+                continue
+            parsed = parse_facet_line(line)
+            if parsed:
+                original, standard, facets, _ = parsed
+                # Later lines (re-runs) replace earlier ones
+                audit[original] = (standard, [] if is_clean(facets) else TAG_RE.findall(facets))
+    return audit
+
+
+def compile_table(csv_file=CSV_FILE, md_dir=MD_DIR, facet_log=FACET_LOG):
+    """
+    Builds {aliases: {alias: [slug, source]}, classes: [...], facets: {slug: [tags]}}.
+
+    Aliases map onto approved slugs; a merged entry's aliases point at its
+    merge target. An alias claimed by two different slugs from the same
+    source is ambiguous and dropped rather than guessed.
+    """
+    from journal import read_state
+    from apply import resolve_decisions
+    from build_master import open_records, parse_changed
+
+    state = read_state(csv_file) if os.path.exists(csv_file) else {}
+    approved = {s for s, (status, _) in state.items() if status.lower() == "approve"}
+    deletes, merges, _ = resolve_decisions(state)
+    redirect = {s: s for s in approved}
+    redirect.update({s: t for s, t in merges.items() if t in approved})
+
+    manifest, _ = refresh_manifest(md_dir)
+    db = open_records()
+    try:
+        parse_changed(manifest, db)
+        titles = dict(db.execute("SELECT slug, name FROM records"))
+    finally:
+        db.close()
+    audit = _read_facet_log(facet_log)
+
+    claims = {}  # alias -> (rank, slug or None if ambiguous)
+
+    def claim(alias, slug, source):
+        alias = normalize(alias)
+        if not alias or slug not in redirect:
+            return
+        rank, target = SOURCES.index(source), redirect[slug]
+        previous = claims.get(alias)
+        if previous is None or rank < previous[0]:
+            claims[alias] = (rank, target)
+        elif rank == previous[0] and previous[1] not in (None, target):
+            claims[alias] = (rank, None)
+
+    for slug in redirect:
+        claim(slug, slug, "slug")
+        m = re.search(r"-ins-(\d+[a-z]?)$", slug)
+        if m:
+            claim(f"ins {m.group(1)}", slug, "ins")
+            claim(slug[:m.start()], slug, "alias")
+
+        title = titles.get(slug)
+        if title:
+            claim(title, slug, "title")
+            claim(PAREN_RE.sub(" ", title), slug, "alias")
+            for alias in PAREN_RE.findall(title):
+                for part in re.split(r"[/,;]", alias):
+                    claim(part, slug, "ins" if INS_RE.fullmatch(part.strip()) else "alias")
+
+    facets, classes = {}, set(CLASS_NAMES)
+    for original, (standard, tags) in audit.items():
+        if original not in redirect:
+            continue
+        claim(standard, original, "standard")
+        for tag in tags:
+            key, _, value = tag.partition(":")
+            if key == "#source" and value:
+                # 'lecithin (soy)' and 'soy lecithin' both name soy-lecithin
+                claim(f"{standard} {value}", original, "standard")
+                claim(f"{value} {standard}", original, "standard")
+            elif key == "#functional-class" and value:
+                classes.add(normalize(value))
+        if tags:
+            facets.setdefault(redirect[original], tags)
+
+    classes.update(normalize(s) for s in deletes)
+    aliases = {a: [slug, SOURCES[rank]] for a, (rank, slug) in sorted(claims.items()) if slug}
+    # A class title never resolves to a substance on its own
+    for name in classes:
+        aliases.pop(name, None)
+    return {"aliases": aliases, "classes": sorted(classes), "facets": facets}
+
+
+def load_table(csv_file=CSV_FILE, md_dir=MD_DIR, facet_log=FACET_LOG, table_file=TABLE_FILE, rebuild=False):
+    """The compiled alias table, rebuilt only when an input changed."""
+    manifest, _ = refresh_manifest(md_dir)
+    fingerprint = _fingerprint(manifest, csv_file, facet_log)
+    cached = {} if rebuild else load_json_cache(table_file)
+    if cached.get("fingerprint") == fingerprint:
+        return cached
+    table = compile_table(csv_file, md_dir, facet_log)
+    table["fingerprint"] = fingerprint
+    save_json_cache(table, table_file)
+    return table
+
+
+# --- RESOLUTION ---
+
+class Resolver:
+    """
+    Maps raw label text onto canonical slugs.
+
+    Every component goes through the exact alias table first (a dict hit);
+    brackets are read as INS numbers, sources or sub-ingredient lists; only
+    what is still unresolved pays for a SlugIndex search, memoized per key.
+    """
+
+    def __init__(self, table):
+        self.aliases = {a: tuple(v) for a, v in table["aliases"].items()}
+        self.classes = frozenset(table["classes"])
+        self.facets = table.get("facets", {})
+        self.source_words = frozenset(SOURCE_WORDS)
+        self._index = None
+        self._fuzzy = lru_cache(maxsize=FUZZY_CACHE)(self._fuzzy_search)
+        # Label streams repeat the same few thousand components endlessly
+        self.resolve_component = lru_cache(maxsize=COMPONENT_CACHE)(self._resolve_frozen)
+
+    def _exact(self, key):
+        for variant in _variants(key):
+            hit = self.aliases.get(variant)
+            if hit:
+                return hit
+        return None
+
+    def _class_name(self, key):
+        return next((v for v in _variants(key) if v in self.classes), None)
+
+    def _partial(self, key):
+        """
+        Exact hit on the trailing or leading words: 'iodised salt' -> salt,
+        'garlic powder' -> garlic. Returns (hit, leftover words) or (None, None).
+        """
+        words = key.split()
+        for i in range(1, len(words)):
+            hit = self._exact(" ".join(words[i:]))
+            if hit:
+                return hit, words[:i]
+        for i in range(len(words) - 1, 0, -1):
+            hit = self._exact(" ".join(words[:i]))
+            if hit:
+                return hit, words[i:]
+        return None, None
+
+    def _names_ingredient(self, words):
+        """True if leftover words of a partial match are themselves an ingredient."""
+        return bool(self._exact(" ".join(words))) or any(
+            w in self.source_words or self._exact(w) for w in words)
+
+    def _fuzzy_search(self, key):
+        if self._index is None:
+            from slug_index import SlugIndex
+            self._index = SlugIndex(self.aliases)
+        hits = self._index.search(key, n=1, cutoff=FUZZY_CUTOFF)
+        if not hits:
+            return None, 0.0
+        alias, score = hits[0]
+        return self.aliases[alias][0], score
+
+    def _result(self, label, slug, method, score=1.0, declared=()):
+        return Resolution(label, slug, method, score, tuple(declared),
+                          tuple(self.facets.get(slug, ())) if slug else ())
+
+    def _resolve_frozen(self, text):
+        # Cached results are shared, so they are handed out as tuples
+        return tuple(self._resolve_component(text))
+
+    def _resolve_component(self, text):
+        """One declared ingredient -> [Resolution] (several for 'Emulsifiers (INS 322, INS 471)')."""
+        label = text.strip()
+        key = normalize(label)
+        if not key:
+            return []
+        hit = self._exact(key)
+        if hit:
+            return [self._result(label, hit[0], hit[1])]
+
+        head, groups = split_brackets(label)
+        head_key = normalize(head)
+        head_hit = self._exact(head_key) if head_key else None
+        class_name = self._class_name(head_key) if head_key else None
+        is_class = class_name is not None
+        declared = [_tag("functional-class", class_name)] if is_class else []
+
+        items = [item for g in groups for item in split_top_level(g)]
+        if len(items) > 1:
+            # Compound ingredient: the head (unless it is a class) plus its parts
+            parts = [r for item in items for r in self.resolve_component(item) if r.slug]
+            if parts:
+                if head_hit and not is_class:
+                    parts.insert(0, self._result(label, head_hit[0], head_hit[1]))
+                return [r._replace(declared=tuple(declared) + r.declared) for r in parts]
+        elif items:
+            item_key = normalize(items[0])
+            item_hit = self._exact(item_key)
+            if item_hit and (is_class or not head_hit):
+                method = "ins" if item_hit[1] == "ins" else "bracket"
+                return [self._result(label, item_hit[0], method, declared=declared)]
+            if head_key:
+                # 'Lecithin (Soy)' -> soy lecithin; 'Edible Vegetable Oil (Palm)' -> palm oil
+                noun = head_key.split()[-1]
+                for combined in (f"{item_key} {head_key}", f"{head_key} {item_key}", f"{item_key} {noun}"):
+                    hit = self._exact(combined)
+                    if hit:
+                        return [self._result(label, hit[0], "combined", declared=declared)]
+            if head_hit:
+                return [self._result(label, head_hit[0], head_hit[1], declared=[_tag("qualifier", item_key)])]
+            if is_class and not BARE_INS_RE.fullmatch(item_key):
+                slug, score = self._fuzzy(item_key)
+                if slug:
+                    return [self._result(label, slug, "fuzzy", score, declared)]
+
+        if head_hit:
+            return [self._result(label, head_hit[0], head_hit[1])]
+        if is_class:
+            return [self._result(label, None, "class", 0.0, declared)]
+        if BARE_INS_RE.fullmatch(key):
+            # An unknown INS number is not close to its neighbours
+            return [self._result(label, None, "none", 0.0)]
+        partial_key = head_key or key
+        hit, leftover = self._partial(partial_key)
+        if hit and self._names_ingredient(leftover):
+            # 'Coconut Milk' is neither coconut nor milk: leave it for review
+            # rather than guess (fuzzy matching would guess the same way)
+            return [self._result(label, None, "none", 0.0)]
+        if hit:
+            words = len(partial_key.split())
+            return [self._result(label, hit[0], "partial", round((words - len(leftover)) / words, 3),
+                                 [_tag("qualifier", " ".join(leftover))] + [_tag("qualifier", normalize(i)) for i in items])]
+        slug, score = self._fuzzy(key)
+        if slug:
+            return [self._result(label, slug, "fuzzy", score)]
+        return [self._result(label, None, "none", 0.0)]
+
+    def resolve(self, label):
+        """Best single slug for one label, or None."""
+        results = [r for r in self.resolve_component(label) if r.slug]
+        return results[0] if results else None
+
+    def resolve_declaration(self, line):
+        """A whole ingredient list -> [Resolution] for every component, in order."""
+        return [r for part in split_declaration(line) for r in self.resolve_component(part)]
+
+
+_RESOLVER = None
+
+
+def _init_worker(table):
+    global _RESOLVER
+    _RESOLVER = Resolver(table)
+
+
+def _resolve_batch(lines):
+    return [_RESOLVER.resolve_declaration(line) for line in lines]
+
+
+def _batches(lines, size):
+    batch = []
+    for line in lines:
+        batch.append(line.rstrip("\n"))
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def resolve_stream(lines, table=None, workers=None, batch=BATCH, parallel_threshold=PARALLEL_THRESHOLD):
+    """
+    Yields (line, [Resolution]) for an iterable of ingredient lists, in
+    input order. Input is consumed lazily: only a couple of batches per
+    worker are in flight, so an unbounded stream (stdin, a huge file) is
+    fine. Short streams stay in-process; longer ones fan out to workers.
+    """
+    table = table or load_table()
+    batches = _batches(lines, batch)
+    head = list(islice(batches, -(-parallel_threshold // batch)))
+    more = next(batches, None)
+    batches = chain(head, [more] if more else [], batches)
+
+    if more is None or workers == 1:
+        _init_worker(table)
+        for chunk in batches:
+            yield from zip(chunk, _resolve_batch(chunk))
+        return
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(table,)) as pool:
+        pending = deque()
+        for chunk in batches:
+            pending.append((chunk, pool.submit(_resolve_batch, chunk)))
+            if len(pending) >= 2 * workers:
+                chunk, future = pending.popleft()
+                yield from zip(chunk, future.result())
+        while pending:
+            chunk, future = pending.popleft()
+            yield from zip(chunk, future.result())
+
+
+def _as_json(line, results):
+    return json.dumps({"line": line, "resolved": [r._asdict() for r in results]}, ensure_ascii=False)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Resolve label ingredient declarations to encyclopedia slugs")
+    parser.add_argument("labels", nargs="*", help='e.g. "Acidity Regulator (INS 330)"')
+    parser.add_argument("--batch", metavar="FILE", help="one ingredient list per line ('-' for stdin); JSONL out")
+    parser.add_argument("--out", help="JSONL output path (default: stdout)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rebuild", action="store_true", help="recompile the alias table")
+    args = parser.parse_args(argv)
+
+    table = load_table(rebuild=args.rebuild)
+    if args.batch:
+        source = sys.stdin if args.batch == "-" else open(args.batch, 'r', encoding='utf-8')
+        out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+        try:
+            for line, results in resolve_stream(source, table, args.workers):
+                out.write(_as_json(line, results) + "\n")
+        finally:
+            if source is not sys.stdin:
+                source.close()
+            if out is not sys.stdout:
+                out.close()
+        return 0
+
+    if not args.labels:
+        print(f"📚 Alias table: {len(table['aliases'])} aliases, {len(table['classes'])} class names, "
+              f"{len(table['facets'])} slug(s) with required facets")
+        return 0
+
+    resolver = Resolver(table)
+    for label in args.labels:
+        print(f"\n🏷️  {label}")
+        for r in resolver.resolve_declaration(label):
+            slug = r.slug or "❌ unresolved"
+            extra = " ".join(r.declared + r.required)
+            print(f"   {r.label:<40} -> {slug:<35} [{r.method} {r.score:.2f}] {extra}".rstrip())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -0,0 +1,109 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+import metrics
+from manifest import CACHE_DIR
+
+# --- CONFIGURATION ---
+CACHE_FILE = os.path.join(CACHE_DIR, "llm_responses.sqlite")
+# Least recently used answers are evicted past this many rows, so entries
+# from old SYSTEM_INSTRUCTION revisions age out on their own.
+MAX_ENTRIES = 20000
+
+
+def instruction_hash(system_instruction):
+    return hashlib.sha256(system_instruction.strip().encode('utf-8')).hexdigest()[:16]
+
+
+class ResponseCache:
+    """
+    Per-slug LLM answers keyed by (model ID, SYSTEM_INSTRUCTION hash, slug).
+
+    Every put is committed immediately, so it doubles as the checkpoint: a
+    killed run resumes by skipping every slug that already has an answer.
+    """
+
+    def __init__(self, model_id, system_instruction, path=CACHE_FILE, max_entries=MAX_ENTRIES):
+        self.model_id = model_id
+        self.instruction = instruction_hash(system_instruction)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                model_id TEXT NOT NULL,
+                instruction TEXT NOT NULL,
+                slug TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (model_id, instruction, slug)
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS responses_used_at ON responses (used_at)")
+        self.db.commit()
+
+    def get_many(self, slugs):
+        """Returns {slug: response_line} for every cached slug and counts hits/misses."""
+        found = {}
+        slugs = list(dict.fromkeys(slugs))
+        with self.lock:
+            # Chunked to stay under SQLite's bound-parameter limit
+            for i in range(0, len(slugs), 500):
+                chunk = slugs[i : i + 500]
+                rows = self.db.execute(
+                    f"SELECT slug, response FROM responses WHERE model_id = ? AND instruction = ? "
+                    f"AND slug IN ({','.join('?' * len(chunk))})",
+                    [self.model_id, self.instruction, *chunk],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                self.db.executemany(
+                    "UPDATE responses SET used_at = ? WHERE model_id = ? AND instruction = ? AND slug = ?",
+                    [(now, self.model_id, self.instruction, s) for s in found],
+                )
+                self.db.commit()
+        self.hits += len(found)
+        self.misses += len(slugs) - len(found)
+        metrics.count("llm_cache_hits", len(found))
+        metrics.count("llm_cache_misses", len(slugs) - len(found))
+        return found
+
+    def put_many(self, answers):
+        """Stores {slug: response_line} and commits (the per-slug checkpoint)."""
+        if not answers:
+            return
+        now = time.time()
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                [(self.model_id, self.instruction, s, r, now, now) for s, r in answers.items()],
+            )
+            self.db.commit()
+
+    def evict(self):
+        """Drops least recently used rows beyond max_entries. Returns how many."""
+        with self.lock:
+            (count,) = self.db.execute("SELECT COUNT(*) FROM responses").fetchone()
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            self.db.execute(
+                "DELETE FROM responses WHERE rowid IN "
+                "(SELECT rowid FROM responses ORDER BY used_at ASC LIMIT ?)",
+                (excess,),
+            )
+            self.db.commit()
+        return excess
+
+    def close(self):
+        with self.lock:
+            self.db.close()
@@ -0,0 +1,383 @@
+import os
+import re
+import sys
+import zlib
+import sqlite3
+import argparse
+from collections import Counter
+
+import numpy as np
+
+from corpus import MD_DIR, FIELDS, category_name, parse_markdown, field_texts
+from manifest import CACHE_DIR, refresh_manifest
+
+# --- CONFIGURATION ---
+INDEX_FILE = os.path.join(CACHE_DIR, "search_index.sqlite")
+# BM25 parameters and per-field weights (BM25F-style sum over fields)
+K1 = 1.2
+B = 0.75
+FIELD_WEIGHTS = {"title": 3.0, "history": 1.0, "culinary": 1.0, "industrial": 1.0,
+                 "distinction": 1.0, "body": 1.0}
+# Incremental updates land in small segments; past this many they are merged
+MAX_SEGMENTS = 8
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has in is it its of on or that the to was were "
+    "which with this these those their they not but also can such into".split()
+)
+QUERY_RE = re.compile(r'(?:(\w+):)?(?:"([^"]+)"|(\S+))')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id INTEGER PRIMARY KEY,
+    slug TEXT NOT NULL,
+    category TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    live INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS docs_slug ON docs (slug, live);
+CREATE TABLE IF NOT EXISTS fields (
+    doc_id INTEGER NOT NULL,
+    field TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    text BLOB NOT NULL,              -- zlib-compressed, for phrases and snippets
+    PRIMARY KEY (doc_id, field)
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    field TEXT NOT NULL,
+    segment INTEGER NOT NULL,
+    docs BLOB NOT NULL,              -- int32 doc ids, ascending
+    tfs BLOB NOT NULL,               -- uint16 term frequencies
+    PRIMARY KEY (term, field, segment)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value BLOB
+);
+"""
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+def parse_query(query):
+    """
+    Splits a query into (field, terms, phrase) clauses.
+    Supports bare words, "quoted phrases" and field:word / field:"phrase".
+    """
+    clauses = []
+    for field, phrase, word in QUERY_RE.findall(query):
+        field = field.lower() if field and field.lower() in FIELDS else None
+        text = phrase or word
+        terms = tokenize(text)
+        if terms:
+            clauses.append((field, terms, text.lower() if phrase else None))
+    return clauses
+
+
+def _doc_fields(job):
+    slug, path, category_dir = job
+    with open(path, 'r', encoding='utf-8') as f:
+        title, sections = parse_markdown(f.read(), slug)
+    return field_texts(title, sections, slug), category_name(category_dir)
+
+
+class SearchIndex:
+    """
+    On-disk BM25 index over data/md, one document per ingredient with one
+    field per outline heading.
+
+    Postings are stored per (term, field, segment) as packed arrays, so a query
+    is a handful of B-tree lookups plus vectorized scoring. Updates re-index
+    only changed files into a new segment and tombstone the old doc ids.
+    """
+
+    def __init__(self, path=INDEX_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+        self._load_stats()
+
+    def close(self):
+        self.db.close()
+
+    # --- BUILD ---
+
+    def update(self, md_dir=MD_DIR):
+        """Re-indexes added/changed files and drops removed ones. Returns (added, removed)."""
+        manifest, _ = refresh_manifest(md_dir)
+        indexed = dict(self.db.execute("SELECT slug, sha256 FROM docs WHERE live = 1"))
+
+        stale = [s for s in indexed if s not in manifest or manifest[s]["sha256"] != indexed[s]]
+        fresh = [s for s in sorted(manifest) if indexed.get(s) != manifest[s]["sha256"]]
+        if not stale and not fresh:
+            return 0, 0
+
+        with self.db:
+            self.db.executemany("UPDATE docs SET live = 0 WHERE slug = ? AND live = 1",
+                                ((s,) for s in stale))
+            if fresh:
+                self._index_segment(fresh, manifest)
+
+        segments = self.db.execute("SELECT COUNT(DISTINCT segment) FROM postings").fetchone()[0]
+        if segments > MAX_SEGMENTS:
+            self.merge()
+        self._write_stats()
+        self._load_stats()
+        return len(fresh), sum(1 for s in stale if s not in manifest)
+
+    def _index_segment(self, slugs, manifest):
+        (segment,) = self.db.execute("SELECT COALESCE(MAX(segment), -1) + 1 FROM postings").fetchone()
+        (next_id,) = self.db.execute("SELECT COALESCE(MAX(doc_id), -1) + 1 FROM docs").fetchone()
+
+        postings = {}
+        doc_rows, field_rows = [], []
+        for doc_id, slug in enumerate(slugs, start=next_id):
+            entry = manifest[slug]
+            fields, category = _doc_fields((slug, entry["path"], entry["category"]))
+            doc_rows.append((doc_id, slug, category, entry["sha256"]))
+            for field, text in fields.items():
+                tokens = tokenize(text)
+                field_rows.append((doc_id, field, len(tokens), zlib.compress(text.encode('utf-8'))))
+                for term, tf in Counter(tokens).items():
+                    postings.setdefault((term, field), ([], []))
+                    postings[(term, field)][0].append(doc_id)
+                    postings[(term, field)][1].append(min(tf, 65535))
+
+        self.db.executemany("INSERT INTO docs (doc_id, slug, category, sha256) VALUES (?, ?, ?, ?)", doc_rows)
+        self.db.executemany("INSERT INTO fields VALUES (?, ?, ?, ?)", field_rows)
+        self.db.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?, ?, ?)",
+            ((term, field, segment, np.asarray(d, dtype=np.int32).tobytes(),
+              np.asarray(t, dtype=np.uint16).tobytes())
+             for (term, field), (d, t) in postings.items()),
+        )
+
+    def merge(self):
+        """Folds all segments into one, dropping postings and rows of dead docs."""
+        live = self._live_mask()
+        rows = self.db.execute("SELECT term, field, docs, tfs FROM postings ORDER BY term, field, segment")
+        merged = {}
+        for term, field, docs, tfs in rows:
+            d = np.frombuffer(docs, dtype=np.int32)
+            t = np.frombuffer(tfs, dtype=np.uint16)
+            keep = live[d]
+            if keep.any():
+                merged.setdefault((term, field), []).append((d[keep], t[keep]))
+
+        with self.db:
+            self.db.execute("DELETE FROM postings")
+            self.db.executemany(
+                "INSERT INTO postings VALUES (?, ?, 0, ?, ?)",
+                ((term, field, np.concatenate([p[0] for p in parts]).tobytes(),
+                  np.concatenate([p[1] for p in parts]).tobytes())
+                 for (term, field), parts in merged.items()),
+            )
+            self.db.execute("DELETE FROM fields WHERE doc_id IN (SELECT doc_id FROM docs WHERE live = 0)")
+            self.db.execute("DELETE FROM docs WHERE live = 0")
+        self.db.execute("VACUUM")
+
+    def _live_mask(self):
+        (max_id,) = self.db.execute("SELECT COALESCE(MAX(doc_id), -1) FROM docs").fetchone()
+        live = np.zeros(max_id + 1, dtype=bool)
+        ids = [r[0] for r in self.db.execute("SELECT doc_id FROM docs WHERE live = 1")]
+        live[ids] = True
+        return live
+
+    def _write_stats(self):
+        """Precomputes the per-doc arrays queries need, so opening is one read."""
+        live = self._live_mask()
+        n = len(live)
+        lengths = np.zeros((len(FIELDS), n), dtype=np.float32)
+        for doc_id, field, length in self.db.execute("SELECT doc_id, field, length FROM fields"):
+            lengths[FIELDS.index(field), doc_id] = length
+
+        categories = sorted({c for (c,) in self.db.execute("SELECT DISTINCT category FROM docs")})
+        codes = np.zeros(n, dtype=np.int16)
+        slugs = [""] * n
+        for doc_id, slug, category in self.db.execute("SELECT doc_id, slug, category FROM docs"):
+            codes[doc_id] = categories.index(category)
+            slugs[doc_id] = slug
+
+        stats = {
+            "live": live.tobytes(),
+            "lengths": lengths.tobytes(),
+            "categories": "\n".join(categories).encode('utf-8'),
+            "codes": codes.tobytes(),
+            "slugs": "\n".join(slugs).encode('utf-8'),
+        }
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO stats VALUES (?, ?)", stats.items())
+
+    def _load_stats(self):
+        stats = dict(self.db.execute("SELECT key, value FROM stats"))
+        if not stats:
+            self.live = np.zeros(0, dtype=bool)
+            self.lengths = np.zeros((len(FIELDS), 0), dtype=np.float32)
+            self.categories, self.codes, self.slugs = [], np.zeros(0, dtype=np.int16), []
+            self.avg_lengths = np.ones(len(FIELDS))
+            return
+
+        self.live = np.frombuffer(stats["live"], dtype=bool)
+        n = len(self.live)
+        self.lengths = np.frombuffer(stats["lengths"], dtype=np.float32).reshape(len(FIELDS), n)
+        self.categories = stats["categories"].decode('utf-8').split("\n")
+        self.codes = np.frombuffer(stats["codes"], dtype=np.int16)
+        self.slugs = stats["slugs"].decode('utf-8').split("\n")
+        n_live = max(1, int(self.live.sum()))
+        self.avg_lengths = np.maximum(self.lengths[:, self.live].sum(axis=1) / n_live, 1.0)
+        self.n_live = n_live
+
+    # --- QUERY ---
+
+    def _postings(self, term, field=None):
+        """{field: (doc_ids, tfs)} across segments, live docs only."""
+        if field:
+            rows = self.db.execute("SELECT field, docs, tfs FROM postings WHERE term = ? AND field = ?",
+                                   (term, field))
+        else:
+            rows = self.db.execute("SELECT field, docs, tfs FROM postings WHERE term = ?", (term,))
+        parts = {}
+        for f, docs, tfs in rows:
+            parts.setdefault(f, []).append((np.frombuffer(docs, dtype=np.int32),
+                                            np.frombuffer(tfs, dtype=np.uint16)))
+        out = {}
+        for f, segs in parts.items():
+            d = np.concatenate([s[0] for s in segs]) if len(segs) > 1 else segs[0][0]
+            t = np.concatenate([s[1] for s in segs]) if len(segs) > 1 else segs[0][1]
+            keep = self.live[d]
+            out[f] = (d[keep], t[keep].astype(np.float32))
+        return out
+
+    def _field_text(self, doc_id, field):
+        row = self.db.execute("SELECT text FROM fields WHERE doc_id = ? AND field = ?",
+                              (int(doc_id), field)).fetchone()
+        return zlib.decompress(row[0]).decode('utf-8') if row else ""
+
+    def _matches_phrase(self, doc_id, field, phrase):
+        pattern = r"\b" + r"\W+".join(map(re.escape, TOKEN_RE.findall(phrase))) + r"\b"
+        fields = [field] if field else FIELDS
+        return any(re.search(pattern, self._field_text(doc_id, f).lower()) for f in fields)
+
+    def search(self, query, k=10, category=None):
+        """
+        Returns up to k (slug, score, field) hits, best first. `field` is the
+        field that contributed most to the score. Phrases must match exactly;
+        plain terms are ranked with BM25 (at least one must match).
+        """
+        clauses = parse_query(query)
+        if not clauses or not len(self.live):
+            return []
+
+        n = len(self.live)
+        per_field = np.zeros((len(FIELDS), n), dtype=np.float32)
+        required = None
+
+        for field, terms, phrase in clauses:
+            clause_docs = None
+            for term in terms:
+                postings = self._postings(term, field)
+                if not postings:
+                    clause_docs = np.zeros(n, dtype=bool)
+                    continue
+                # Boolean union across fields: O(n), no sort
+                has_term = np.zeros(n, dtype=bool)
+                for d, _ in postings.values():
+                    has_term[d] = True
+                df = int(has_term.sum())
+                idf = np.log(1 + (self.n_live - df + 0.5) / (df + 0.5))
+                for f, (d, tf) in postings.items():
+                    fi = FIELDS.index(f)
+                    norm = K1 * (1 - B + B * self.lengths[fi, d] / self.avg_lengths[fi])
+                    contrib = FIELD_WEIGHTS[f] * idf * tf * (K1 + 1) / (tf + norm)
+                    per_field[fi, d] += contrib
+                if phrase:
+                    clause_docs = has_term if clause_docs is None else clause_docs & has_term
+            if phrase:
+                required = clause_docs if required is None else required & clause_docs
+
+        score = per_field.sum(axis=0)
+        mask = score > 0
+        if category:
+            if category not in self.categories:
+                return []
+            mask &= self.codes == self.categories.index(category)
+        if required is not None:
+            mask &= required
+
+        candidates = np.flatnonzero(mask)
+        if not len(candidates):
+            return []
+
+        phrases = [(f, p) for f, _, p in clauses if p]
+        hits = []
+        for doc_id in self._ranked(candidates, score, k * 4 if phrases else k):
+            if phrases and not all(self._matches_phrase(doc_id, f, p) for f, p in phrases):
+                continue
+            # Report the strongest content field; the title only if nothing else hit
+            contrib = per_field[:, doc_id]
+            body_best = int(np.argmax(contrib[1:])) + 1
+            best = FIELDS[body_best] if contrib[body_best] > 0 else "title"
+            hits.append((self.slugs[doc_id], round(float(score[doc_id]), 4), best))
+            if len(hits) == k:
+                break
+        return hits
+
+    @staticmethod
+    def _ranked(candidates, score, first):
+        """
+        Yields candidates by descending score. Only the best `first` are sorted
+        up front (argpartition); the rest are sorted only if the caller keeps
+        consuming, e.g. when phrase checks reject the leaders.
+        """
+        neg = -score[candidates]
+        if len(candidates) > first:
+            part = np.argpartition(neg, first)
+            head, tail = part[:first], part[first:]
+            yield from candidates[head[np.argsort(neg[head], kind="stable")]]
+            yield from candidates[tail[np.argsort(neg[tail], kind="stable")]]
+        else:
+            yield from candidates[np.argsort(neg, kind="stable")]
+
+    def snippet(self, slug, field, query, width=160):
+        """A short excerpt of `field` around the first query term."""
+        row = self.db.execute("SELECT doc_id FROM docs WHERE slug = ? AND live = 1", (slug,)).fetchone()
+        if not row:
+            return ""
+        text = " ".join(self._field_text(row[0], field).split())
+        terms = [t for _, ts, _ in parse_query(query) for t in ts]
+        m = re.search(r"\b(" + "|".join(map(re.escape, terms)) + r")", text, re.IGNORECASE) if terms else None
+        start = max(0, (m.start() if m else 0) - width // 3)
+        return ("…" if start else "") + text[start:start + width] + ("…" if start + width < len(text) else "")
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text search over the markdown corpus")
+    parser.add_argument("query", nargs="?", help='e.g. \'culinary:tempering "mustard seeds"\'')
+    parser.add_argument("-k", type=int, default=10, help="number of results")
+    parser.add_argument("--category", help="restrict to one category, e.g. 'Staples'")
+    parser.add_argument("--no-update", action="store_true", help="skip the incremental re-index")
+    args = parser.parse_args(argv)
+
+    index = SearchIndex()
+    if not args.no_update:
+        added, removed = index.update()
+        if added or removed:
+            print(f"🔄 Indexed {added} file(s), removed {removed}.")
+
+    if args.query:
+        hits = index.search(args.query, k=args.k, category=args.category)
+        if not hits:
+            print(f"❌ No matches found for '{args.query}'")
+        for i, (slug, score, field) in enumerate(hits):
+            print(f"[{i}] {slug:<35} | {score:>7.3f} | {field}")
+            print(f"    {index.snippet(slug, field, args.query)}")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
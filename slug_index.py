@@ -0,0 +1,108 @@
+import re
+from collections import defaultdict
+
+import numpy as np
+
+# Character n-gram size used by the inverted index
+NGRAM = 3
+
+
+def normalize(text):
+    """'Acesulfame-Potassium INS_950' -> 'acesulfame potassium ins 950'"""
+    return " ".join(re.split(r"[\s\-_]+", str(text).lower())).strip()
+
+
+def ngrams(text):
+    # Pad with spaces so word starts/ends carry weight and short queries
+    # like '950' still produce trigrams.
+    padded = f" {text} "
+    if len(padded) <= NGRAM:
+        return {padded}
+    return {padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)}
+
+
+class SlugIndex:
+    """
+    Fuzzy search index over canon-slugs, built once at load.
+
+    Candidates come from a character trigram inverted index and are ranked by
+    trigram overlap (Dice) blended with whole-token hits, so hyphen/space
+    variants and bare INS numbers ('950' -> 'acesulfame-potassium-ins-950')
+    both resolve. `position` maps each slug to its row position in the table.
+    """
+
+    def __init__(self, slugs):
+        self.slugs = []
+        self.position = {}
+        gram_counts = []
+        postings = defaultdict(list)
+        token_postings = defaultdict(list)
+
+        for row, slug in enumerate(slugs):
+            slug = str(slug)
+            if slug in self.position:
+                continue
+            self.position[slug] = row
+            sid = len(self.slugs)
+            self.slugs.append(slug)
+
+            norm = normalize(slug)
+            grams = ngrams(norm)
+            gram_counts.append(len(grams))
+            for g in grams:
+                postings[g].append(sid)
+            for t in set(norm.split()):
+                token_postings[t].append(sid)
+
+        # Posting lists are frozen into int arrays so a query is a couple of
+        # bincounts plus a vectorized score, independent of Python loop speed.
+        self._gram_counts = np.asarray(gram_counts, dtype=np.float64)
+        self._postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+        self._token_postings = {t: np.asarray(ids, dtype=np.int32) for t, ids in token_postings.items()}
+
+    def __len__(self):
+        return len(self.slugs)
+
+    def __contains__(self, slug):
+        return slug in self.position
+
+    def _hits(self, postings, keys):
+        lists = [postings[k] for k in keys if k in postings]
+        if not lists:
+            return None
+        return np.bincount(np.concatenate(lists), minlength=len(self.slugs))
+
+    def search(self, query, n=10, cutoff=0.1):
+        """Returns up to `n` (slug, score) pairs, best first, with score >= cutoff."""
+        norm = normalize(query)
+        if not norm or not self.slugs:
+            return []
+
+        q_grams = ngrams(norm)
+        q_tokens = set(norm.split())
+
+        shared = self._hits(self._postings, q_grams)
+        # Exact token hits (e.g. an INS number) count even when trigram
+        # overlap is small relative to a long slug.
+        token_hits = self._hits(self._token_postings, q_tokens)
+        if shared is None and token_hits is None:
+            return []
+
+        score = np.zeros(len(self.slugs))
+        if shared is not None:
+            score += 0.6 * 2.0 * shared / (len(q_grams) + self._gram_counts)
+        if token_hits is not None:
+            score += 0.4 * token_hits / len(q_tokens)
+
+        candidates = np.flatnonzero(score >= cutoff)
+        if len(candidates) > n:
+            # Keep everything tied with the n-th best so tie-breaks stay stable
+            nth = np.partition(score[candidates], len(candidates) - n)[len(candidates) - n]
+            candidates = candidates[score[candidates] >= nth]
+
+        ranked = sorted(candidates.tolist(), key=lambda i: (-score[i], len(self.slugs[i]), self.slugs[i]))
+        return [(self.slugs[i], round(float(score[i]), 3)) for i in ranked[:n]]
+
+    def get_close_matches(self, query, n=10, cutoff=0.1):
+        """Drop-in for difflib.get_close_matches over the indexed slugs."""
+        return [slug for slug, _ in self.search(query, n=n, cutoff=cutoff)]
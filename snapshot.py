@@ -0,0 +1,394 @@
+import os
+import sys
+import csv
+import json
+import hashlib
+import argparse
+import threading
+import subprocess
+from itertools import islice
+from collections import Counter
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+
+from corpus import MD_DIR, parse_markdown
+from manifest import CACHE_DIR, refresh_manifest, load_json_cache, save_json_cache
+
+# --- CONFIGURATION ---
+CSV_FILE = "v0.1-v0.2_audit.csv"
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, "snapshots")
+# Section hashes per file content hash, plus git blob id -> content hash
+HASH_CACHE_FILE = os.path.join(CACHE_DIR, "snapshot_hashes.json")
+HASH_CACHE_LIMIT = 200000   # entries kept per table; the least recently saved go first
+SNAPSHOT_VERSION = 1
+HASH_LENGTH = 16           # hex digits kept for section and audit-row hashes
+PARALLEL_THRESHOLD = 64    # files parsed in worker processes above this many
+WORKTREE = "worktree"
+
+
+def short_hash(text):
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+
+
+def section_hashes(text):
+    """
+    [[key, hash]] for each section of a markdown file, in file order. Keys
+    are the headings; a repeated heading gets '#2', '#3', ... appended.
+    """
+    title, sections = parse_markdown(text)
+    seen = Counter()
+    hashes = []
+    for heading, body in sections:
+        seen[heading] += 1
+        key = heading if seen[heading] == 1 else f"{heading}#{seen[heading]}"
+        hashes.append([key, short_hash(body)])
+    return hashes
+
+
+def _hash_blob(data):
+    """Worker: raw file bytes -> (sha256, section hashes)."""
+    return hashlib.sha256(data).hexdigest(), section_hashes(data.decode('utf-8'))
+
+
+def _hash_file(path):
+    with open(path, 'rb') as f:
+        return _hash_blob(f.read())
+
+
+def _map(function, jobs, workers=None):
+    if len(jobs) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(function, jobs, chunksize=32))
+    return [function(job) for job in jobs]
+
+
+def audit_rows(state):
+    """{slug: [status, row hash]}; the hash covers status and note."""
+    return {slug: [status.lower(), short_hash(f"{status.lower()}\0{note}")]
+            for slug, (status, note) in state.items()}
+
+
+def _snapshot(source, files, audit):
+    return {
+        "version": SNAPSHOT_VERSION,
+        "source": source,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "files": files,
+        "audit": audit,
+    }
+
+
+def _save_hash_cache(cache, used_shas, used_oids=()):
+    """
+    Saves the hash cache with the entries this snapshot used moved to the
+    end; the oldest others are dropped once a table exceeds HASH_CACHE_LIMIT.
+    """
+    for name, used in (("sections", used_shas), ("blobs", used_oids)):
+        table = cache[name]
+        for key in used:
+            if key in table:
+                table[key] = table.pop(key)
+        excess = len(table) - max(HASH_CACHE_LIMIT, len(used))
+        for key in list(islice(table, max(excess, 0))):
+            del table[key]
+    save_json_cache(cache, HASH_CACHE_FILE)
+
+
+# --- SOURCES ---
+
+def snapshot_worktree(md_dir=MD_DIR, csv_file=CSV_FILE, workers=None):
+    """Snapshot of the files on disk; only files with new content are parsed."""
+    from journal import read_state
+
+    manifest, _ = refresh_manifest(md_dir)
+    cache = load_json_cache(HASH_CACHE_FILE, {"sections": {}, "blobs": {}})
+    sections = cache.setdefault("sections", {})
+
+    missing = sorted({e["path"] for e in manifest.values() if e["sha256"] not in sections})
+    for sha, hashes in _map(_hash_file, missing, workers):
+        sections[sha] = hashes
+    if missing:
+        _save_hash_cache(cache, {e["sha256"] for e in manifest.values()})
+
+    files = {slug: {"category": e["category"], "sha256": e["sha256"], "sections": sections[e["sha256"]]}
+             for slug, e in manifest.items()}
+    audit = audit_rows(read_state(csv_file)) if os.path.exists(csv_file) else {}
+    return _snapshot(WORKTREE, files, audit)
+
+
+def _git(*args):
+    """stdout of a git command; CalledProcessError carries git's stderr."""
+    return subprocess.run(["git", *args], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE).stdout
+
+
+def _git_file(commit, path):
+    """Contents of `path` at `commit`, or None if it is not in that tree."""
+    try:
+        return _git("show", f"{commit}:{path}").decode('utf-8')
+    except subprocess.CalledProcessError:
+        return None
+
+
+def _cat_blobs(oids):
+    """Streams blob contents for `oids` through one 'git cat-file --batch' process."""
+    if not oids:
+        return {}
+    proc = subprocess.Popen(["git", "cat-file", "--batch"], stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def feed():
+        # From a thread: with 100k ids both pipes fill up, and a single
+        # thread writing then reading would deadlock against git
+        proc.stdin.write("".join(f"{oid}\n" for oid in oids).encode())
+        proc.stdin.close()
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    blobs = {}
+    for oid in oids:
+        header = proc.stdout.readline().split()
+        size = int(header[2])
+        blobs[oid] = proc.stdout.read(size)
+        proc.stdout.read(1)  # trailing newline
+    writer.join()
+    proc.wait()
+    return blobs
+
+
+def snapshot_git(rev, md_dir=MD_DIR, csv_file=CSV_FILE, workers=None):
+    """
+    Snapshot of `rev` straight from the object store; the worktree is not
+    touched. Like the worktree snapshot, audit rows are the committed CSV
+    with the committed journal replayed over it.
+    """
+    from journal import journal_path, parse_journal, replay_state
+
+    try:
+        commit = _git("rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}").decode().strip()
+    except subprocess.CalledProcessError as e:
+        # --quiet leaves stderr empty for an unknown revision, but not outside a repository
+        reason = e.stderr.decode(errors='replace').strip()
+        raise ValueError(reason or f"'{rev}' is not a snapshot file, '{WORKTREE}' or a git revision") from None
+    cache = load_json_cache(HASH_CACHE_FILE, {"sections": {}, "blobs": {}})
+    sections, blob_shas = cache.setdefault("sections", {}), cache.setdefault("blobs", {})
+
+    entries = []
+    for record in _git("ls-tree", "-r", "-z", commit, "--", md_dir).split(b"\0"):
+        if not record:
+            continue
+        meta, path = record.decode('utf-8').split("\t", 1)
+        _, kind, oid = meta.split()
+        if kind == "blob" and path.endswith(".md"):
+            entries.append((path, oid))
+
+    missing = sorted({oid for _, oid in entries if blob_shas.get(oid) not in sections})
+    if missing:
+        blobs = _cat_blobs(missing)
+        for oid, (sha, hashes) in zip(missing, _map(_hash_blob, [blobs[o] for o in missing], workers)):
+            blob_shas[oid] = sha
+            sections[sha] = hashes
+        oids = {oid for _, oid in entries}
+        _save_hash_cache(cache, {blob_shas[oid] for oid in oids}, oids)
+
+    files = {}
+    # Same rule as the manifest: the first category in sorted order wins
+    for path, oid in sorted(entries):
+        slug = os.path.basename(path)[:-3]
+        if slug not in files:
+            sha = blob_shas[oid]
+            category = os.path.relpath(os.path.dirname(path), md_dir)
+            files[slug] = {"category": category, "sha256": sha, "sections": sections[sha]}
+
+    audit = {}
+    text = _git_file(commit, csv_file)
+    if text is not None:
+        state = {r['canon-slug']: (r['status'], r['note']) for r in csv.DictReader(text.splitlines())}
+        journal_text = _git_file(commit, journal_path(csv_file))
+        if journal_text:
+            replay_state(state, parse_journal(journal_text.splitlines(), f"{commit[:12]}:{journal_path(csv_file)}"))
+        audit = audit_rows(state)
+    return _snapshot(f"git:{commit}", files, audit)
+
+
+def load_snapshot(spec, workers=None):
+    """A snapshot file, 'worktree', or any git revision."""
+    if spec == WORKTREE:
+        return snapshot_worktree(workers=workers)
+    if os.path.isfile(spec):
+        with open(spec, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    return snapshot_git(spec, workers=workers)
+
+
+# --- DIFF ---
+
+def diff_sections(old, new):
+    """(added, removed, changed) section keys between two [[key, hash]] lists."""
+    old, new = dict(old), dict(new)
+    added = [k for k in new if k not in old]
+    removed = [k for k in old if k not in new]
+    changed = [k for k in new if k in old and old[k] != new[k]]
+    return added, removed, changed
+
+
+def diff_snapshots(a, b):
+    """
+    Machine-readable changes from snapshot `a` to snapshot `b`.
+
+    Files that vanished under one slug and appeared under another with the
+    same content hash are reported as renames, not as a delete plus an add.
+    Sections are only compared for files whose content hash differs, so
+    the cost is a few set operations plus work proportional to the change.
+    """
+    old_files, new_files = a["files"], b["files"]
+    added = sorted(new_files.keys() - old_files.keys())
+    removed = sorted(old_files.keys() - new_files.keys())
+
+    by_hash = {}
+    for slug in removed:
+        by_hash.setdefault(old_files[slug]["sha256"], []).append(slug)
+    renamed, still_added = [], []
+    for slug in added:
+        sources = by_hash.get(new_files[slug]["sha256"])
+        if sources:
+            renamed.append([sources.pop(0), slug])
+        else:
+            still_added.append(slug)
+    renamed_from = {old for old, _ in renamed}
+    removed = [s for s in removed if s not in renamed_from]
+
+    changed, moved = [], []
+    sections = {"added": [], "removed": [], "changed": []}
+    for slug in sorted(old_files.keys() & new_files.keys()):
+        old, new = old_files[slug], new_files[slug]
+        if old["category"] != new["category"]:
+            moved.append([slug, old["category"], new["category"]])
+        if old["sha256"] == new["sha256"]:
+            continue
+        changed.append(slug)
+        for op, keys in zip(("added", "removed", "changed"), diff_sections(old["sections"], new["sections"])):
+            sections[op].extend([slug, k] for k in keys)
+
+    old_audit, new_audit = a.get("audit", {}), b.get("audit", {})
+    transitions, notes = [], []
+    for slug in sorted(old_audit.keys() & new_audit.keys()):
+        (old_status, old_hash), (new_status, new_hash) = old_audit[slug], new_audit[slug]
+        if old_status != new_status:
+            transitions.append([slug, old_status, new_status])
+        elif old_hash != new_hash:
+            notes.append(slug)
+    audit = {
+        "added": [[s, new_audit[s][0]] for s in sorted(new_audit.keys() - old_audit.keys())],
+        "removed": [[s, old_audit[s][0]] for s in sorted(old_audit.keys() - new_audit.keys())],
+        "transitions": transitions,
+        "notes_changed": notes,
+    }
+
+    # Everything a downstream index has to rebuild or drop
+    touched = set(still_added) | set(removed) | set(changed) | {s for pair in renamed for s in pair}
+    touched |= {s for s, _, _ in moved} | {s for s, _, _ in transitions} | set(notes)
+    touched |= {s for s, _ in audit["added"]} | {s for s, _ in audit["removed"]}
+
+    return {
+        "from": a["source"],
+        "to": b["source"],
+        "files": {"added": still_added, "removed": removed, "renamed": renamed,
+                  "moved": moved, "changed": changed},
+        "sections": sections,
+        "audit": audit,
+        "transition_counts": dict(Counter(f"{o}->{n}" for _, o, n in transitions).most_common()),
+        "touched": sorted(touched),
+    }
+
+
+def iter_records(diff):
+    """Flattens a diff into one JSON-able record per change (for --jsonl)."""
+    files = diff["files"]
+    for op in ("added", "removed", "changed"):
+        for slug in files[op]:
+            yield {"kind": "file", "op": op, "slug": slug}
+    for old, new in files["renamed"]:
+        yield {"kind": "file", "op": "renamed", "slug": new, "previous": old}
+    for slug, old, new in files["moved"]:
+        yield {"kind": "file", "op": "moved", "slug": slug, "previous": old, "category": new}
+    for op, pairs in diff["sections"].items():
+        for slug, key in pairs:
+            yield {"kind": "section", "op": op, "slug": slug, "section": key}
+    audit = diff["audit"]
+    for op in ("added", "removed"):
+        for slug, status in audit[op]:
+            yield {"kind": "audit", "op": op, "slug": slug, "status": status}
+    for slug, old, new in audit["transitions"]:
+        yield {"kind": "audit", "op": "transition", "slug": slug, "previous": old, "status": new}
+    for slug in audit["notes_changed"]:
+        yield {"kind": "audit", "op": "note", "slug": slug}
+
+
+def print_summary(diff):
+    files, audit = diff["files"], diff["audit"]
+    print(f"\n🔀 {diff['from']} -> {diff['to']}", file=sys.stderr)
+    print(f"   Files: +{len(files['added'])} -{len(files['removed'])} ~{len(files['changed'])} "
+          f"renamed {len(files['renamed'])}, moved {len(files['moved'])}", file=sys.stderr)
+    s = diff["sections"]
+    print(f"   Sections: +{len(s['added'])} -{len(s['removed'])} ~{len(s['changed'])}", file=sys.stderr)
+    print(f"   Audit rows: +{len(audit['added'])} -{len(audit['removed'])}, "
+          f"{len(audit['transitions'])} status change(s), {len(audit['notes_changed'])} note edit(s)",
+          file=sys.stderr)
+    for transition, count in diff["transition_counts"].items():
+        print(f"     {transition:<20} {count}", file=sys.stderr)
+    print(f"   Touched slugs: {len(diff['touched'])}", file=sys.stderr)
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description="Snapshot and diff the corpus and audit state")
+    commands = parser.add_subparsers(dest="command", required=True)
+    save = commands.add_parser("save", help="record a snapshot")
+    save.add_argument("source", nargs="?", default=WORKTREE, help="'worktree' (default) or a git revision")
+    save.add_argument("--out", help=f"snapshot file (default: {SNAPSHOT_DIR}/<name>.json)")
+    diff = commands.add_parser("diff", help="diff two snapshots (files, 'worktree' or git revisions)")
+    diff.add_argument("old")
+    diff.add_argument("new", nargs="?", default=WORKTREE)
+    diff.add_argument("--out", help="write the JSON diff here (default: stdout)")
+    diff.add_argument("--jsonl", action="store_true", help="one record per change instead of one JSON object")
+    for sub in (save, diff):
+        sub.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    try:
+        if args.command == "save":
+            snapshots = [load_snapshot(args.source, args.workers)]
+        else:
+            snapshots = [load_snapshot(args.old, args.workers), load_snapshot(args.new, args.workers)]
+    except ValueError as e:
+        print(f"❌ Error: {e}")
+        return 1
+    except subprocess.CalledProcessError as e:
+        print(f"❌ Error: git {e.cmd[1]} failed: {e.stderr.decode(errors='replace').strip()}")
+        return 1
+
+    if args.command == "save":
+        snapshot = snapshots[0]
+        name = snapshot["source"].replace("git:", "")[:12]
+        out_file = args.out or os.path.join(SNAPSHOT_DIR, f"{name}.json")
+        save_json_cache(snapshot, out_file)
+        print(f"✅ Snapshot of {snapshot['source']}: {len(snapshot['files'])} files, "
+              f"{len(snapshot['audit'])} audit rows -> {out_file}")
+        return 0
+
+    result = diff_snapshots(*snapshots)
+    out = open(args.out, 'w', encoding='utf-8') if args.out else sys.stdout
+    try:
+        if args.jsonl:
+            for record in iter_records(result):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            json.dump(result, out, ensure_ascii=False, indent=1)
+            out.write("\n")
+    finally:
+        if args.out:
+            out.close()
+    print_summary(result)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
@@ -1,5 +1,7 @@
-import pandas as pd
 import os
+from collections import Counter
+
+from journal import read_state
 
 # --- CONFIGURATION ---
 CSV_FILE = "v0.1-v0.2_audit.csv"
@@ -9,14 +11,14 @@ def print_state_stats():
         print(f"❌ Error: {CSV_FILE} not found. Run the initializer or ingester first.")
         return
 
-    # Load the state machine
-    df = pd.read_csv(CSV_FILE)
+    # Load the state machine (CSV snapshot plus pending journal decisions;
+    # stdlib only, so this report starts without pandas)
+    state = read_state(CSV_FILE)
     
     # Ensure status is string and handled consistently
-    df['status'] = df['status'].fillna('unknown').astype(str).str.lower()
+    status_counts = Counter((status or 'unknown').lower() for status, _ in state.values())
     
-    total_entries = len(df)
-    status_counts = df['status'].value_counts()
+    total_entries = len(state)
 
     print("\n" + "="*45)
     print(f"📊 ENCYCLOPEDIA STATE SUMMARY: {CSV_FILE}")
@@ -29,7 +31,7 @@ def print_state_stats():
     target_statuses = ['approve', 'flag', 'merge', 'delete']
     
     # Track which statuses exist in the file but aren't in our target list
-    found_statuses = status_counts.index.tolist()
+    found_statuses = [s for s, _ in status_counts.most_common()]
 
     for status in target_statuses:
         count = status_counts.get(status, 0)
@@ -1,17 +1,17 @@
-import time
 import os
-import pandas as pd
-from tqdm import tqdm
-from google import genai
-from google.genai import types
-from api_key import api_key
+
+from journal import read_state
+from audit_runner import AuditRunner, GeminiClient, run_audit
+from response_cache import ResponseCache
 
 # --- CONFIGURATION ---
-client = genai.Client(api_key=api_key)
 MODEL_ID = "gemini-2.0-flash"
 CSV_FILE = "v0.1-v0.2_audit.csv"
 LOG_FILE = "fssai_audit_results.log"
-BATCH_SIZE = 50
+BATCH_SIZE = 50  # starting size; tuned at runtime
+MAX_WORKERS = 4
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1_000_000
 
 # The XML Instruction Set you provided
 SYSTEM_INSTRUCTION = """
@@ -49,36 +49,14 @@ SYSTEM_INSTRUCTION = """
 def get_target_slugs():
     if not os.path.exists(CSV_FILE):
         return []
-    df = pd.read_csv(CSV_FILE)
+    state = read_state(CSV_FILE)
     # Only send items currently marked as 'approve' or 'flag'
     # This ignores 'delete' and 'merge' entries entirely.
-    targets = df[df['status'].str.lower().isin(['approve', 'flag'])]['canon-slug'].tolist()
+    targets = [slug for slug, (status, _) in state.items() if status.lower() in ('approve', 'flag')]
     return targets
 
-def call_gemini_with_backoff(batch):
-    wait_time = 5
-    prompt = f"Audit these ingredients:\n{', '.join(batch)}"
-    
-    for attempt in range(6): # Exponential backoff up to 6 retries
-        try:
-            response = client.models.generate_content(
-                model=MODEL_ID,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_INSTRUCTION,
-                    temperature=0
-                )
-            )
-            return response.text
-        except Exception as e:
-            if "429" in str(e):
-                print(f"\n⚠️ Rate limit hit. Retrying in {wait_time}s...")
-                time.sleep(wait_time)
-                wait_time *= 2
-            else:
-                print(f"\n❌ API Error: {e}")
-                time.sleep(wait_time)
-    return ""
+def build_prompt(batch):
+    return f"Audit these ingredients:\n{', '.join(batch)}"
 
 def run_fssai_audit():
     slugs = get_target_slugs()
@@ -88,21 +66,19 @@ def run_fssai_audit():
 
     print(f"🚀 Starting audit of {len(slugs)} items using Gemini 2.0 Flash...")
     
-    # Initialize Log File
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("--- FSSAI AUDIT SESSION START ---\n")
-
-    # Use tqdm for a clean progress bar
-    for i in tqdm(range(0, len(slugs), BATCH_SIZE), desc="Auditing Batches"):
-        batch = slugs[i : i + BATCH_SIZE]
-        result = call_gemini_with_backoff(batch)
-        
-        if result:
-            with open(LOG_FILE, "a", encoding="utf-8") as f:
-                f.write(result + "\n")
-        
-        # Respectful gap between batches to prevent immediate 429s
-        time.sleep(2)
+    runner = AuditRunner(GeminiClient.from_api_key(MODEL_ID), SYSTEM_INSTRUCTION,
+                         max_workers=MAX_WORKERS, requests_per_minute=REQUESTS_PER_MINUTE,
+                         tokens_per_minute=TOKENS_PER_MINUTE)
+    cache = ResponseCache(MODEL_ID, SYSTEM_INSTRUCTION)
+    try:
+        # Cached slugs are written straight to the log; only new, changed
+        # or previously failed slugs are sent to the model. Every answer is
+        # checked against the output protocol; bad or missing ones are re-sent.
+        run_audit(runner, cache, slugs, BATCH_SIZE, build_prompt, LOG_FILE,
+                  header="--- FSSAI AUDIT SESSION START ---", desc="Auditing Batches",
+                  fields=3, statuses={"approve", "delete", "flag"})
+    finally:
+        cache.close()
 
     print(f"\n✨ Audit complete. Results saved to {LOG_FILE}")
 
@@ -1,17 +1,17 @@
-import time
 import os
-import pandas as pd
-from tqdm import tqdm
-from google import genai
-from google.genai import types
-from api_key import api_key
+
+from journal import read_state
+from audit_runner import AuditRunner, GeminiClient, run_audit
+from response_cache import ResponseCache
 
 # --- CONFIGURATION ---
-client = genai.Client(api_key=api_key)
 MODEL_ID = "gemini-2.0-flash"
 CSV_FILE = "v0.1-v0.2_audit.csv"
 FACET_LOG = "ingredient_facets_audit.log"
-BATCH_SIZE = 25
+BATCH_SIZE = 25  # starting size; tuned at runtime
+MAX_WORKERS = 4
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1_000_000
 
 SYSTEM_INSTRUCTION = """
 <instruction_set name="FSSAI_PMEST_Facet_Extractor">
@@ -44,33 +44,13 @@ SYSTEM_INSTRUCTION = """
 def get_target_slugs():
     if not os.path.exists(CSV_FILE):
         return []
-    df = pd.read_csv(CSV_FILE)
+    state = read_state(CSV_FILE)
     # Auditing the same 621 items previously targeted
-    targets = df[df['status'].str.lower().isin(['approve', 'flag'])]['canon-slug'].tolist()
+    targets = [slug for slug, (status, _) in state.items() if status.lower() in ('approve', 'flag')]
     return targets
 
-def call_gemini_facets(batch):
-    wait_time = 5
-    prompt = f"Extract facets and standardize these slugs:\n{', '.join(batch)}"
-    
-    for attempt in range(6):
-        try:
-            response = client.models.generate_content(
-                model=MODEL_ID,
-                contents=prompt,
-                config=types.GenerateContentConfig(
-                    system_instruction=SYSTEM_INSTRUCTION,
-                    temperature=0
-                )
-            )
-            return response.text
-        except Exception as e:
-            if "429" in str(e):
-                time.sleep(wait_time)
-                wait_time *= 2
-            else:
-                time.sleep(wait_time)
-    return ""
+def build_prompt(batch):
+    return f"Extract facets and standardize these slugs:\n{', '.join(batch)}"
 
 def run_facet_audit():
     slugs = get_target_slugs()
@@ -79,18 +59,19 @@ def run_facet_audit():
 
     print(f"🚀 Extracting Facets for {len(slugs)} items...")
     
-    with open(FACET_LOG, "w", encoding="utf-8") as f:
-        f.write("--- INGREDIENT FACET AUDIT START ---\n")
-
-    for i in tqdm(range(0, len(slugs), BATCH_SIZE), desc="Analyzing Facets"):
-        batch = slugs[i : i + BATCH_SIZE]
-        result = call_gemini_facets(batch)
-        
-        if result:
-            with open(FACET_LOG, "a", encoding="utf-8") as f:
-                f.write(result.strip() + "\n")
-        
-        time.sleep(1) # Flash 2.0 is fast, but let's keep it stable
+    runner = AuditRunner(GeminiClient.from_api_key(MODEL_ID), SYSTEM_INSTRUCTION,
+                         max_workers=MAX_WORKERS, requests_per_minute=REQUESTS_PER_MINUTE,
+                         tokens_per_minute=TOKENS_PER_MINUTE)
+    cache = ResponseCache(MODEL_ID, SYSTEM_INSTRUCTION)
+    try:
+        # Cached slugs are written straight to the log; only new, changed
+        # or previously failed slugs are sent to the model. Every answer is
+        # checked against the output protocol; bad or missing ones are re-sent.
+        run_audit(runner, cache, slugs, BATCH_SIZE, build_prompt, FACET_LOG,
+                  header="--- INGREDIENT FACET AUDIT START ---", desc="Analyzing Facets",
+                  fields=4)
+    finally:
+        cache.close()
 
     print(f"\n✨ Facet audit complete. Results saved to {FACET_LOG}")
 
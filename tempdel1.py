@@ -1,6 +1,6 @@
 import os
-import re
-from collections import Counter
+
+import audit_store
 
 # --- CONFIGURATION ---
 LOG_FILE = "ingredient_facets_audit.log"
@@ -10,51 +10,20 @@ def analyze_facet_complexity():
         print(f"❌ Error: {LOG_FILE} not found.")
         return
 
+    # The log is parsed once into the indexed store (a no-op if unchanged);
+    # everything below is a query against it.
+    db = audit_store.connect()
+    session_id = audit_store.ingest_log(db, LOG_FILE, "facets")
+
+    clean, complex_, samples_clean, samples_complex = audit_store.facet_complexity(db, session_id)
     stats = {
-        "Clean (No facets)": 0,
-        "Complex (Requires Facets)": 0
+        "Clean (No facets)": clean,
+        "Complex (Requires Facets)": complex_
     }
     
     # Track the most common required facets
-    facet_distribution = Counter()
-    
-    # Tracking samples for review
-    samples_clean = []
-    samples_complex = []
-
-    # Regex to handle the 4-part format: 
-    # original :: standard :: facets :: reasoning
-    pattern = re.compile(r"^(.*?) :: (.*?) :: (.*?) :: (.*)$", re.IGNORECASE)
-
-    with open(LOG_FILE, 'r', encoding='utf-8') as f:
-        for line in f:
-            line = line.strip()
-            if not line or "---" in line:
-                continue
-            
-            match = pattern.search(line)
-            if match:
-                original = match.group(1).strip()
-                facets = match.group(3).strip()
-                
-                # Check for "no specific facets" or empty tags
-                is_clean = any(phrase in facets.lower() for phrase in [
-                    "no specific facets", "none", "n/a", "no facets required"
-                ]) or facets == ""
-
-                if is_clean:
-                    stats["Clean (No facets)"] += 1
-                    if len(samples_clean) < 5:
-                        samples_clean.append(original)
-                else:
-                    stats["Complex (Requires Facets)"] += 1
-                    # Extract individual #tags if present
-                    tags = re.findall(r"#[\w-]+(?::[\w-]+)?", facets)
-                    for tag in tags:
-                        facet_distribution[tag] += 1
-                    
-                    if len(samples_complex) < 5:
-                        samples_complex.append(f"{original} -> {facets}")
+    facet_distribution = audit_store.top_facets(db, session_id, n=10)
+    db.close()
 
     total = sum(stats.values())
     
@@ -73,7 +42,7 @@ def analyze_facet_complexity():
     print("-" * 60)
     
     print("\n🏷️  MOST COMMON REQUIRED FACETS:")
-    for tag, count in facet_distribution.most_common(10):
+    for tag, count in facet_distribution:
         print(f"  {tag:<30} : {count}")
 
     print("-" * 60)
@@ -0,0 +1,127 @@
+import os
+
+import pytest
+
+import apply
+import build_master
+
+
+class Boom(Exception):
+    pass
+
+
+@pytest.fixture
+def corpus(tmp_path, monkeypatch):
+    """Three files plus staged replacements, with the repo's relative paths under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    os.makedirs("data/md/staples")
+    files = {"data/md/staples/rice.md": "# Rice\n\nold rice\n",
+             "data/md/staples/wheat.md": "# Wheat\n\nold wheat\n",
+             "data/md/staples/ragi.md": "# Ragi\n\nold ragi\n"}
+    for path, text in files.items():
+        write(path, text)
+    return files
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def make_ops():
+    """Rewrite rice, remove wheat, create millet."""
+    write("data/md/staples/rice.md" + apply.STAGE_SUFFIX, "# Rice\n\nnew rice\n")
+    write("data/md/staples/millet.md" + apply.STAGE_SUFFIX, "# Millet\n\nnew millet\n")
+    return [apply._op("data/md/staples/rice.md", "data/md/staples/rice.md" + apply.STAGE_SUFFIX),
+            apply._op("data/md/staples/wheat.md", None),
+            apply._op("data/md/staples/millet.md", "data/md/staples/millet.md" + apply.STAGE_SUFFIX)]
+
+
+def leftovers():
+    return sorted(name for name in os.listdir("data/md/staples")
+                  if name.endswith((apply.STAGE_SUFFIX, apply.BACKUP_SUFFIX)))
+
+
+def assert_untouched(files):
+    assert sorted(os.listdir("data/md/staples")) == ["ragi.md", "rice.md", "wheat.md"]
+    for path, text in files.items():
+        assert read(path) == text
+    assert not os.path.exists(apply.TXN_FILE)
+
+
+def test_commit_applies_everything(corpus):
+    apply.commit(make_ops(), rebuild_master=False)
+    assert read("data/md/staples/rice.md") == "# Rice\n\nnew rice\n"
+    assert read("data/md/staples/millet.md") == "# Millet\n\nnew millet\n"
+    assert not os.path.exists("data/md/staples/wheat.md")
+    assert leftovers() == []
+    assert not os.path.exists(apply.TXN_FILE)
+
+
+def test_failure_mid_transaction_rolls_back(corpus, monkeypatch):
+    real_apply_op, done = apply._apply_op, []
+
+    def failing_apply_op(op):
+        if len(done) == 2:
+            raise Boom()
+        real_apply_op(op)
+        done.append(op["path"])
+
+    monkeypatch.setattr(apply, "_apply_op", failing_apply_op)
+    with pytest.raises(Boom):
+        apply.commit(make_ops(), rebuild_master=False)
+    assert_untouched(corpus)
+    assert leftovers() == []
+
+
+def test_failed_master_rebuild_rolls_back(corpus, monkeypatch):
+    def failing_build(out_file=None, workers=None):
+        write(out_file, "{half a master")
+        raise Boom()
+
+    os.makedirs(os.path.dirname(build_master.MASTER_FILE), exist_ok=True)
+    write(build_master.MASTER_FILE, "{}")
+    monkeypatch.setattr(build_master, "build_master", failing_build)
+    with pytest.raises(Boom):
+        apply.commit(make_ops())
+    assert_untouched(corpus)
+    assert read(build_master.MASTER_FILE) == "{}"
+    assert not os.path.exists(build_master.MASTER_FILE + apply.STAGE_SUFFIX)
+
+
+def test_recover_rolls_back_a_crashed_apply(corpus):
+    ops = make_ops()
+    # What commit() leaves behind if the process dies after two ops
+    apply.save_json_cache({"committed": False, "ops": ops}, apply.TXN_FILE)
+    apply._apply_op(ops[0])
+    apply._apply_op(ops[1])
+
+    assert apply.recover() is True
+    assert_untouched(corpus)
+    assert leftovers() == []
+    assert apply.recover() is False
+
+
+def test_recover_finishes_a_committed_apply(corpus):
+    ops = make_ops()
+    for op in ops:
+        apply._apply_op(op)
+    apply.save_json_cache({"committed": True, "ops": ops}, apply.TXN_FILE)
+
+    assert apply.recover() is True
+    assert read("data/md/staples/rice.md") == "# Rice\n\nnew rice\n"
+    assert leftovers() == []
+
+
+def test_merge_carries_only_missing_sections():
+    source = "# Black Rice\n\nGrown in Manipur.\n\n## Uses\n\nKheer.\n\n## Storage\n\nKeep   dry.\n"
+    target = "# Brown Rice\n\nWhole grain.\n\n## Storage\n\nkeep dry.\n"
+    title, sections = apply.carried_sections(source, target, "black-rice")
+    assert title == "Black Rice"
+    assert sections == [("Black Rice", "Grown in Manipur."), ("Uses", "Kheer.")]
+    assert apply.carried_block(title, sections) == "## Black Rice\n\nGrown in Manipur.\n\n### Uses\n\nKheer."
@@ -0,0 +1,100 @@
+import pytest
+
+from flagger import parse_decisions, validate_decisions
+from slug_index import SlugIndex
+
+
+@pytest.fixture
+def index():
+    return SlugIndex(["rice", "wheat", "wheat-flour", "ragi"])
+
+
+def test_csv_and_log_formats():
+    decisions = parse_decisions([
+        "slug,action,note,merge_target",
+        "rice,approve",
+        'wheat,flag,"needs a source, maybe two"',
+        "ragi :: DELETE :: umbrella term :: see notes",
+    ])
+    assert decisions == [
+        (2, "rice", "approve", "", ""),
+        (3, "wheat", "flag", "needs a source, maybe two", ""),
+        (4, "ragi", "delete", "umbrella term :: see notes", ""),
+    ]
+
+
+def test_comments_markers_and_late_header_are_skipped():
+    decisions = parse_decisions([
+        "# decisions from the second pass",
+        "",
+        "--- SESSION 2 ---",
+        "canon-slug,status,note",
+        "   ",
+        "rice,a",
+    ])
+    assert decisions == [(6, "rice", "a", "", "")]
+
+
+def test_short_and_empty_rows_are_padded():
+    assert parse_decisions(["rice", ",approve"]) == [
+        (1, "rice", "", "", ""),
+        (2, "", "approve", "", ""),
+    ]
+
+
+def test_malformed_decisions_are_reported(index):
+    decisions = parse_decisions([
+        "quinoa,approve",                 # unknown slug
+        "rice,approve-ish",               # unknown action
+        "rice",                           # no action at all
+        ",approve",                       # no slug
+        "wheat,merge",                    # merge without a target
+        "wheat,merge,,millet",            # target not in the table
+        "wheat,merge,MERGE INTO wheat",   # merge into itself
+    ])
+    valid, errors = validate_decisions(decisions, index)
+    assert valid == []
+    assert errors == [
+        "line 1: unknown slug 'quinoa'",
+        "line 2: unknown action 'approve-ish' for 'rice'",
+        "line 3: unknown action '' for 'rice'",
+        "line 4: unknown slug ''",
+        "line 5: merge target '' for 'wheat' is not in the table",
+        "line 6: merge target 'millet' for 'wheat' is not in the table",
+        "line 7: 'wheat' cannot be merged into itself",
+    ]
+
+
+def test_valid_decisions_are_normalised(index):
+    decisions = parse_decisions([
+        "rice,A",
+        "ragi,d,umbrella term",
+        "wheat-flour,m,,wheat",
+        "wheat,merge,merge into ragi",
+    ])
+    valid, errors = validate_decisions(decisions, index)
+    assert errors == []
+    assert valid == [
+        ("rice", "approve", "NONE"),
+        ("ragi", "delete", "umbrella term"),
+        ("wheat-flour", "merge", "MERGE INTO wheat"),
+        ("wheat", "merge", "MERGE INTO ragi"),
+    ]
+
+
+def test_raw_model_output_is_normalised(index):
+    decisions = parse_decisions([
+        "rice :: [APPROVE] :: staple grain",
+        "- wheat :: FLAG :: check the source",
+        "* **ragi** :: [Delete] :: umbrella term",
+        "• wheat-flour :: **[merge]** :: MERGE INTO wheat",
+    ])
+    assert decisions == [
+        (1, "rice", "approve", "staple grain", ""),
+        (2, "wheat", "flag", "check the source", ""),
+        (3, "ragi", "delete", "umbrella term", ""),
+        (4, "wheat-flour", "merge", "MERGE INTO wheat", ""),
+    ]
+    valid, errors = validate_decisions(decisions, index)
+    assert errors == []
+    assert [status for _, status, _ in valid] == ["approve", "flag", "delete", "merge"]
@@ -0,0 +1,18 @@
+import os
+
+from ifid import absolute_paths
+
+
+def test_file_arguments_are_made_absolute(tmp_path):
+    cwd = str(tmp_path)
+    (tmp_path / "old.json").write_text("{}")
+    (tmp_path / "rice").write_text("")
+
+    assert absolute_paths(["--metrics", "run.prom", "snapshot", "diff", "old.json", "HEAD", "--out=d.json"], cwd) == [
+        "--metrics", os.path.join(cwd, "run.prom"), "snapshot", "diff", os.path.join(cwd, "old.json"),
+        "HEAD", "--out=" + os.path.join(cwd, "d.json")]
+    assert absolute_paths(["resolve", "--batch", "-", "--out", "/abs/out.jsonl"], cwd) == [
+        "resolve", "--batch", "-", "--out", "/abs/out.jsonl"]
+    # Only snapshot positionals are files; a search query that happens to
+    # match a file name stays a query
+    assert absolute_paths(["search", "rice", "-k", "5"], cwd) == ["search", "rice", "-k", "5"]
@@ -0,0 +1,107 @@
+import csv
+
+import pytest
+
+import journal
+
+HEADER = ["canon-slug", "status", "note"]
+
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = tmp_path / "audit.csv"
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows([["rice", "unchanged", ""], ["wheat", "unchanged", ""], ["ragi", "approve", "NONE"]])
+    return str(path)
+
+
+def read_csv(path):
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        return {r["canon-slug"]: (r["status"], r["note"]) for r in csv.DictReader(f)}
+
+
+def test_append_is_visible_in_state(db_file):
+    assert journal.append_decisions([("rice", "approve", "NONE"), ("wheat", "flag", "check")], db_file) == 2
+    assert journal.append_decisions([], db_file) == 0
+
+    state = journal.read_state(db_file)
+    assert state["rice"] == ("approve", "NONE")
+    assert state["wheat"] == ("flag", "check")
+    assert state["ragi"] == ("approve", "NONE")
+    # The CSV itself is untouched until compaction
+    assert read_csv(db_file)["rice"] == ("unchanged", "")
+
+
+def test_last_decision_wins(db_file):
+    journal.append_decisions([("rice", "flag", "first")], db_file)
+    journal.append_decisions([("rice", "delete", "second")], db_file)
+    assert journal.read_state(db_file)["rice"] == ("delete", "second")
+    assert journal.load_with_journal(db_file).set_index("canon-slug").loc["rice", "status"] == "delete"
+
+
+def test_unknown_slugs_are_ignored(db_file):
+    journal.append_decisions([("quinoa", "approve", "NONE")], db_file)
+    assert "quinoa" not in journal.read_state(db_file)
+
+
+def test_torn_last_line_is_skipped(db_file, capsys):
+    journal.append_decisions([("rice", "approve", "NONE")], db_file)
+    # A crash mid-write leaves half a JSON object at the end
+    with open(journal.journal_path(db_file), 'a', encoding='utf-8') as f:
+        f.write('{"slug": "wheat", "status": "del')
+
+    assert [e["slug"] for e in journal.read_journal(db_file)] == ["rice"]
+    state = journal.read_state(db_file)
+    assert state["rice"] == ("approve", "NONE")
+    assert state["wheat"] == ("unchanged", "")
+    assert "Skipping unreadable journal line" in capsys.readouterr().out
+
+
+def test_compaction_round_trip(db_file):
+    journal.append_decisions([("rice", "approve", "NONE"), ("wheat", "merge", "MERGE INTO rice")], db_file)
+    before = journal.read_state(db_file)
+
+    assert journal.compact(db_file) == 2
+    assert journal.read_journal(db_file) == []
+    assert journal.read_state(db_file) == before
+    assert read_csv(db_file)["wheat"] == ("merge", "MERGE INTO rice")
+    # Nothing left to fold in
+    assert journal.compact(db_file) == 0
+
+
+def test_compaction_after_torn_line(db_file):
+    journal.append_decisions([("rice", "delete", "dup")], db_file)
+    with open(journal.journal_path(db_file), 'a', encoding='utf-8') as f:
+        f.write('{"slug": "wheat"')
+
+    assert journal.compact(db_file) == 1
+    assert read_csv(db_file)["rice"] == ("delete", "dup")
+    assert read_csv(db_file)["wheat"] == ("unchanged", "")
+
+
+def test_pending_count_tracks_appends_and_compaction(db_file):
+    assert journal.pending_count(db_file) == 0
+    journal.append_decisions([("rice", "flag", "a"), ("wheat", "flag", "b")], db_file)
+    assert journal.pending_count(db_file) == 2
+    journal.append_decisions([("ragi", "flag", "c")], db_file)
+    assert journal.pending_count(db_file) == 3
+
+    assert journal.maybe_compact(db_file, threshold=4) == 0
+    assert journal.maybe_compact(db_file, threshold=3) == 3
+    assert journal.pending_count(db_file) == 0
+    journal.append_decisions([("rice", "approve", "NONE")], db_file)
+    assert journal.pending_count(db_file) == 1
+
+
+def test_append_after_torn_line_is_kept(db_file, capsys):
+    journal.append_decisions([("rice", "approve", "NONE")], db_file)
+    with open(journal.journal_path(db_file), 'a', encoding='utf-8') as f:
+        f.write('{"slug": "wheat", "sta')
+    journal.append_decisions([("wheat", "delete", "dup")], db_file)
+
+    assert [e["slug"] for e in journal.read_journal(db_file)] == ["rice", "wheat"]
+    assert journal.read_state(db_file)["wheat"] == ("delete", "dup")
+    assert journal.compact(db_file) == 2
+    assert read_csv(db_file)["wheat"] == ("delete", "dup")
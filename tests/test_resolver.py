@@ -0,0 +1,29 @@
+import pytest
+
+from resolver import Resolver
+
+
+@pytest.fixture
+def resolver():
+    aliases = {a: [a.replace(" ", "-"), "slug"] for a in
+               ["butter", "milk", "salt", "garlic", "coconut", "cocoa", "wheat flour", "wheat"]}
+    return Resolver({"aliases": aliases, "classes": [], "facets": {}})
+
+
+@pytest.mark.parametrize("label, slug, qualifier", [
+    ("Iodised Salt", "salt", "iodised"),
+    ("Garlic Powder", "garlic", "powder"),
+    ("Skimmed Milk", "milk", "skimmed"),
+    ("Refined Wheat Flour", "wheat-flour", "refined"),
+])
+def test_partial_match_on_qualified_name(resolver, label, slug, qualifier):
+    (result,) = resolver.resolve_component(label)
+    assert (result.slug, result.method) == (slug, "partial")
+    assert f"#qualifier:{qualifier}" in result.declared
+
+
+@pytest.mark.parametrize("label", ["Peanut Butter", "Coconut Milk", "Cocoa Butter", "Almond Milk", "Wheat Salt"])
+def test_no_partial_match_when_the_leftover_is_an_ingredient(resolver, label):
+    (result,) = resolver.resolve_component(label)
+    assert result.slug is None
+    assert result.method == "none"